@@ -6,6 +6,7 @@ from oddsprout.exceptions import (
     OddsproutValueError,
 )
 from oddsprout.generators import JSONGenerator
+from oddsprout.parallel import agenerate_parallel, generate_parallel
 
 __all__ = (
     "Config",
@@ -14,4 +15,6 @@ __all__ = (
     "OddsproutError",
     "OddsproutRecursionError",
     "OddsproutValueError",
+    "agenerate_parallel",
+    "generate_parallel",
 )
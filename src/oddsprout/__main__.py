@@ -2,42 +2,408 @@ from __future__ import annotations
 
 import json
 import sys
-from argparse import ArgumentParser
+from argparse import SUPPRESS, ArgumentParser, Namespace
+from dataclasses import replace
 from pathlib import Path
-from typing import TYPE_CHECKING, cast
-
-from dahlia import Dahlia
+from typing import TYPE_CHECKING, AnyStr, BinaryIO, TextIO
 
+from oddsprout.binary import BINARY_ENCODERS
 from oddsprout.configuration import load_config
-from oddsprout.exceptions import OddsproutError
+from oddsprout.constants import DIVERGENCE_POLICIES, RNG_KINDS
+from oddsprout.encoder import Encoder
+from oddsprout.estimate import estimate_size
+from oddsprout.exceptions import OddsproutError, OddsproutValueError
 from oddsprout.generators import JSONGenerator
+from oddsprout.parallel import dump_parallel
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
     from typing_extensions import Never
 
+    from oddsprout.configuration import Config
+    from oddsprout.stats import GenerationStats
 
-def _parse_argv() -> Path | None:
+
+def _parse_argv() -> Namespace:
     parser = ArgumentParser()
     parser.add_argument("--config", type=Path, help="path to configuration file")
+    parser.add_argument(
+        "--rng", choices=sorted(RNG_KINDS), help="random number generator to use"
+    )
+    parser.add_argument("--seed", type=int, help="seed for reproducible generation")
+    parser.add_argument(
+        "--max-depth", type=int, help="maximum nesting depth of the JSONs"
+    )
+    parser.add_argument(
+        "--max-nodes", type=int, help="maximum number of values in each JSON"
+    )
+    parser.add_argument(
+        "--max-bytes", type=int, help="maximum size of each indented JSON in bytes"
+    )
+    parser.add_argument(
+        "--target-bytes",
+        type=int,
+        help="size in bytes to steer each indented JSON toward",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="fraction of --target-bytes the JSONs may fall short by",
+    )
+    parser.add_argument(
+        "--unique-keys",
+        action="store_true",
+        default=None,
+        help="never repeat keys within an object",
+    )
+    parser.add_argument(
+        "--key-vocabulary",
+        type=int,
+        help="number of distinct keys to draw object keys from",
+    )
+    parser.add_argument(
+        "--key-skew",
+        type=float,
+        help="Zipf exponent skewing key draws toward the first keys of the vocabulary",
+    )
+    parser.add_argument(
+        "--subtree-reuse",
+        type=float,
+        help="probability of reusing a previously generated subtree",
+    )
+    parser.add_argument(
+        "--subtree-pool-size",
+        type=int,
+        help="maximum number of nodes kept in the pool of reused subtrees",
+    )
+    parser.add_argument(
+        "--count", type=int, default=1, help="number of JSONs to generate"
+    )
+    parser.add_argument(
+        "--format",
+        choices=("json", "ndjson", "json-array", "msgpack", "cbor"),
+        default="json",
+        help="output format for the generated JSONs (msgpack and cbor are binary)",
+    )
+    layout = parser.add_mutually_exclusive_group()
+    layout.add_argument(
+        "--indent",
+        type=int,
+        help="number of spaces to indent JSONs with (2 by default)",
+    )
+    layout.add_argument(
+        "--compact", action="store_true", help="write JSONs without whitespace"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes to generate JSONs with",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="write the JSON while generating it instead of building it in memory",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="text",
+        choices=("text", "json"),
+        help="print generation stats to stderr as text (default) or JSON",
+    )
+    parser.add_argument(
+        "--divergence",
+        choices=sorted(DIVERGENCE_POLICIES),
+        help="what to do with configs whose expected JSON size is infinite",
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="print the expected size of the generated JSONs instead",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    bench_parser = subparsers.add_parser("bench", help="measure generator throughput")
+    bench_parser.add_argument(
+        "--preset",
+        action="append",
+        help="config preset to benchmark (all by default, can be repeated)",
+    )
+    bench_parser.add_argument(
+        "--duration",
+        type=float,
+        default=1.0,
+        help="number of seconds to benchmark each preset for",
+    )
+    # also accepted after the subcommand, without overwriting the parent's value
+    bench_parser.add_argument(
+        "--rng",
+        choices=sorted(RNG_KINDS),
+        default=SUPPRESS,
+        help="random number generator to use",
+    )
+    bench_parser.add_argument(
+        "--encode",
+        action="store_true",
+        help="measure JSON encoding throughput against json.dumps instead",
+    )
+    corpus_parser = subparsers.add_parser(
+        "corpus", help="write JSONs into sharded files with an offset index"
+    )
+    corpus_parser.add_argument(
+        "directory", type=Path, help="empty or nonexistent directory to write to"
+    )
+    corpus_parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=1 << 28,
+        help="maximum size of each shard in bytes (256 MiB by default)",
+    )
     args = parser.parse_args()
-    return cast("Path | None", args.config)
+    if args.command == "corpus":
+        # corpora are always written as NDJSON, without stats
+        unsupported = {
+            "--format": args.format != "json",
+            "--indent": args.indent is not None,
+            "--compact": args.compact,
+            "--stream": args.stream,
+            "--stats": args.stats is not None,
+            "--estimate": args.estimate,
+        }
+        if flags := [flag for flag, used in unsupported.items() if used]:
+            parser.error(f"{', '.join(flags)} can't be used with corpus")
+    return args
 
 
 def _dexit(message: object) -> Never:
+    # only needed on errors
+    from dahlia import Dahlia
+
     sys.exit(Dahlia().convert(f"&4ERROR:&R {message}"))
 
 
 def main() -> None:
-    config_path = _parse_argv()
+    args = _parse_argv()
+    if args.command == "bench":
+        try:
+            _run_bench(args, sys.stdout)
+        except OddsproutError as e:
+            _dexit(e)
+        return
+    config_path: Path | None = args.config
     if not (config_path is None or config_path.exists()):
         _dexit(f"{config_path} does not exist")
 
     try:
-        json_gen = JSONGenerator(load_config(config_path))
-        print(json.dumps(json_gen.generate_value(), indent=2))
+        config = _apply_overrides(load_config(config_path), args)
+        if args.command == "corpus":
+            _write_corpus(config, args)
+            return
+        if args.estimate:
+            _print_estimate(config)
+            return
+        _check_output_options(config, args)
+        _write_values(config, args, sys.stdout)
     except OddsproutError as e:
         _dexit(e)
 
 
+def _check_output_options(config: Config, args: Namespace) -> None:
+    if args.count < 0:
+        _dexit("--count can't be negative")
+    if args.stream and args.format != "json":
+        _dexit("--stream can only be used with the 'json' format")
+    if args.stream and args.jobs != 1:
+        _dexit("--stream can't be used with --jobs")
+    custom_layout = args.indent is not None or args.compact
+    if custom_layout and args.format != "json":
+        _dexit("--indent/--compact can only be used with the 'json' format")
+    if custom_layout and args.stream:
+        _dexit("--stream can't be used with --indent or --compact")
+    # byte budgets are measured in JSON indented with 2 spaces
+    budgeted = config.max_bytes is not None or config.target_bytes is not None
+    if budgeted and args.format != "json":
+        _dexit("max_bytes and target_bytes can only be used with the 'json' format")
+    if budgeted and (args.compact or args.indent not in {None, 2}):
+        _dexit("--indent/--compact can't be used with max_bytes or target_bytes")
+    if args.stats is not None and args.jobs != 1:
+        _dexit("--stats can't be used with --jobs")
+
+
+def _print_estimate(config: Config) -> None:
+    # the estimate models values without budgets, so it would overstate
+    # the size of budgeted ones (infinitely so for diverging configs)
+    budgets = (config.max_nodes, config.max_bytes, config.target_bytes)
+    if any(budget is not None for budget in budgets):
+        _dexit("--estimate can't be used with max_nodes, max_bytes or target_bytes")
+    print(estimate_size(config).format())
+
+
+def _apply_overrides(config: Config, args: Namespace) -> Config:
+    # Config options set via CLI flags take precedence over the config file
+    overrides = {
+        option: value
+        for option in (
+            "rng",
+            "seed",
+            "max_depth",
+            "max_nodes",
+            "max_bytes",
+            "target_bytes",
+            "tolerance",
+            "unique_keys",
+            "key_vocabulary",
+            "key_skew",
+            "subtree_reuse",
+            "subtree_pool_size",
+            "divergence",
+        )
+        if (value := getattr(args, option)) is not None
+    }
+    return replace(config, **overrides) if overrides else config
+
+
+def _write_corpus(config: Config, args: Namespace) -> None:
+    from oddsprout.corpus import write_corpus
+
+    write_corpus(
+        config, args.directory, args.count, shard_size=args.shard_size, jobs=args.jobs
+    )
+
+
+def _write_values(config: Config, args: Namespace, out: TextIO) -> None:
+    gen = JSONGenerator(config, stats=args.stats is not None)
+    _write_texts(gen, args, out)
+    if (stats := gen.stats) is None:
+        return
+    pool = gen.subtree_pool
+    if args.stats == "json":
+        report = stats.to_dict()
+        if pool is not None:
+            report["subtree_pool"] = pool.to_dict()
+        print(json.dumps(report), file=sys.stderr)
+    else:
+        print(stats.format(), file=sys.stderr)
+        if pool is not None:
+            print(pool.format(), file=sys.stderr)
+
+
+def _write_texts(gen: JSONGenerator, args: Namespace, out: TextIO) -> None:
+    if args.format in BINARY_ENCODERS:
+        _write_binary(gen, args, out.buffer)
+        return
+    if args.stream:
+        for _ in range(args.count):
+            gen.write_to(out)
+            out.write("\n")
+        return
+    indent = None
+    if args.format == "json" and not args.compact:
+        indent = 2 if args.indent is None else args.indent
+    # worker processes reuse subtrees from pools of their own
+    pool = gen.subtree_pool if args.jobs == 1 else None
+    dumps = Encoder(indent, gen.config.charset, subtrees=pool)
+    texts: Iterator[str]
+    if args.jobs == 1:
+        texts = map(dumps, gen.generate_many(args.count))
+    else:
+        texts = dump_parallel(gen.config, args.count, dumps, args.jobs)
+    if gen.stats is not None:
+        texts = _count_bytes(texts, gen.stats)
+    if args.format != "json-array":
+        for text in texts:
+            out.write(text)
+            out.write("\n")
+        return
+    out.write("[")
+    for i, text in enumerate(texts):
+        out.write(",\n" if i else "\n")
+        out.write(text)
+    out.write("\n]\n" if args.count else "]\n")
+
+
+def _write_binary(gen: JSONGenerator, args: Namespace, out: BinaryIO) -> None:
+    # a MessagePack stream or a CBOR sequence, i.e. the values back to back
+    encode = BINARY_ENCODERS[args.format]
+    payloads: Iterator[bytes]
+    if args.jobs == 1:
+        payloads = map(encode, gen.generate_many(args.count))
+    else:
+        payloads = dump_parallel(gen.config, args.count, encode, args.jobs)
+    if gen.stats is not None:
+        payloads = _count_bytes(payloads, gen.stats)
+    for payload in payloads:
+        out.write(payload)
+
+
+def _run_bench(args: Namespace, out: TextIO) -> None:
+    from oddsprout.bench import peak_rss, run_benchmark, time_types
+
+    if args.encode:
+        _run_encoding_bench(args, out)
+        return
+    out.write(
+        f"{'preset':<16}{'values/s':>12}{'nodes/s':>14}{'MB/s':>10}"
+        "   ns/value by type\n"
+    )
+    for name, config in _bench_presets(args):
+        result = run_benchmark(config, args.duration)
+        timings = " ".join(
+            f"{type_}={seconds * 1e9:.0f}"
+            for type_, seconds in time_types(config).items()
+        )
+        out.write(
+            f"{name:<16}{result.values_per_second:>12,.1f}"
+            f"{result.nodes_per_second:>14,.0f}"
+            f"{result.bytes_per_second / 1e6:>10.2f}   {timings}\n"
+        )
+    if (rss := peak_rss()) is not None:
+        out.write(f"peak RSS: {rss / (1 << 20):.1f} MiB\n")
+
+
+def _run_encoding_bench(args: Namespace, out: TextIO) -> None:
+    from oddsprout.bench import run_encoding_benchmark
+
+    # json.dumps and oddsprout's encoder, indented and compact, in MB/s
+    out.write(
+        f"{'preset':<16}{'indented':>10}{'json.dumps':>12}"
+        f"{'compact':>10}{'json.dumps':>12}\n"
+    )
+    for name, config in _bench_presets(args):
+        indented = run_encoding_benchmark(config)
+        compact = run_encoding_benchmark(config, indent=None)
+        out.write(
+            f"{name:<16}{indented.bytes_per_second / 1e6:>10.2f}"
+            f"{indented.json_bytes_per_second / 1e6:>12.2f}"
+            f"{compact.bytes_per_second / 1e6:>10.2f}"
+            f"{compact.json_bytes_per_second / 1e6:>12.2f}\n"
+        )
+
+
+def _bench_presets(args: Namespace) -> list[tuple[str, Config]]:
+    from oddsprout.bench import PRESETS
+
+    presets = []
+    for name in args.preset or PRESETS:
+        if name not in PRESETS:
+            msg = (
+                f"invalid preset {name!r}"
+                f" (valid options: {', '.join(map(repr, PRESETS))})"
+            )
+            raise OddsproutValueError(msg)
+        config = PRESETS[name]
+        if args.rng is not None:
+            config = replace(config, rng=args.rng)
+        presets.append((name, config))
+    return presets
+
+
+def _count_bytes(texts: Iterable[AnyStr], stats: GenerationStats) -> Iterator[AnyStr]:
+    for text in texts:
+        stats.bytes_emitted += len(text)
+        yield text
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import dataclass, replace
+from time import perf_counter
+from typing import TYPE_CHECKING, get_args
+
+from oddsprout.configuration import Charset, Config
+from oddsprout.constants import DEFAULT_TYPES
+from oddsprout.encoder import Encoder
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from oddsprout.generators import JSONValue
+
+PRESETS: dict[str, Config] = {
+    "default": Config(),
+    "string-heavy": Config(
+        types=("string", "array", "object"), string_size=(50, 200), max_depth=3
+    ),
+    "deep-nesting": Config(
+        types=("array", "object"),
+        base_size=(1, 10),
+        collection_size=(1, 2),
+        max_depth=16,
+    ),
+    "wide-objects": Config(
+        base="object",
+        base_size=(100, 100),
+        collection_size=(500, 1000),
+        max_depth=2,
+    ),
+    **{
+        f"charset-{charset}": Config(
+            types=("string",), base="array", base_size=(1000, 1000), charset=charset
+        )
+        for charset in get_args(Charset)
+    },
+    "base-array": Config(base="array", max_depth=4),
+    "base-object": Config(base="object", max_depth=4),
+}
+_LEAF_TYPES = tuple(t for t in DEFAULT_TYPES if t not in {"array", "object"})
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """The throughput of generating values with a config."""
+
+    values: int
+    nodes: int
+    size: int
+    seconds: float
+
+    @property
+    def values_per_second(self) -> float:
+        """The number of values generated per second."""
+        return self.values / self.seconds
+
+    @property
+    def nodes_per_second(self) -> float:
+        """The number of nodes (values at any depth) generated per second."""
+        return self.nodes / self.seconds
+
+    @property
+    def bytes_per_second(self) -> float:
+        """The size of the generated values as indented JSON per second."""
+        return self.size / self.seconds
+
+
+@dataclass(frozen=True)
+class EncodingResult:
+    """
+    The time spent encoding the same values with oddsprout's encoder
+    and with `json.dumps`.
+    """
+
+    size: int
+    seconds: float
+    json_seconds: float
+
+    @property
+    def bytes_per_second(self) -> float:
+        """The size of the encoded values per second with oddsprout's encoder."""
+        return self.size / self.seconds
+
+    @property
+    def json_bytes_per_second(self) -> float:
+        """The size of the encoded values per second with `json.dumps`."""
+        return self.size / self.json_seconds
+
+    @property
+    def speedup(self) -> float:
+        """How many times faster oddsprout's encoder is than `json.dumps`."""
+        return self.json_seconds / self.seconds
+
+
+def run_benchmark(config: Config, duration: float = 1.0) -> BenchmarkResult:
+    """
+    Generate values with `config` for roughly `duration` seconds (and at least
+    one value), measuring the time spent in the generator.
+    """
+    if duration < 0:
+        msg = f"duration can't be negative, got {duration}"
+        raise OddsproutValueError(msg)
+    gen = JSONGenerator(config)
+    values = nodes = size = 0
+    seconds = 0.0
+    while not values or seconds < duration:
+        start = perf_counter()
+        value = gen.generate_value()
+        seconds += perf_counter() - start
+        values += 1
+        nodes += _count_nodes(value)
+        size += len(json.dumps(value, indent=2))
+    return BenchmarkResult(values, nodes, size, seconds)
+
+
+def run_encoding_benchmark(
+    config: Config, indent: int | None = 2, n: int = 100
+) -> EncodingResult:
+    """
+    Encode `n` values generated with `config` with oddsprout's encoder and
+    with `json.dumps`, measuring the time spent in each.
+    """
+    if n < 1:
+        msg = f"number of values has to be positive, got {n}"
+        raise OddsproutValueError(msg)
+    gen = JSONGenerator(config)
+    values = [gen.generate_value() for _ in range(n)]
+    encoder = Encoder(indent, config.charset)
+    start = perf_counter()
+    size = sum(len(encoder(value)) for value in values)
+    seconds = perf_counter() - start
+    separators = None if indent is not None else (",", ":")
+    start = perf_counter()
+    for value in values:
+        json.dumps(value, indent=indent, separators=separators)
+    return EncodingResult(size, seconds, perf_counter() - start)
+
+
+def time_types(config: Config, n: int = 10_000) -> dict[str, float]:
+    """
+    Measure the average time (in seconds) of generating a single value of each
+    leaf type allowed by `config`.
+    """
+    if n < 1:
+        msg = f"number of values has to be positive, got {n}"
+        raise OddsproutValueError(msg)
+    types = set(config.types)
+    if "number" in types:
+        types.update(("int", "float"))
+    timings: dict[str, float] = {}
+    for type_ in _LEAF_TYPES:
+        if type_ not in types:
+            continue
+        gen = JSONGenerator(
+            replace(config, types=(type_,), base="array", base_size=(n, n))
+        )
+        start = perf_counter()
+        gen.generate_value()
+        timings[type_] = (perf_counter() - start) / n
+    return timings
+
+
+def peak_rss() -> int | None:
+    """
+    Get the peak resident set size of the current process in bytes,
+    or None if it can't be measured on this platform.
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes everywhere but on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _count_nodes(value: JSONValue) -> int:
+    nodes = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        nodes += 1
+        if type(value) is dict:
+            stack.extend(value.values())
+        elif type(value) is list:
+            stack.extend(value)
+    return nodes
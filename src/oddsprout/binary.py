@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import struct
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
+
+if TYPE_CHECKING:
+    from oddsprout.generators import JSONValue
+
+_pack_double = struct.Struct(">d").pack
+
+
+class _Format(NamedTuple):
+    # Encoders of the parts of a binary format, the heads taking the number of
+    # bytes of strings or the number of children of collections
+    int_: Callable[[int], bytes]
+    float_: Callable[[float], bytes]
+    str_head: Callable[[int], bytes]
+    array_head: Callable[[int], bytes]
+    map_head: Callable[[int], bytes]
+    constants: dict[Any, bytes]
+
+
+def encode_msgpack(value: JSONValue) -> bytes:
+    """
+    Encode a value as MessagePack, with the smallest representation of every
+    int and length, and floats as float 64.
+    """
+    return _encode(value, _MSGPACK)
+
+
+def encode_cbor(value: JSONValue) -> bytes:
+    """
+    Encode a value as CBOR, with the smallest head of every int and length,
+    definite-length collections, and floats as double-precision floats.
+    """
+    return _encode(value, _CBOR)
+
+
+def _encode(value: JSONValue, format_: _Format) -> bytes:
+    # Both formats write the head of a collection before its children, so
+    # values are encoded in a single pre-order walk without recursion
+    int_, float_, str_head, array_head, map_head, constants = format_
+    out = bytearray()
+    stack: list[Any] = [value]
+    while stack:
+        node = stack.pop()
+        type_ = type(node)
+        if type_ is str:
+            data = node.encode()
+            out += str_head(len(data))
+            out += data
+        elif type_ is int:
+            out += int_(node)
+        elif type_ is float:
+            out += float_(node)
+        elif type_ is dict:
+            out += map_head(len(node))
+            for key, child in reversed(node.items()):
+                stack.append(child)
+                stack.append(key)
+        elif type_ is list:
+            out += array_head(len(node))
+            stack.extend(reversed(node))
+        else:
+            out += constants[node]
+    return bytes(out)
+
+
+def _msgpack_int(n: int) -> bytes:
+    if -32 <= n < 128:
+        return (n & 0xFF).to_bytes(1, "big")
+    if n >= 0:
+        for marker, size in ((0xCC, 1), (0xCD, 2), (0xCE, 4), (0xCF, 8)):
+            if n < 1 << (8 * size):
+                return bytes((marker,)) + n.to_bytes(size, "big")
+    else:
+        for marker, size in ((0xD0, 1), (0xD1, 2), (0xD2, 4), (0xD3, 8)):
+            if n >= -(1 << (8 * size - 1)):
+                return bytes((marker,)) + n.to_bytes(size, "big", signed=True)
+    msg = f"MessagePack ints have to fit in 64 bits, got {n}"
+    raise OverflowError(msg)
+
+
+def _msgpack_head(
+    fixed: int, fixed_limit: int, markers: tuple[int | None, int, int]
+) -> Callable[[int], bytes]:
+    # Heads of strings or collections: a fixed-size one for short ones, then
+    # 8-bit (for strings), 16-bit and 32-bit lengths
+    def head(n: int) -> bytes:
+        if n < fixed_limit:
+            return bytes((fixed | n,))
+        for marker, size in zip(markers, (1, 2, 4)):
+            if marker is not None and n < 1 << (8 * size):
+                return bytes((marker,)) + n.to_bytes(size, "big")
+        msg = f"MessagePack lengths have to fit in 32 bits, got {n}"
+        raise OverflowError(msg)
+
+    return head
+
+
+def _cbor_head(major: int) -> Callable[[int], bytes]:
+    # The head of a data item of a major type, with an argument fitting in the
+    # initial byte or in the 1, 2, 4 or 8 bytes following it
+    initial = major << 5
+
+    def head(n: int) -> bytes:
+        if n < 24:
+            return bytes((initial | n,))
+        for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+            if n < 1 << (8 * size):
+                return bytes((initial | info,)) + n.to_bytes(size, "big")
+        msg = f"CBOR arguments have to fit in 64 bits, got {n}"
+        raise OverflowError(msg)
+
+    return head
+
+
+_cbor_unsigned = _cbor_head(0)
+_cbor_negative = _cbor_head(1)
+
+
+def _cbor_int(n: int) -> bytes:
+    return _cbor_unsigned(n) if n >= 0 else _cbor_negative(-1 - n)
+
+
+_MSGPACK = _Format(
+    _msgpack_int,
+    lambda x: b"\xcb" + _pack_double(x),
+    _msgpack_head(0xA0, 32, (0xD9, 0xDA, 0xDB)),
+    _msgpack_head(0x90, 16, (None, 0xDC, 0xDD)),
+    _msgpack_head(0x80, 16, (None, 0xDE, 0xDF)),
+    {None: b"\xc0", False: b"\xc2", True: b"\xc3"},
+)
+_CBOR = _Format(
+    _cbor_int,
+    lambda x: b"\xfb" + _pack_double(x),
+    _cbor_head(3),
+    _cbor_head(4),
+    _cbor_head(5),
+    {None: b"\xf6", False: b"\xf4", True: b"\xf5"},
+)
+BINARY_ENCODERS: dict[str, Callable[[JSONValue], bytes]] = {
+    "msgpack": encode_msgpack,
+    "cbor": encode_cbor,
+}
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import dataclasses
 import sys
+from collections.abc import Mapping
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Literal, TypedDict, cast
@@ -8,9 +10,13 @@ from typing import TYPE_CHECKING, Any, Literal, TypedDict, cast
 from oddsprout.constants import (
     BASE_TYPES,
     BOUNDS_KEYS,
+    BUDGET_KEYS,
     CATEGORIES,
     CHARSETS,
+    COLLECTION_WEIGHT,
     DEFAULT_TYPES,
+    DIVERGENCE_POLICIES,
+    RNG_KINDS,
     TYPES_KEYS,
     VALID_TYPES,
 )
@@ -18,15 +24,13 @@ from oddsprout.exceptions import OddsproutConfigurationError, OddsproutValueErro
 from oddsprout.utils import matches_type
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
     from os import PathLike
 
-if sys.version_info < (3, 11):  # pragma: no cover
-    import tomli as toml
-else:  # pragma: no cover
-    import tomllib as toml
-
 Charset = Literal["ascii", "alpha", "alnum", "digits"]
 BaseKind = Literal["any", "array", "object"]
+RNGKind = Literal["ixia", "mersenne", "pool"]
+DivergencePolicy = Literal["allow", "cap", "error"]
 
 
 class _ConfigData(TypedDict):
@@ -36,6 +40,15 @@ class _ConfigData(TypedDict):
     collection_size: tuple[int, int]
     charset: Charset
     base: BaseKind
+    max_depth: int
+    max_nodes: int
+    max_bytes: int
+    target_bytes: int
+    tolerance: float
+    weights: dict[str, float]
+    unique_keys: bool
+    key_vocabulary: int | tuple[str, ...]
+    key_skew: float
 
 
 @dataclass(frozen=True)
@@ -48,6 +61,20 @@ class Config:
     collection_size: tuple[int, int] = (0, 100)
     charset: Charset = "ascii"
     base: BaseKind = "any"
+    rng: RNGKind | None = None
+    seed: int | None = None
+    max_depth: int | None = None
+    max_nodes: int | None = None
+    max_bytes: int | None = None
+    target_bytes: int | None = None
+    tolerance: float = 0.05
+    divergence: DivergencePolicy = "allow"
+    weights: Mapping[str, float] = dataclasses.field(default_factory=dict)
+    unique_keys: bool = False
+    key_vocabulary: int | tuple[str, ...] | None = None
+    key_skew: float = 0.0
+    subtree_reuse: float = 0.0
+    subtree_pool_size: int = 100_000
 
     def __post_init__(self) -> None:
         for f in ("base", "string", "collection"):
@@ -65,24 +92,236 @@ class Config:
         if self.charset not in CHARSETS:
             msg = f"invalid charset {self.charset!r}"
             raise OddsproutValueError(msg)
+        self._check_generation_options()
         if not (types := set(self.types)):
             msg = "'types' can't be empty"
             raise OddsproutValueError(msg)
         if types - VALID_TYPES:
             msg = f"invalid types: {', '.join(map(repr, types - VALID_TYPES))}"
             raise OddsproutValueError(msg)
+        self._check_weights()
+        self._check_key_vocabulary()
+        self._check_key_space()
         if "number" not in types:
             return
         for number_type in ("int", "float"):
             types.discard(number_type)
         object.__setattr__(self, "types", tuple(types))
 
+    def _check_generation_options(self) -> None:
+        if self.rng is not None and self.rng not in RNG_KINDS:
+            msg = f"invalid RNG {self.rng!r}"
+            raise OddsproutValueError(msg)
+        if self.seed is not None:
+            if not _is_int(self.seed):
+                msg = "expected an integer for 'seed'"
+                raise OddsproutValueError(msg)
+            if self.rng not in {None, "mersenne"}:
+                msg = f"only the 'mersenne' RNG can be seeded, got {self.rng!r}"
+                raise OddsproutValueError(msg)
+        if self.divergence not in DIVERGENCE_POLICIES:
+            msg = f"invalid divergence policy {self.divergence!r}"
+            raise OddsproutValueError(msg)
+        for field in ("max_depth", "max_nodes", "max_bytes", "target_bytes"):
+            value = getattr(self, field)
+            if value is not None and not (_is_int(value) and value >= 1):
+                msg = f"expected a positive integer for {field!r}"
+                raise OddsproutValueError(msg)
+        if not _is_tolerance(self.tolerance):
+            msg = "expected a number in [0, 1) for 'tolerance'"
+            raise OddsproutValueError(msg)
+        self._check_subtree_reuse()
+
+    def _check_subtree_reuse(self) -> None:
+        if not (_is_non_negative(self.subtree_reuse) and self.subtree_reuse <= 1):
+            msg = "expected a number in [0, 1] for 'subtree_reuse'"
+            raise OddsproutValueError(msg)
+        if not (_is_int(self.subtree_pool_size) and self.subtree_pool_size >= 1):
+            msg = "expected a positive integer for 'subtree_pool_size'"
+            raise OddsproutValueError(msg)
+        # reused subtrees aren't accounted for by budgets
+        budgets = (self.max_nodes, self.max_bytes, self.target_bytes)
+        if self.subtree_reuse and any(b is not None for b in budgets):
+            msg = (
+                "'subtree_reuse' can't be used with 'max_nodes', 'max_bytes'"
+                " or 'target_bytes'"
+            )
+            raise OddsproutValueError(msg)
+
+    def _check_weights(self) -> None:
+        if not isinstance(self.weights, Mapping):
+            msg = "expected a mapping of type names to numbers for 'weights'"
+            raise OddsproutValueError(msg)
+        if invalid := self.weights.keys() - VALID_TYPES:
+            msg = f"invalid types in 'weights': {', '.join(map(repr, sorted(invalid)))}"
+            raise OddsproutValueError(msg)
+        for type_, weight in self.weights.items():
+            if not _is_non_negative(weight):
+                msg = f"expected a non-negative number for the weight of {type_!r}"
+                raise OddsproutValueError(msg)
+        # copied so that the config can't change afterwards
+        object.__setattr__(self, "weights", _Weights(self.weights))
+        if not any(self.type_weights().values()):
+            msg = "the weights of the included types can't all be zero"
+            raise OddsproutValueError(msg)
+
+    def _check_key_space(self) -> None:
+        if not isinstance(self.unique_keys, bool):
+            msg = "expected a boolean for 'unique_keys'"
+            raise OddsproutValueError(msg)
+        if not self.unique_keys:
+            return
+        # with a target size, the number of children of the root isn't bounded
+        # by base_size but by the keys left
+        sizes = {
+            "collection_size": self.collection_size[1] if "object" in self.types else 0,
+            "base_size": self.base_size[1]
+            if self.base != "array" and self.target_bytes is None
+            else 0,
+        }
+        keys = self.key_space(max(sizes.values()))
+        for field, size in sizes.items():
+            if size > keys:
+                msg = (
+                    f"{field!r} allows objects with up to {size} children with"
+                    f" 'unique_keys', but there are only {keys} possible keys"
+                )
+                raise OddsproutValueError(msg)
+
+    def _check_key_vocabulary(self) -> None:
+        vocabulary = self.key_vocabulary
+        if isinstance(vocabulary, (list, tuple)):
+            if not (vocabulary and all(isinstance(key, str) for key in vocabulary)):
+                msg = "expected a non-empty sequence of strings for 'key_vocabulary'"
+                raise OddsproutValueError(msg)
+            charset = set(CHARSETS[self.charset])
+            if invalid := [key for key in vocabulary if not charset.issuperset(key)]:
+                msg = (
+                    "keys in 'key_vocabulary' can only have characters of the charset,"
+                    f" got {', '.join(map(repr, invalid[:3]))}"
+                )
+                raise OddsproutValueError(msg)
+            # the first occurrence of a key sets its rank
+            object.__setattr__(self, "key_vocabulary", tuple(dict.fromkeys(vocabulary)))
+        elif vocabulary is not None:
+            if not (_is_int(vocabulary) and vocabulary >= 1):
+                msg = (
+                    "expected a positive integer or a sequence of strings"
+                    " for 'key_vocabulary'"
+                )
+                raise OddsproutValueError(msg)
+            if vocabulary > (strings := self._string_space(vocabulary)):
+                msg = (
+                    f"'key_vocabulary' can't have more than the {strings} strings"
+                    " that can be generated"
+                )
+                raise OddsproutValueError(msg)
+        if not _is_non_negative(self.key_skew):
+            msg = "expected a non-negative number for 'key_skew'"
+            raise OddsproutValueError(msg)
+        if self.key_skew and vocabulary is None:
+            msg = "'key_skew' requires a 'key_vocabulary'"
+            raise OddsproutValueError(msg)
+
+    def rng_kind(self) -> RNGKind:
+        """
+        Get the RNG backend to use, defaulting to `"mersenne"` with a seed
+        (the only one that can be seeded) and to `"ixia"` otherwise.
+        """
+        if self.rng is not None:
+            return self.rng
+        return "ixia" if self.seed is None else "mersenne"
+
+    def key_space(self, limit: int | None = None) -> int:
+        """
+        Get the number of distinct keys that can be generated. With a `limit`,
+        a number over it is returned as soon as the key space is known to be
+        larger, which is much faster with long strings.
+        """
+        if isinstance(self.key_vocabulary, tuple):
+            return len(self.key_vocabulary)
+        if self.key_vocabulary is not None:
+            return self.key_vocabulary
+        return self._string_space(limit)
+
+    def _string_space(self, limit: int | None = None) -> int:
+        low, high = self.string_size
+        base = len(CHARSETS[self.charset])
+        if limit is not None and high >= limit.bit_length():
+            # base ** high alone is over the limit
+            return limit + 1
+        # the geometric series base ** low + ... + base ** high
+        return int((base ** (high + 1) - base**low) // (base - 1))
+
+    def type_weights(self) -> dict[str, float]:
+        """
+        Get the weight each generated type is drawn with, `"number"` being
+        expanded into `"int"` and `"float"`.
+        """
+        types = set(self.types)
+        if "number" in types:
+            types.remove("number")
+            types.update(("int", "float"))
+        number_weight = self.weights.get("number", 1)
+        defaults = {"int": number_weight, "float": number_weight}
+        return {
+            type_: self.weights.get(
+                type_,
+                COLLECTION_WEIGHT
+                if type_ in {"object", "array"}
+                else defaults.get(type_, 1),
+            )
+            for type_ in sorted(types, key=DEFAULT_TYPES.index)
+        }
+
     @classmethod
     def from_file(cls, path: PathLike[str] | str) -> Config:
         """Create a Config from a TOML file."""
         return load_config(path)
 
 
+class _Weights(Mapping[str, float]):
+    # A read-only (and so hashable) copy of the type weights of a config
+
+    __slots__ = ("_weights",)
+
+    def __init__(self, weights: Mapping[str, float]) -> None:
+        self._weights = dict(weights)
+
+    def __repr__(self) -> str:
+        return repr(self._weights)
+
+    def __hash__(self) -> int:
+        return hash(frozenset(self._weights.items()))
+
+    def __getitem__(self, type_: str) -> float:
+        return self._weights[type_]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._weights)
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+
+def _is_int(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_non_negative(value: object) -> bool:
+    return (
+        isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+    )
+
+
+def _is_tolerance(value: object) -> bool:
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and 0 <= value < 1
+    )
+
+
 def _check_unexpected_items(items: set[str], err_msg_nouns: tuple[str, str]) -> None:
     if not items:
         return
@@ -97,6 +336,16 @@ def _check_unexpected_items(items: set[str], err_msg_nouns: tuple[str, str]) ->
 def _check_bounds_config(config: dict[str, Any]) -> None:
     _check_unexpected_items(config.keys() - BOUNDS_KEYS, ("key", "keys"))
     for key, value in config.items():
+        if key in BUDGET_KEYS:
+            if not (_is_int(value) and value >= 1):
+                msg = f"expected a positive integer for {key!r}"
+                raise OddsproutConfigurationError(msg)
+            continue  # pragma: no cover
+        if key == "tolerance":
+            if not _is_tolerance(value):
+                msg = "expected a number in [0, 1) for 'tolerance'"
+                raise OddsproutConfigurationError(msg)
+            continue  # pragma: no cover
         if key.endswith("-max"):
             if not isinstance(value, int):
                 msg = f"expected an integer for {key!r}"
@@ -134,6 +383,8 @@ def _check_types_config(config: dict[str, Any]) -> None:
         msg = f"invalid base type {base!r} (valid options: 'any', 'array', 'object')"
         raise OddsproutConfigurationError(msg)
 
+    _check_keys_config(config)
+
     for key in ("exclude", "include"):
         if (value := config.get(key)) is None:
             continue
@@ -145,14 +396,52 @@ def _check_types_config(config: dict[str, Any]) -> None:
                 msg = f"invalid type {item!r} in {key!r}"
                 raise OddsproutConfigurationError(msg)
 
+    if (weights := config.get("weights")) is not None:
+        _check_weights_config(weights)
+
     if set(config) >= {"include", "exclude"}:
         msg = "can't use 'include' and 'exclude' at once"
         raise OddsproutConfigurationError(msg)
 
 
+def _check_keys_config(config: dict[str, Any]) -> None:
+    if not isinstance(config.get("unique-keys", False), bool):
+        msg = "expected a boolean for 'unique-keys'"
+        raise OddsproutConfigurationError(msg)
+    vocabulary = config.get("key-vocabulary", 1)
+    if not (
+        (_is_int(vocabulary) and vocabulary >= 1)
+        or (matches_type(vocabulary, list[str]) and vocabulary)
+    ):
+        msg = (
+            "expected a positive integer or a non-empty array of strings"
+            " for 'key-vocabulary'"
+        )
+        raise OddsproutConfigurationError(msg)
+    if not _is_non_negative(config.get("key-skew", 0)):
+        msg = "expected a non-negative number for 'key-skew'"
+        raise OddsproutConfigurationError(msg)
+
+
+def _check_weights_config(weights: object) -> None:
+    if not isinstance(weights, dict):
+        msg = "expected a table of type weights for 'weights'"
+        raise OddsproutConfigurationError(msg)
+    for type_, weight in weights.items():
+        if type_ not in VALID_TYPES:
+            msg = f"invalid type {type_!r} in 'weights'"
+            raise OddsproutConfigurationError(msg)
+        if not _is_non_negative(weight):
+            msg = f"expected a non-negative number for the weight of {type_!r}"
+            raise OddsproutConfigurationError(msg)
+
+
 def _transform_config(config: dict[str, dict[str, Any]]) -> Config:
     transformed = {}
     for key, value in config.get("bounds", {}).items():
+        if key in BUDGET_KEYS or key == "tolerance":
+            transformed[key.replace("-", "_")] = value
+            continue
         new_key = (key[:-4] if key.endswith("-max") else key) + "_size"
         transformed[new_key] = (0, value) if key.endswith("-max") else tuple(value)
     types_config = config.get("types", {})
@@ -161,7 +450,10 @@ def _transform_config(config: dict[str, dict[str, Any]]) -> Config:
     if excluded_types := types_config.pop("exclude", []):
         # assuming "include" is not defined based on prior checks
         transformed["types"] = tuple(sorted(set(VALID_TYPES) - set(excluded_types)))
-    transformed.update(types_config)
+    for key, value in types_config.items():
+        transformed[key.replace("-", "_")] = value
+    if isinstance(vocabulary := transformed.get("key_vocabulary"), list):
+        transformed["key_vocabulary"] = tuple(vocabulary)
     return Config(**cast(_ConfigData, transformed))
 
 
@@ -169,6 +461,12 @@ def load_config(path: PathLike[str] | str | None) -> Config:
     """Load and validate the configuration file."""
     if path is None:
         return Config()
+    # only needed with a config file
+    if sys.version_info < (3, 11):  # pragma: no cover
+        import tomli as toml
+    else:  # pragma: no cover
+        import tomllib as toml
+
     try:
         config = toml.loads(Path(path).read_text())
     except toml.TOMLDecodeError as e:
@@ -1,9 +1,16 @@
 import string
 
 BASE_TYPES = frozenset(("any", "array", "object"))
-BOUNDS_KEYS = frozenset(
-    ("collection", "collection-max", "base", "base-max", "string", "string-max")
-)
+BUDGET_KEYS = frozenset(("max-depth", "max-nodes", "max-bytes", "target-bytes"))
+BOUNDS_KEYS = BUDGET_KEYS | {
+    "tolerance",
+    "collection",
+    "collection-max",
+    "base",
+    "base-max",
+    "string",
+    "string-max",
+}
 CATEGORIES = frozenset(("bounds", "types"))
 CHARSETS = {
     "ascii": "".join(map(chr, range(128))),
@@ -11,8 +18,24 @@ CHARSETS = {
     "alnum": string.ascii_letters + string.digits,
     "digits": string.digits,
 }
+# the default weight of collection types against the default weight of 1 of
+# the other types
+COLLECTION_WEIGHT = 0.05
+DIVERGENCE_POLICIES = frozenset(("allow", "cap", "error"))
+RNG_KINDS = frozenset(("ixia", "mersenne", "pool"))
 VALID_TYPES = frozenset(
     ("int", "float", "number", "string", "boolean", "null", "array", "object")
 )
 DEFAULT_TYPES = ("int", "float", "string", "boolean", "null", "array", "object")
-TYPES_KEYS = frozenset(("charset", "base", "exclude", "include"))
+TYPES_KEYS = frozenset(
+    (
+        "charset",
+        "base",
+        "exclude",
+        "include",
+        "weights",
+        "unique-keys",
+        "key-vocabulary",
+        "key-skew",
+    )
+)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from oddsprout.encoder import Encoder
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator
+from oddsprout.parallel import dump_parallel
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from os import PathLike
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+    from oddsprout.configuration import Config
+    from oddsprout.generators import JSONValue
+
+INDEX_NAME = "index.bin"
+# The index starts with a magic number, followed by the shard, offset and
+# length of every document (in little-endian unsigned 32-bit integers)
+_INDEX_MAGIC = b"ODDSIDX1"
+_RECORD = struct.Struct("<III")
+_MAX_SHARD_SIZE = 1 << 32
+
+
+def shard_name(shard: int) -> str:
+    """Get the file name of the `shard`-th shard of a corpus."""
+    return f"shard-{shard:05}.ndjson"
+
+
+def write_corpus(
+    config: Config,
+    directory: str | PathLike[str],
+    n: int,
+    *,
+    shard_size: int = 1 << 28,
+    jobs: int = 1,
+) -> None:
+    """
+    Generate `n` random JSON values into NDJSON shards of up to `shard_size`
+    bytes (a value larger than that getting a shard of its own) in an empty or
+    nonexistent `directory`, along with an index of where each of them is.
+    Values are generated across `jobs` worker processes if more than one.
+    """
+    if n < 0:
+        msg = f"number of values can't be negative, got {n}"
+        raise OddsproutValueError(msg)
+    if not 0 < shard_size <= _MAX_SHARD_SIZE:
+        msg = f"shard size has to be in range [1, 2**32], got {shard_size}"
+        raise OddsproutValueError(msg)
+    path = Path(directory)
+    if path.exists() and not path.is_dir():
+        msg = f"{path} isn't a directory"
+        raise OddsproutValueError(msg)
+    if path.exists() and any(path.iterdir()):
+        msg = f"{path} isn't empty"
+        raise OddsproutValueError(msg)
+    path.mkdir(parents=True, exist_ok=True)
+
+    dumps = Encoder(None, config.charset)
+    texts: Iterator[str]
+    if jobs == 1:
+        texts = map(dumps, JSONGenerator(config).generate_many(n))
+    else:
+        texts = dump_parallel(config, n, dumps, jobs)
+
+    shard = -1
+    offset = 0
+    shard_file: BinaryIO | None = None
+    with (path / INDEX_NAME).open("wb") as index:
+        index.write(_INDEX_MAGIC)
+        try:
+            for text in texts:
+                data = text.encode() + b"\n"
+                if len(data) > _MAX_SHARD_SIZE:
+                    msg = f"values can't take more than 4 GiB, got {len(data):,} bytes"
+                    raise OddsproutValueError(msg)
+                # a shard is only started once the value doesn't fit the last one
+                if shard_file is None or offset + len(data) > shard_size:
+                    if shard_file is not None:
+                        shard_file.close()
+                    shard += 1
+                    offset = 0
+                    shard_file = (path / shard_name(shard)).open("wb")
+                # the newline isn't part of the value
+                index.write(_RECORD.pack(shard, offset, len(data) - 1))
+                shard_file.write(data)
+                offset += len(data)
+        finally:
+            if shard_file is not None:
+                shard_file.close()
+
+
+class Corpus:
+    """
+    A corpus written by `write_corpus`, reading any of its values in constant
+    time through memory-mapped shards.
+    """
+
+    def __init__(self, directory: str | PathLike[str]) -> None:
+        self._path = Path(directory)
+        with (self._path / INDEX_NAME).open("rb") as index:
+            self._index = _map(index.fileno())
+        size = len(self._index)
+        if (
+            size < len(_INDEX_MAGIC)
+            or self._index[: len(_INDEX_MAGIC)] != _INDEX_MAGIC
+            or (size - len(_INDEX_MAGIC)) % _RECORD.size
+        ):
+            self._index.close()
+            msg = f"{self._path / INDEX_NAME} isn't a corpus index"
+            raise OddsproutValueError(msg)
+        self._length = (size - len(_INDEX_MAGIC)) // _RECORD.size
+        # shards are mapped when first read from
+        self._shards: dict[int, mmap.mmap] = {}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self._path)!r})"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def read(self, index: int) -> bytes:
+        """Read the JSON text of the `index`-th value (counting from 0)."""
+        if not 0 <= index < self._length:
+            msg = f"corpus has {self._length} values, got index {index}"
+            raise OddsproutValueError(msg)
+        shard, offset, length = _RECORD.unpack_from(
+            self._index, len(_INDEX_MAGIC) + index * _RECORD.size
+        )
+        if (data := self._shards.get(shard)) is None:
+            with (self._path / shard_name(shard)).open("rb") as f:
+                data = self._shards[shard] = _map(f.fileno())
+        return data[offset : offset + length]
+
+    def load(self, index: int) -> JSONValue:
+        """Read and parse the `index`-th value (counting from 0)."""
+        value: JSONValue = json.loads(self.read(index))
+        return value
+
+    def close(self) -> None:
+        """Unmap the index and the shards."""
+        self._index.close()
+        for data in self._shards.values():
+            data.close()
+        self._shards.clear()
+
+
+def _map(fileno: int) -> mmap.mmap:
+    return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
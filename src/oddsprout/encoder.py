@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import partial
+from json.encoder import encode_basestring_ascii
+from typing import TYPE_CHECKING, Any, Callable, cast
+
+from oddsprout.constants import CHARSETS
+from oddsprout.exceptions import OddsproutValueError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
+    from oddsprout.configuration import Charset
+    from oddsprout.generators import JSONArray, JSONObject, JSONValue
+    from oddsprout.subtrees import SubtreePool
+
+# charsets whose characters never have to be escaped in JSON strings
+_PLAIN_CHARSETS = frozenset(("alpha", "alnum", "digits"))
+# collections nested deeper than this are encoded without recursion
+_MAX_RECURSIVE_LEVEL = 100
+# the indents of compact JSON at every level
+_NO_INDENTS: Mapping[int, str] = defaultdict(str)
+
+
+@dataclass(frozen=True)
+class Encoder:
+    """
+    A JSON encoder for generated values, producing the same text as
+    `json.dumps(value, indent=indent)` (or, with `indent=None`, as
+    `json.dumps(value, separators=(",", ":"))`). Strings are assumed to only
+    contain characters of `charset`, which lets escaping be skipped for
+    charsets without any characters to escape. With a `subtrees` pool (and an
+    indent), the text of pooled subtrees is cached in the pool and reused.
+    """
+
+    indent: int | None = 2
+    charset: Charset = "ascii"
+    subtrees: SubtreePool | None = field(default=None, compare=False)
+    _encode: Callable[[JSONValue], str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.indent is not None and self.indent < 0:
+            msg = f"indent can't be negative, got {self.indent}"
+            raise OddsproutValueError(msg)
+        if self.charset not in CHARSETS:
+            msg = f"invalid charset {self.charset!r}"
+            raise OddsproutValueError(msg)
+        encode: Callable[[JSONValue], str]
+        quote = _quote if self.charset in _PLAIN_CHARSETS else encode_basestring_ascii
+        if self.indent is None:
+            encode = _CompactEncoder(quote)
+        else:
+            encode = _IndentedEncoder(self.indent, quote, self.subtrees)
+        object.__setattr__(self, "_encode", encode)
+
+    def __call__(self, value: JSONValue) -> str:
+        """Encode a value as JSON text."""
+        return self._encode(value)
+
+
+class _CompactEncoder:
+    # The C encoder json.dumps uses without an indent is hard to beat, but it
+    # recurses, so values nested too deep for it are encoded iteratively
+
+    def __init__(self, quote: Callable[[str], str]) -> None:
+        self._quote = quote
+        self._encode = json.JSONEncoder(
+            separators=(",", ":"), check_circular=False
+        ).encode
+        self._leaf_encoders = _leaf_encoders(quote)
+
+    def __reduce__(self) -> tuple[type, tuple[Callable[[str], str]]]:
+        return type(self), (self._quote,)
+
+    def __call__(self, value: JSONValue) -> str:
+        try:
+            return self._encode(value)
+        except RecursionError:
+            return _encode_iteratively(value, 0, _NO_INDENTS, self._leaf_encoders, ":")
+
+
+class _IndentedEncoder:
+    # json.dumps falls back to a generic pure-Python encoder with an indent;
+    # this one only handles the types oddsprout generates, skipping the checks
+    # for circular references, non-string keys and non-finite floats, and
+    # joins the children of each collection at once
+
+    def __init__(
+        self,
+        indent: int,
+        quote: Callable[[str], str],
+        subtrees: SubtreePool | None = None,
+    ) -> None:
+        self._indent = indent
+        self._quote = quote
+        self._subtrees = subtrees
+        self._indents = Indents(indent)
+        self._leaf_encoders = _leaf_encoders(quote)
+        self._dispatchers: list[dict[type, Callable[[Any], str]]] = []
+
+    def __reduce__(
+        self,
+    ) -> tuple[type, tuple[int, Callable[[str], str], SubtreePool | None]]:
+        return type(self), (self._indent, self._quote, self._subtrees)
+
+    def __call__(self, value: JSONValue) -> str:
+        return self._dispatcher(0)[type(value)](value)
+
+    def _dispatcher(self, level: int) -> dict[type, Callable[[Any], str]]:
+        # Encoders of the values at `level` (the root being at level 0) by their
+        # type, those of collections encoding their children with the next one
+        while len(self._dispatchers) <= level:
+            self._dispatchers.append(self._make_dispatcher(len(self._dispatchers)))
+        return self._dispatchers[level]
+
+    def _make_dispatcher(self, level: int) -> dict[type, Callable[[Any], str]]:
+        dispatcher = self._leaf_encoders.copy()
+        if level >= _MAX_RECURSIVE_LEVEL:
+            dispatcher[dict] = dispatcher[list] = partial(
+                _encode_iteratively,
+                level=level,
+                indents=self._indents,
+                leaf_encoders=self._leaf_encoders,
+                colon=": ",
+            )
+            return dispatcher
+        quote = self._quote
+        opening = self._indents[level + 1]
+        closing = self._indents[level]
+        separator = "," + opening
+
+        def encode_object(obj: JSONObject) -> str:
+            if not obj:
+                return "{}"
+            encoders = self._dispatcher(level + 1)
+            members = [
+                quote(key) + ": " + encoders[type(child)](child)
+                for key, child in obj.items()
+            ]
+            return "{" + opening + separator.join(members) + closing + "}"
+
+        def encode_array(array: JSONArray) -> str:
+            if not array:
+                return "[]"
+            encoders = self._dispatcher(level + 1)
+            elements = [encoders[type(child)](child) for child in array]
+            return "[" + opening + separator.join(elements) + closing + "]"
+
+        dispatcher[dict] = self._reusing(encode_object, level)
+        dispatcher[list] = self._reusing(encode_array, level)
+        return dispatcher
+
+    def _reusing(
+        self, encode: Callable[[Any], str], level: int
+    ) -> Callable[[Any], str]:
+        # Pooled subtrees are only encoded once, their text being cached without
+        # the indent of their level and reindented wherever they're reused
+        if (subtrees := self._subtrees) is None:
+            return encode
+        width = self._indent
+        indent = self._indents[level]
+
+        def encode_reused(collection: JSONValue) -> str:
+            if (text := subtrees.text(collection, width)) is not None:
+                return text.replace("\n", indent) if level else text
+            text = encode(collection)
+            if collection in subtrees:
+                dedented = text.replace(indent, "\n") if level else text
+                subtrees.cache_text(collection, width, dedented)
+            return text
+
+        return encode_reused
+
+
+class Indents(dict[int, str]):
+    """
+    The newline and indentation starting a line at each nesting level, computed
+    on first use.
+    """
+
+    def __init__(self, width: int) -> None:
+        super().__init__()
+        self._width = width
+
+    def __missing__(self, level: int) -> str:
+        self[level] = indent = "\n" + " " * (self._width * level)
+        return indent
+
+
+def _encode_iteratively(
+    value: JSONValue,
+    level: int,
+    indents: Mapping[int, str],
+    leaf_encoders: dict[type, Callable[[Any], str]],
+    colon: str,
+) -> str:
+    # Encodes values nested too deep for recursion
+    quote = leaf_encoders[str]
+    if not value:
+        return leaf_encoders[type(value)](value)
+    parts = ["{" if type(value) is dict else "["]
+    append = parts.append
+    # the items of the open collections, along with whether they're objects
+    stack: list[tuple[Iterator[Any], bool]] = [_iter_items(value)]
+    first = True
+    while stack:
+        items, is_object = stack[-1]
+        indent = indents[level + len(stack)]
+        for item in items:
+            append(indent if first else "," + indent)
+            first = False
+            if is_object:
+                key, child = item
+                append(quote(key))
+                append(colon)
+            else:
+                child = item
+            if (type(child) is dict or type(child) is list) and child:
+                append("{" if type(child) is dict else "[")
+                stack.append(_iter_items(child))
+                first = True
+                break
+            append(leaf_encoders[type(child)](child))
+        else:
+            stack.pop()
+            append(indents[level + len(stack)] + ("}" if is_object else "]"))
+    return "".join(parts)
+
+
+def _leaf_encoders(quote: Callable[[str], str]) -> dict[type, Callable[[Any], str]]:
+    return {
+        str: quote,
+        int: int.__repr__,
+        float: float.__repr__,
+        bool: {True: "true", False: "false"}.__getitem__,
+        type(None): lambda _: "null",
+        # empty collections
+        dict: lambda _: "{}",
+        list: lambda _: "[]",
+    }
+
+
+# The encoders of leaves and empty collections by type, for pure-ASCII output
+LEAF_ENCODERS = _leaf_encoders(encode_basestring_ascii)
+
+
+def _iter_items(collection: JSONValue) -> tuple[Iterator[Any], bool]:
+    if type(collection) is dict:
+        return iter(collection.items()), True
+    return iter(cast(list[Any], collection)), False
+
+
+def _quote(text: str) -> str:
+    return f'"{text}"'
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii
+from typing import TYPE_CHECKING
+
+from oddsprout.constants import CHARSETS
+from oddsprout.rng import zipf_weights
+
+if TYPE_CHECKING:
+    from oddsprout.configuration import Config
+
+# mean length of repr() of the floats generated in [-1_000_000, 1_000_000)
+_FLOAT_WIDTH = 17.66
+_INT_RANGE = (-1_000_000, 1_000_000)
+_TAIL_DEPTHS = (2, 5, 10, 20, 50, 100, 1000)
+# keys less likely than this (times the size of an object) are assumed not to
+# repeat within objects
+_NEGLIGIBLE_COLLISIONS = 1e-6
+
+
+@dataclass(frozen=True)
+class SizeEstimate:
+    """The expected size of the values generated with a config."""
+
+    # expected number of children of a node below the root
+    branching_factor: float
+    expected_nodes: float
+    # as indented JSON
+    expected_bytes: float
+    # probabilities of values nesting deeper than the given depths
+    depth_tail: dict[int, float]
+
+    @property
+    def diverges(self) -> bool:
+        """Whether the expected size of the values is infinite."""
+        return math.isinf(self.expected_nodes)
+
+    def format(self) -> str:
+        """Format the estimate as a human-readable report."""
+        lines = [
+            f"branching factor: {self.branching_factor:.4f}",
+            f"expected nodes: {_format_size(self.expected_nodes)}",
+            f"expected bytes: {_format_size(self.expected_bytes)}",
+            *(f"P(depth > {depth}): {p:.4g}" for depth, p in self.depth_tail.items()),
+        ]
+        return "\n".join(lines)
+
+
+def estimate_size(config: Config) -> SizeEstimate:
+    """
+    Estimate the expected size of the values generated with `config`,
+    modeling generation as a branching process. Budgets (`max_nodes`,
+    `max_bytes` and `target_bytes`) aren't taken into account, and neither
+    are repeated keys shrinking objects in the depth tail.
+    """
+    return _Model(config).estimate()
+
+
+def capped_depth(config: Config, max_nodes: float) -> int:
+    """
+    Find the largest `max_depth` (of at least 1) keeping the expected number
+    of nodes of values generated with `config` under `max_nodes`.
+    """
+    low, high = 1, 2
+    while _Model(config, high).expected_nodes() <= max_nodes:
+        low, high = high, high * 2
+    # the expected number of nodes grows with max_depth
+    while high - low > 1:
+        mid = (low + high) // 2
+        if _Model(config, mid).expected_nodes() <= max_nodes:
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+class _Model:
+    # Nodes below the root form generations, the k-th one being at depth k + 2.
+    # Every generation but the last one is drawn from all types and has its
+    # collections filled; the last one (if max_depth is set) is drawn from
+    # leaf types only, or consists of empty collections.
+
+    def __init__(self, config: Config, max_depth: int | None = None) -> None:
+        if max_depth is None:
+            max_depth = config.max_depth
+        weights = {t: w for t, w in config.type_weights().items() if w}
+        collections = {t: w for t, w in weights.items() if t in {"object", "array"}}
+        leaves = {t: w for t, w in weights.items() if t not in collections}
+        collection_weight = sum(collections.values())
+        self.collection_chance = collection_weight / sum(weights.values())
+        object_chance = (
+            collections.get("object", 0) / collection_weight if collections else 0.0
+        )
+        root_object_chance = {"any": 0.5, "object": 1.0, "array": 0.0}[config.base]
+        self.max_depth = max_depth
+        self.base_size = config.base_size
+        low, high = config.collection_size
+        self.collection_size = (low, high)
+        self.nonempty_chance = 1 - (low == 0) / (high - low + 1)
+        # Objects only keep one child per distinct key, so the shares of
+        # children with an object parent are weighed by the sizes they end up
+        self.mean_base_size, self.root_object_share = _mean_collection_size(
+            config, root_object_chance, *config.base_size
+        )
+        mean_size, self.object_share = _mean_collection_size(
+            config, object_chance, low, high
+        )
+        self.branching_factor = self.collection_chance * mean_size
+
+        char_width = _mean_char_width(CHARSETS[config.charset])
+        string_width = 2 + sum(config.string_size) / 2 * char_width
+        self.key_width = _mean_key_width(config, string_width) + 2  # and ": "
+        widths = {
+            "int": _mean_int_width(*_INT_RANGE),
+            "float": _FLOAT_WIDTH,
+            "string": string_width,
+            "boolean": 4.5,
+            "null": 4.0,
+        }
+        self.leaf_width = (
+            sum(widths[t] * w for t, w in leaves.items()) / sum(leaves.values())
+            if leaves
+            else 0
+        )
+        self.has_leaves = bool(leaves)
+
+        # Number of generations below the root
+        if max_depth is None:
+            self.generations = math.inf
+        else:
+            fill_depth = max_depth - (not leaves)
+            self.generations = max(fill_depth - 1, 0) + 1
+
+    def estimate(self) -> SizeEstimate:
+        return SizeEstimate(
+            self.branching_factor,
+            self.expected_nodes(),
+            self.expected_bytes(),
+            {d: self.depth_tail(d) for d in _TAIL_DEPTHS},
+        )
+
+    def _inner_generations(self) -> float:
+        return self.generations - 1 if math.isfinite(self.generations) else math.inf
+
+    def _last_generation_size(self) -> float:
+        if math.isinf(self.generations):
+            return 0.0
+        try:
+            return float(self.branching_factor ** self._inner_generations())
+        except OverflowError:
+            return math.inf
+
+    def expected_nodes(self) -> float:
+        if not self.mean_base_size:
+            return 1.0
+        inner, _ = _geometric_sums(self.branching_factor, self._inner_generations())
+        return 1 + self.mean_base_size * (inner + self._last_generation_size())
+
+    def expected_bytes(self) -> float:
+        # Every node below the root takes an indent of 2 * depth - 1 characters
+        # and a comma (a key and ": " in objects) on top of its own text;
+        # non-empty collections take another indent before their closing
+        # bracket but have one comma fewer than children
+        if not self.mean_base_size:
+            return 2.0
+        n = self._inner_generations()
+        s0, s1 = _geometric_sums(self.branching_factor, n)
+        if math.isinf(s0):
+            # the terms of types with a weight of 0 would make it NaN
+            return math.inf
+        p_c = self.collection_chance
+        closing = 2 * p_c * self.nonempty_chance
+        value = (1 - p_c) * self.leaf_width + 2 * p_c
+        keys = self.key_width * (
+            self.object_share * s0
+            + (self.root_object_share - self.object_share) * (n > 0)
+        )
+        inner = s1 * (2 + closing) + s0 * (4 + value + closing) + keys
+
+        last = 0.0
+        if math.isfinite(n):
+            parent = self.object_share if n else self.root_object_share
+            last_value = self.leaf_width if self.has_leaves else 2
+            last_size = self._last_generation_size()
+            if last_size:
+                last = last_size * (2 * n + 4 + parent * self.key_width + last_value)
+        return 2 + self.mean_base_size * (inner + last)
+
+    def depth_tail(self, depth: int) -> float:
+        # The probability of a subtree of a root child not containing
+        # collections more than j levels below it, for j = 0, 1, ..., is
+        # obtained by iterating the generating function of the number of
+        # children (the depths below max_depth behave as if it wasn't set)
+        if depth < 1:
+            return 1.0
+        if self.max_depth is not None and depth >= self.max_depth:
+            return 0.0
+        p_c = self.collection_chance
+        shallow = 1 - p_c
+        for _ in range(depth - 1):
+            shallow = 1 - p_c + p_c * _mean_power(shallow, *self.collection_size)
+        return 1 - _mean_power(shallow, *self.base_size)
+
+
+def _geometric_sums(ratio: float, n: float) -> tuple[float, float]:
+    # sum(ratio**k) and sum(k * ratio**k) for k in range(n)
+    if not n:
+        return 0.0, 0.0
+    if math.isinf(n):
+        if ratio >= 1:
+            return math.inf, math.inf
+        return 1 / (1 - ratio), ratio / (1 - ratio) ** 2
+    if abs(ratio - 1) < 1e-12:
+        return n, n * (n - 1) / 2
+    try:
+        power = ratio**n
+    except OverflowError:
+        return math.inf, math.inf
+    s0 = (1 - power) / (1 - ratio)
+    s1 = (ratio - n * power + (n - 1) * power * ratio) / (1 - ratio) ** 2
+    return s0, s1
+
+
+def _mean_power(x: float, low: int, high: int) -> float:
+    # mean of x**k for k in [low, high]
+    n = high - low + 1
+    if x == 1:
+        return 1.0
+    return x**low * (1 - x**n) / (n * (1 - x))
+
+
+def _mean_collection_size(
+    config: Config, object_chance: float, low: int, high: int
+) -> tuple[float, float]:
+    # The mean size of collections drawn with sizes in [low, high] that are
+    # objects with object_chance, and the share of their children in objects
+    array_size = (low + high) / 2
+    object_size = _mean_object_size(config, low, high) if object_chance else 0.0
+    mean = object_chance * object_size + (1 - object_chance) * array_size
+    return mean, object_chance * object_size / mean if mean else object_chance
+
+
+def _mean_object_size(config: Config, low: int, high: int) -> float:
+    # Without unique keys, an object of size n has as many children as the
+    # distinct keys among the n drawn, so a key of probability p contributes
+    # 1 - (1 - p) ** n. Keys are grouped by probability, each group given as
+    # the probability of one of its keys and of the whole group; collisions
+    # are negligible in groups of keys unlikely enough.
+    mean = (low + high) / 2
+    if config.unique_keys:
+        return mean
+    groups: list[tuple[float, float]]
+    if (vocabulary := config.key_vocabulary) is not None:
+        size = len(vocabulary) if isinstance(vocabulary, tuple) else vocabulary
+        weights = zipf_weights(size, config.key_skew)
+        total = sum(weights)
+        groups = [(w / total, w / total) for w in weights]
+    else:
+        shortest, longest = config.string_size
+        lengths = longest - shortest + 1
+        base = len(CHARSETS[config.charset])
+        groups = [
+            (1 / (lengths * base**length), 1 / lengths)
+            for length in range(shortest, longest + 1)
+        ]
+    return sum(
+        share * mean
+        if p * high < _NEGLIGIBLE_COLLISIONS
+        else share / p * (1 - _mean_power(1 - p, low, high))
+        for p, share in groups
+    )
+
+
+def _mean_key_width(config: Config, string_width: float) -> float:
+    # keys drawn from a random vocabulary are as wide as strings on average
+    if not isinstance(vocabulary := config.key_vocabulary, tuple):
+        return string_width
+    weights = zipf_weights(len(vocabulary), config.key_skew)
+    widths = [len(encode_basestring_ascii(key)) for key in vocabulary]
+    return sum(w * width for w, width in zip(weights, widths)) / sum(weights)
+
+
+def _mean_char_width(charset: str) -> float:
+    return sum(len(encode_basestring_ascii(c)) - 2 for c in charset) / len(charset)
+
+
+def _mean_int_width(low: int, high: int) -> float:
+    total = 0
+    for start, end, sign in ((max(low, 0), high, 0), (max(-high, 1), -low, 1)):
+        # numbers in [start, end], grouped by their number of digits
+        for digits in range(1, len(str(end)) + 1):
+            band_start = max(start, 10 ** (digits - 1) if digits > 1 else 0)
+            band_end = min(end, 10**digits - 1)
+            if band_start <= band_end:
+                total += (band_end - band_start + 1) * (digits + sign)
+    return total / (high - low + 1)
+
+
+def _format_size(size: float) -> str:
+    return "infinite" if math.isinf(size) else f"{size:,.0f}"
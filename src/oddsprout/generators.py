@@ -1,50 +1,193 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Union
-
-from ixia import choice, choices, rand_bool, rand_int, uniform
+import sys
+from collections import Counter, deque
+from functools import lru_cache, partial
+from itertools import accumulate, product
+from json.encoder import encode_basestring_ascii
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Optional, Protocol, Union, cast
 
+from oddsprout.binary import BINARY_ENCODERS
 from oddsprout.configuration import Config
 from oddsprout.constants import CHARSETS
-from oddsprout.exceptions import OddsproutRecursionError
+from oddsprout.encoder import LEAF_ENCODERS, Encoder, Indents
+from oddsprout.estimate import capped_depth, estimate_size
+from oddsprout.exceptions import OddsproutRecursionError, OddsproutValueError
+from oddsprout.lazy import LazyArray, LazyObject
+from oddsprout.rng import (
+    alias_sampler,
+    create_rng,
+    derive_seed,
+    int_sampler,
+    randints,
+    random_text,
+    uniforms,
+    zipf_weights,
+)
+from oddsprout.stats import GenerationStats
+from oddsprout.subtrees import SubtreePool
+from oddsprout.tape import Tape
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import AsyncIterator, Collection, Iterable, Iterator
+    from concurrent.futures import Executor
+    from random import Random
+
+    from _typeshed import SupportsWrite
+
+    from oddsprout.lazy import LazyChild, LazyValue
 
 JSONObject = dict[str, "JSONValue"]
 JSONArray = list["JSONValue"]
 JSONValue = Union[JSONObject, JSONArray, str, int, float, bool, None]
 NoneType = type(None)
+# Generates a given number of values of one type at once
+BatchGenerator = Callable[[int], list[Any]]
+# The maximum number of children of a collection drawn at once
+_BATCH_SIZE = 128
+# The number of batches of children async generation draws between giving
+# control back to the event loop
+_BATCHES_PER_PAUSE = 32
+# The expected number of nodes per value that diverging configs are capped at
+_DIVERGENCE_CAP = 1_000_000
+
+
+class AsyncWriter(Protocol):
+    """A writer of bytes that can be waited on, e.g. `asyncio.StreamWriter`."""
+
+    def write(self, data: bytes, /) -> object:
+        """Buffer `data` to be written."""
+
+    async def drain(self) -> None:
+        """Wait until the buffered data can be written further."""
+
+
+_INDENTS = Indents(2)
+_TYPE_NAMES = {
+    dict: "object",
+    list: "array",
+    str: "string",
+    int: "int",
+    float: "float",
+    bool: "boolean",
+    NoneType: "null",
+}
 
 
 class JSONGenerator:
     """A JSON value generator."""
 
-    def __init__(self, config: Config | None = None) -> None:
+    def __init__(self, config: Config | None = None, *, stats: bool = False) -> None:
         if config is None:
             config = Config()
 
-        type_map: dict[str, Callable[[], JSONValue]] = {
-            "object": self._generate_object,
-            "array": self._generate_array,
-            "string": self._generate_string,
-            "int": _generate_int,
-            "float": _generate_float,
-            "boolean": rand_bool,
-            "null": NoneType,
-        }
-        types = list(config.types)
-        if "number" in types:
-            types.remove("number")
-            types.extend(("int", "float"))
-        self._type_pool = tuple(type_map[t] for t in types)
-        self._weights = tuple(0.05 if t in {"object", "array"} else 1 for t in types)
-
         self._config = config
+        self._rng = create_rng(config.rng_kind())
+        self._seed = config.seed
+        self._document_count = 0
         self._string_size = config.string_size
         self._collection_size = config.collection_size
         self._charset = CHARSETS[config.charset]
 
+        type_map: dict[str, BatchGenerator] = {
+            "object": _new_objects,
+            "array": _new_arrays,
+            "string": self._string_generator(),
+            "int": int_sampler(self._rng, -1_000_000, 1_000_000),
+            "float": self._generate_floats,
+            "boolean": self._generate_bools,
+            "null": _generate_nulls,
+        }
+        self._generate_keys = type_map["string"]
+        self._key_pool = self._build_key_pool(config.key_vocabulary)
+        if self._key_pool is not None:
+            self._generate_keys = alias_sampler(
+                self._rng,
+                self._key_pool,
+                zipf_weights(len(self._key_pool), config.key_skew),
+            )
+        # Timing wraps the generators of each type, so that disabled stats
+        # don't cost anything there; everything else is counted where values
+        # are generated
+        self._stats = GenerationStats() if stats else None
+        if self._stats is not None:
+            self._time_generators(self._stats, type_map)
+        self._collection_makers = {type_map["object"], type_map["array"]}
+        # types are ordered, so that seeded output doesn't depend on set
+        # ordering, and those with a weight of 0 are never drawn
+        weights = {t: w for t, w in config.type_weights().items() if w}
+        self._type_pool = tuple(type_map[t] for t in weights)
+        self._weights = tuple(weights.values())
+        # Drawn from once the maximum depth is reached
+        leaf_types = [t for t in weights if t not in {"object", "array"}]
+        self._leaf_pool = tuple(type_map[t] for t in leaf_types) or self._type_pool
+        self._leaf_weights = tuple(weights[t] for t in leaf_types) or self._weights
+
+        # Budgets bound the size of values, making the recursion and
+        # divergence guards unnecessary. A target size is a byte budget that
+        # the root keeps drawing children for until it's within the tolerance.
+        self._max_nodes = config.max_nodes
+        self._max_bytes = config.max_bytes
+        self._target = config.target_bytes
+        if self._target is not None:
+            self._target = self._max_bytes = min(
+                self._target, self._max_bytes or self._target
+            )
+        self._slack = int((self._target or 0) * config.tolerance)
+        self._fills_with_strings = "string" in weights
+        # A member overwritten by a repeated key would take up room in byte
+        # budgets without being part of the value, so keys are kept distinct
+        # within objects, with objects capped at the number of possible keys
+        # (which configs with unique_keys are already checked against)
+        self._unique_keys = config.unique_keys or self._max_bytes is not None
+        # The key space is only compared against twice the number of keys
+        # an object could take up with a batch of children drawn on top
+        # (see _draw_keys), so it doesn't have to be counted exactly past that
+        self._key_space = (
+            config.key_space(
+                2 * max(*config.collection_size, *config.base_size, self._target or 0)
+                + 2 * _BATCH_SIZE
+            )
+            if self._unique_keys
+            else sys.maxsize
+        )
+        self._object_size_cap = (
+            self._key_space
+            if self._unique_keys and config.collection_size[1] > self._key_space
+            else None
+        )
+        self._budgeted = self._max_nodes is not None or self._max_bytes is not None
+        self._reuse = config.subtree_reuse
+        self._subtree_pool = (
+            SubtreePool(config.subtree_pool_size) if self._reuse else None
+        )
+        # the number of nodes of the subtrees completed (or reused) in the value
+        # being generated, by their id (holding onto them so that ids stay unique)
+        self._subtree_nodes: dict[int, tuple[JSONValue, int]] = {}
+        self._pooled_encoder: Encoder | None = None
+
+        # Collections deeper than this are left empty; if only collections are
+        # allowed, that's one level earlier so that the maximum depth holds
+        max_depth = config.max_depth
+        bounded = max_depth is not None or self._budgeted
+        if not bounded and config.divergence != "allow":
+            max_depth = _check_divergence(config)
+        self._max_depth = sys.maxsize if max_depth is None else max_depth
+        self._fill_depth = self._max_depth - (not leaf_types)
+        # Without any bounds (including a capped depth), values nested deeper than
+        # the recursion limit are taken for ones that would keep nesting
+        # indefinitely (e.g. with only arrays)
+        self._overflow_depth = (
+            None if max_depth is not None or self._budgeted else sys.getrecursionlimit()
+        )
+        self._reset_budgets()
+        self._draw_collection_sizes = int_sampler(self._rng, *config.collection_size)
+        self._draw_types = alias_sampler(self._rng, self._type_pool, self._weights)
+        self._draw_leaf_types = alias_sampler(
+            self._rng, self._leaf_pool, self._leaf_weights
+        )
+
     def __repr__(self) -> str:
         return f"{type(self).__name__}(config={self._config})"
 
@@ -53,44 +196,956 @@ class JSONGenerator:
         """The config used by the generator."""
         return self._config
 
+    @property
+    def rng(self) -> Random:
+        """The random number generator used by the generator."""
+        return self._rng
+
+    @property
+    def stats(self) -> GenerationStats | None:
+        """The collected generation stats, or None if they aren't collected."""
+        return self._stats
+
+    @property
+    def subtree_pool(self) -> SubtreePool | None:
+        """The pool of reused subtrees, or None if subtrees aren't reused."""
+        return self._subtree_pool
+
     def generate_value(self) -> JSONValue:
         """Generate a random JSON value."""
+        document = self._document_count
+        self._document_count += 1
+        return self._generate_root(document)
+
+    def generate_many(self, n: int) -> Iterator[JSONValue]:
+        """Lazily generate `n` random JSON values."""
+        if n < 0:
+            msg = f"number of values can't be negative, got {n}"
+            raise OddsproutValueError(msg)
+        return (self.generate_value() for _ in range(n))
+
+    def generate_document(self, index: int) -> JSONValue:
+        """
+        Regenerate the `index`-th value (counting from 0) generated with
+        the configured seed.
+        """
+        self._check_reproducible(index)
+        return self._generate_root(index)
+
+    def generate_child(self, document: int, index: int) -> JSONValue:
+        """
+        Regenerate the `index`-th child of the `document`-th value generated with
+        the configured seed. The child is returned wrapped in a collection of
+        the document's base type, i.e. `{key: child}` or `[child]`.
+        """
+        self._check_reproducible(document)
+        self._check_per_child("regenerating children")
+        base, size = self._draw_root(document)
+        if not 0 <= index < size:
+            msg = f"document {document} has {size} children, got index {index}"
+            raise OddsproutValueError(msg)
+        # unique keys depend on the keys of the previous children
+        used_keys: set[str] = set()
+        if self._unique_keys and base == "object":
+            for i in range(index):
+                self._use_stream(document, i)
+                used_keys.update(self._draw_keys(1, used_keys))
+        key, value = self._generate_root_child(document, index, base, used_keys)
+        return [value] if key is None else {key: value}
+
+    def generate_tape(self, n: int) -> Tape:
+        """
+        Generate `n` random JSON values (the same ones `generate_many` would)
+        into a `Tape`, holding them far more compactly than Python objects.
+        """
+        if n < 0:
+            msg = f"number of values can't be negative, got {n}"
+            raise OddsproutValueError(msg)
+        # values only exist as Python objects one at a time
+        tape = Tape()
+        for _ in range(n):
+            tape.append(self.generate_value())
+        return tape
+
+    def generate_binary(self, fmt: str = "msgpack") -> bytes:
+        """
+        Generate a random JSON value encoded in a binary format, either
+        MessagePack (`"msgpack"`) or CBOR (`"cbor"`).
+        """
+        if (encode := BINARY_ENCODERS.get(fmt)) is None:
+            msg = f"invalid binary format {fmt!r} (valid options: 'cbor', 'msgpack')"
+            raise OddsproutValueError(msg)
+        return encode(self.generate_value())
+
+    def generate_lazy(self) -> LazyValue:
+        """
+        Generate a random JSON value as a read-only mapping or sequence whose
+        children are only generated when first accessed. With a seed, children
+        of the root are generated whole, giving the value `generate_value` would
+        have generated; otherwise, collections are lazy at every depth.
+        """
+        self._check_per_child("lazy generation")
+        if self._stats is not None:
+            self._stats.values += 1
+        document = self._document_count
+        self._document_count += 1
+        base, size = self._draw_root(document)
+        if self._seed is None:
+            return self._lazy_collection(size, 1, is_object=base == "object")
+        if base == "array":
+            return LazyArray(size, partial(self._load_root_child, document, None))
+        # the key of each child is the first thing drawn from its stream
+        keys: list[str] = []
+        for i in range(size):
+            self._use_stream(document, i)
+            keys += self._draw_keys(1, keys if self._unique_keys else ())
+        return LazyObject(keys, partial(self._load_root_child, document, keys))
+
+    def iter_chunks(self, chunk_size: int = 1 << 16) -> Iterator[str]:
+        """
+        Generate a random JSON value and yield it as indented JSON text in chunks
+        of roughly `chunk_size` characters, without building the value in memory
+        (unless subtrees are reused).
+        """
+        if self._subtree_pool is not None:
+            yield from self._iter_pooled_chunks(chunk_size)
+            return
+        document = self._document_count
+        self._document_count += 1
+        stats = self._stats
+        if stats is not None:
+            stats.values += 1
+        buffer: list[str] = []
+        buffered = 0
+        for token in self._iter_root_tokens(document):
+            buffer.append(token)
+            buffered += len(token)
+            if buffered >= chunk_size:
+                if stats is not None:
+                    stats.bytes_emitted += buffered
+                yield "".join(buffer)
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            if stats is not None:
+                stats.bytes_emitted += buffered
+            yield "".join(buffer)
+
+    def write_to(self, fp: SupportsWrite[str], chunk_size: int = 1 << 16) -> None:
+        """Generate a random JSON value and write it as indented JSON text to `fp`."""
+        for chunk in self.iter_chunks(chunk_size):
+            fp.write(chunk)
+
+    def agenerate(
+        self, n: int, *, executor: Executor | None = None
+    ) -> AsyncIterator[JSONValue]:
+        """
+        Asynchronously generate `n` random JSON values, the same ones
+        `generate_many` would. Values are generated when the consumer asks for
+        them, in the event loop (giving control back every few thousand nodes)
+        or, if given, in `executor` (e.g. a `ThreadPoolExecutor`).
+        """
+        if n < 0:
+            msg = f"number of values can't be negative, got {n}"
+            raise OddsproutValueError(msg)
+        if executor is None:
+            return self._agenerate(n)
+        return _run_in_executor(executor, iter(self.generate_value, object()), stop=n)
+
+    def aiter_chunks(
+        self, chunk_size: int = 1 << 16, *, executor: Executor | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronously generate a random JSON value as chunks of indented JSON
+        text, like `iter_chunks`. Chunks are generated when the consumer asks
+        for them, in the event loop (giving control back after every chunk)
+        or, if given, in `executor` (e.g. a `ThreadPoolExecutor`).
+        """
+        chunks = self.iter_chunks(chunk_size)
+        if executor is None:
+            return _pause_between(chunks)
+        return _run_in_executor(executor, chunks)
+
+    async def awrite_to(
+        self,
+        writer: AsyncWriter,
+        chunk_size: int = 1 << 16,
+        *,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Generate a random JSON value and write it as indented JSON text to
+        an `asyncio.StreamWriter`-like `writer`, waiting for it to drain after
+        every chunk.
+        """
+        async for chunk in self.aiter_chunks(chunk_size, executor=executor):
+            writer.write(chunk.encode())
+            await writer.drain()
+
+    def _iter_pooled_chunks(self, chunk_size: int) -> Iterator[str]:
+        # The value is built in memory, so that reused subtrees can be written
+        # from the text cached in the pool
+        if self._pooled_encoder is None:
+            self._pooled_encoder = Encoder(
+                2, self._config.charset, subtrees=self._subtree_pool
+            )
+        text = self._pooled_encoder(self.generate_value())
+        if self._stats is not None:
+            self._stats.bytes_emitted += len(text)
+        for start in range(0, len(text), chunk_size):
+            yield text[start : start + chunk_size]
+
+    async def _agenerate(self, n: int) -> AsyncIterator[JSONValue]:
+        # imported here, as most uses of oddsprout don't need it
+        import asyncio
+
+        for _ in range(n):
+            document = self._document_count
+            self._document_count += 1
+            root, steps = self._start_root(document)
+            for i, _ in enumerate(steps, 1):
+                if not i % _BATCHES_PER_PAUSE:
+                    await asyncio.sleep(0)
+            yield root
+
+    def _time_generators(
+        self, stats: GenerationStats, type_map: dict[str, BatchGenerator]
+    ) -> None:
+        def timed(name: str, generate: BatchGenerator) -> BatchGenerator:
+            def wrapper(count: int) -> list[Any]:
+                start = perf_counter()
+                values = generate(count)
+                elapsed = perf_counter() - start
+                stats.timings[name] = stats.timings.get(name, 0.0) + elapsed
+                return values
+
+            return wrapper
+
+        # nodes are counted once they make it into a value (see _count_children),
+        # as budgets can drop them or replace them after they're generated
+        for type_, generate in type_map.items():
+            type_map[type_] = timed(type_, generate)
+        self._generate_keys = timed("key", self._generate_keys)
+
+    def _check_per_child(self, action: str) -> None:
+        if self._subtree_pool is not None:
+            msg = f"{action} isn't supported with subtree_reuse"
+            raise OddsproutValueError(msg)
+        if self._budgeted:
+            msg = f"{action} isn't supported with max_nodes, max_bytes or target_bytes"
+            raise OddsproutValueError(msg)
+
+    def _generate_root_child(
+        self, document: int, index: int, base: str, used_keys: Collection[str]
+    ) -> tuple[str | None, JSONValue]:
+        self._reset_budgets()
+        key, value, child_size = cast(
+            tuple[Optional[str], JSONValue, int],
+            self._draw_root_child(document, index, base, used_keys, first=True),
+        )
+        if child_size:
+            _exhaust(self._fill(value, child_size, 2))
+        return key, value
+
+    def _load_root_child(
+        self, document: int, keys: list[str] | None, index: int
+    ) -> JSONValue:
+        # Generates a child of a seeded lazy root of the given keys (None for
+        # arrays), redrawing its key
+        base = "array" if keys is None else "object"
+        used_keys = keys[:index] if keys is not None and self._unique_keys else ()
+        return self._generate_root_child(document, index, base, used_keys)[1]
+
+    def _lazy_collection(self, size: int, depth: int, *, is_object: bool) -> LazyValue:
+        # Children of unseeded lazy collections are drawn one at a time from
+        # the main stream, with collections among them being lazy as well
+        load = partial(self._load_lazy_child, depth + 1)
+        if is_object:
+            return LazyObject(self._draw_keys(size, ()), load)
+        return LazyArray(size, load)
+
+    def _load_lazy_child(self, depth: int, _index: int) -> LazyChild:
+        children, sizes = self._generate_children(1, depth)
+        if self._stats is not None:
+            self._count_children(children, sizes, depth)
+        child = children[0]
+        if sizes:
+            return self._lazy_collection(sizes[0], depth, is_object=type(child) is dict)
+        return child
+
+    def _check_reproducible(self, document: int) -> None:
+        if self._seed is None:
+            msg = "regenerating values requires a seed"
+            raise OddsproutValueError(msg)
+        if document < 0:
+            msg = f"document index can't be negative, got {document}"
+            raise OddsproutValueError(msg)
+
+    def _use_stream(self, *path: int) -> None:
+        if self._seed is not None:
+            self._rng.seed(derive_seed(self._seed, *path))
+
+    def _draw_root(self, document: int) -> tuple[str, int]:
+        self._use_stream(document)
         base = self._config.base
-        size = rand_int(*self._config.base_size)
+        if self._target is None:
+            size = self._rng.randint(*self._config.base_size)
+        else:
+            size = sys.maxsize
         if base == "any":
-            base = choice(("object", "array"))
-        try:
-            return (
-                self._generate_object(size)
-                if base == "object"
-                else self._generate_array(size)
+            base = self._rng.choice(("object", "array"))
+        if self._unique_keys and base == "object":
+            size = min(size, self._key_space)
+        if (stats := self._stats) is not None:
+            stats.nodes[base] += 1
+            stats.depths[1] += 1
+            # the size of the root isn't known upfront with a target size
+            if self._target is None:
+                stats.collection_sizes[size] += 1
+        return base, size
+
+    def _generate_root(self, document: int) -> JSONValue:
+        root, steps = self._start_root(document)
+        _exhaust(steps)
+        return root
+
+    def _start_root(self, document: int) -> tuple[JSONValue, Iterator[None]]:
+        # Returns the (empty) root and the steps filling it, see _fill
+        if self._stats is not None:
+            self._stats.values += 1
+        base, size = self._draw_root(document)
+        self._reset_budgets()
+        # seeded values only reuse their own subtrees, so that they can be
+        # regenerated
+        if self._subtree_pool is not None and self._seed is not None:
+            self._subtree_pool.clear()
+        self._subtree_nodes.clear()
+        root: JSONValue = {} if base == "object" else []
+        if self._seed is None:
+            return root, self._fill(root, size, 1)
+        return root, self._fill_root(document, base, size, root)
+
+    def _fill_root(
+        self, document: int, base: str, size: int, root: JSONValue
+    ) -> Iterator[None]:
+        for i in range(size):
+            child = self._draw_root_child(
+                document, i, base, cast(JSONObject, root), first=not root
             )
-        except RecursionError:
-            msg = "recursion limit reached while generating JSON value"
-            raise OddsproutRecursionError(msg) from None
+            if child is None:
+                break
+            key, value, child_size = child
+            if child_size:
+                yield from self._fill(value, child_size, 2)
+            if key is None:
+                cast(JSONArray, root).append(value)
+            else:
+                cast(JSONObject, root)[key] = value
+            # leaf children don't go through _fill, so yield for them too
+            yield
 
-    def _generate_value(self) -> JSONValue:
-        return choice(self._type_pool, self._weights)()
+    def _iter_root_tokens(self, document: int) -> Iterator[str]:
+        base, size = self._draw_root(document)
+        self._reset_budgets()
+        is_object = base == "object"
+        if self._seed is None:
+            if size:
+                root: JSONValue = {} if is_object else []
+                yield from self._iter_collection_tokens(root, size, 1)
+            else:
+                yield "{}" if is_object else "[]"
+            return
+        started = False
+        used_keys: set[str] = set()
+        for i in range(size):
+            child = self._draw_root_child(
+                document, i, base, used_keys, first=not started
+            )
+            if child is None:
+                break
+            key, value, child_size = child
+            yield ",\n  " if started else "{\n  " if is_object else "[\n  "
+            started = True
+            if key is not None:
+                if self._unique_keys:
+                    used_keys.add(key)
+                yield encode_basestring_ascii(key)
+                yield ": "
+            if child_size:
+                yield from self._iter_collection_tokens(value, child_size, 2)
+            else:
+                yield LEAF_ENCODERS[type(value)](value)
+        if not started:
+            yield "{}" if is_object else "[]"
+        else:
+            yield "\n}" if is_object else "\n]"
 
-    def _generate_string(self) -> str:
-        return "".join(choices(self._charset, k=rand_int(*self._string_size)))
+    # Each child of the root gets its own substream when seeded,
+    # so that it can be regenerated without replaying its siblings
+    def _draw_root_child(
+        self,
+        document: int,
+        index: int,
+        base: str,
+        used_keys: Collection[str],
+        *,
+        first: bool,
+    ) -> tuple[str | None, JSONValue, int] | None:
+        # Returns the key (for objects), the value and the size of the child
+        # (if it's a collection to be filled), or None if it's over budget
+        if self._exhausted:
+            return None
+        self._use_stream(document, index)
+        keys = self._draw_keys(1, used_keys) if base == "object" else None
+        children, sizes = self._generate_children(1, 2)
+        if sizes and self._subtree_pool is not None:
+            sizes = [size for _, size in self._reuse_subtrees(children, sizes, 2)]
+        if self._budgeted and not self._admit(
+            children, keys, 1, used_keys, first=first
+        ):
+            return None
+        if self._stats is not None:
+            self._count_children(children, sizes, 2)
+        child = children[0]
+        # the child might have been replaced while steering toward a target size
+        if sizes and (type(child) is dict or type(child) is list):
+            return None if keys is None else keys[0], child, sizes[0]
+        return None if keys is None else keys[0], child, 0
 
-    def _generate_object(self, size: int | None = None) -> JSONObject:
-        return {
-            self._generate_string(): self._generate_value()
-            for _ in range(rand_int(*self._collection_size) if size is None else size)
-        }
+    def _iter_collection_tokens(
+        self, collection: JSONValue, size: int, depth: int
+    ) -> Iterator[str]:
+        level = depth - 1
+        stack = [_Frame(collection, size)]
+        yield "{" if stack[0].is_object else "["
+        while stack:
+            frame = stack[-1]
+            if frame.index == len(frame.children):
+                if not frame.remaining or self._exhausted:
+                    stack.pop()
+                    if frame.started:
+                        yield _INDENTS[level + len(stack)]
+                    yield "}" if frame.is_object else "]"
+                    continue
+                count = min(frame.remaining, _BATCH_SIZE, self._nodes_left)
+                frame.remaining -= count
+                frame.children, sizes = self._generate_children(
+                    count, depth + len(stack)
+                )
+                frame.keys = (
+                    self._draw_keys(count, frame.used_keys) if frame.is_object else None
+                )
+                if self._budgeted:
+                    admitted = self._admit(
+                        frame.children,
+                        frame.keys,
+                        depth + len(stack) - 1,
+                        frame.used_keys,
+                        first=not frame.started,
+                    )
+                    if admitted < count:
+                        frame.remaining = 0
+                        del frame.children[admitted:]
+                if self._stats is not None:
+                    self._count_children(frame.children, sizes, depth + len(stack))
+                if self._unique_keys and frame.keys is not None:
+                    frame.used_keys.update(frame.keys[: len(frame.children)])
+                frame.sizes = iter(sizes)
+                frame.index = 0
+                continue
+            i = frame.index
+            frame.index += 1
+            if frame.started:
+                yield ","
+            frame.started = True
+            yield _INDENTS[level + len(stack)]
+            if frame.keys is not None:
+                yield encode_basestring_ascii(frame.keys[i])
+                yield ": "
+            child = frame.children[i]
+            if (type(child) is dict or type(child) is list) and (
+                size := next(frame.sizes, 0)
+            ):
+                stack.append(_Frame(child, size))
+                yield "{" if type(child) is dict else "["
+            else:
+                yield LEAF_ENCODERS[type(child)](child)
 
-    def _generate_array(self, size: int | None = None) -> JSONArray:
-        return [
-            self._generate_value()
-            for _ in range(rand_int(*self._collection_size) if size is None else size)
+    def _fill(self, value: JSONValue, size: int, depth: int) -> Iterator[None]:
+        # Collections are filled depth-first in batches of children (so that
+        # the work done per level stays bounded); each frame holds a collection,
+        # the number of its children left to be drawn, and the collections of
+        # the last batch along with their sizes. The streaming writer draws
+        # in the same order. Yields after every batch, so that async generation
+        # can pause in between. With subtree reuse, collections are pooled once
+        # they're complete.
+        pool = self._subtree_pool
+        stack: list[list[Any]] = [[value, size, iter(())]]
+        while stack:
+            frame = stack[-1]
+            for child, child_size in frame[2]:
+                stack.append([child, child_size, iter(())])
+                break
+            else:
+                collection, remaining = frame[0], frame[1]
+                if not remaining or self._exhausted:
+                    stack.pop()
+                    if pool is not None:
+                        self._pool_subtree(collection, depth + len(stack))
+                    continue
+                count = min(remaining, _BATCH_SIZE, self._nodes_left)
+                frame[1] = remaining - count
+                children, sizes = self._generate_children(count, depth + len(stack))
+                is_object = type(collection) is dict
+                keys = self._draw_keys(count, collection) if is_object else None
+                if self._budgeted:
+                    admitted = self._admit(
+                        children,
+                        keys,
+                        depth + len(stack) - 1,
+                        collection,
+                        first=not collection,
+                    )
+                    if admitted < count:
+                        frame[1] = 0
+                        del children[admitted:]
+                # reused subtrees are complete, so only the collections left
+                # are filled
+                left = (
+                    self._reuse_subtrees(children, sizes, depth + len(stack))
+                    if pool is not None and sizes
+                    else None
+                )
+                if self._stats is not None:
+                    self._count_children(
+                        children,
+                        sizes if left is None else [size for _, size in left],
+                        depth + len(stack),
+                    )
+                if keys is None:
+                    collection.extend(children)
+                else:
+                    collection.update(zip(keys, children))
+                if left is not None:
+                    frame[2] = iter(left)
+                elif sizes:
+                    nested = (c for c in children if type(c) is dict or type(c) is list)
+                    frame[2] = zip(nested, sizes)
+                yield
+
+    def _count_children(
+        self, children: list[JSONValue], sizes: list[int], depth: int
+    ) -> None:
+        # Records the children at `depth` that made it into a value, along with
+        # the sizes drawn for the collections among them (past the maximum
+        # depth, collections don't get a size drawn and are left empty). Reused
+        # subtrees don't have sizes drawn, and are recorded whole instead.
+        stats = cast(GenerationStats, self._stats)
+        types = Counter(map(type, children))
+        for type_, count in types.items():
+            stats.nodes[_TYPE_NAMES[type_]] += count
+        if types[str]:
+            stats.string_lengths.update(len(c) for c in children if type(c) is str)
+        stats.depths[depth] += len(children)
+        collections = types[dict] + types[list]
+        if (pool := self._subtree_pool) is not None and collections:
+            for child in children:
+                if (type(child) is dict or type(child) is list) and child in pool:
+                    self._count_subtree(child, depth)
+                    collections -= 1
+        stats.collection_sizes.update(sizes[:collections])
+        if empty := collections - len(sizes[:collections]):
+            stats.collection_sizes[0] += empty
+
+    def _count_subtree(self, subtree: JSONValue, depth: int) -> None:
+        # Records the size of a reused subtree at `depth` and its descendants
+        stats = cast(GenerationStats, self._stats)
+        stack = [(subtree, depth)]
+        while stack:
+            collection, level = stack.pop()
+            children = list(
+                collection.values()
+                if type(collection) is dict
+                else cast(JSONArray, collection)
+            )
+            stats.collection_sizes[len(children)] += 1
+            stats.depths[level + 1] += len(children)
+            for child in children:
+                stats.nodes[_TYPE_NAMES[type(child)]] += 1
+                if type(child) is str:
+                    stats.string_lengths[len(child)] += 1
+                elif type(child) is dict or type(child) is list:
+                    stack.append((child, level + 1))
+
+    def _pool_subtree(self, collection: JSONValue, depth: int) -> None:
+        # Pools a complete collection (at `depth`) unless it's the root. Nodes
+        # are counted from the children that made it into the collection, which
+        # duplicate keys may have overwritten others of.
+        if depth < 2:
+            return
+        subtree_nodes = self._subtree_nodes
+        children = (
+            collection.values()
+            if type(collection) is dict
+            else cast(JSONArray, collection)
+        )
+        nodes = 1
+        for child in children:
+            entry = subtree_nodes.get(id(child))
+            nodes += 1 if entry is None else entry[1]
+        subtree_nodes[id(collection)] = (collection, nodes)
+        cast(SubtreePool, self._subtree_pool).add(collection, nodes, depth)
+
+    def _reuse_subtrees(
+        self, children: list[JSONValue], sizes: list[int], depth: int
+    ) -> list[tuple[JSONValue, int]]:
+        # Replaces each collection among `children` (at `depth`) with a pooled
+        # subtree with the reuse probability; returns the collections left to
+        # fill along with their sizes
+        pool = cast(SubtreePool, self._subtree_pool)
+        nested = [
+            i for i, c in enumerate(children) if type(c) is dict or type(c) is list
         ]
+        if not pool.has_depth(depth):
+            return [(children[i], size) for i, size in zip(nested, sizes)]
+        pairs = []
+        coins = uniforms(self._rng, len(sizes), 0, 1)
+        for i, size, coin in zip(nested, sizes, coins):
+            if coin < self._reuse:
+                subtree, nodes = pool.draw(self._rng, depth)
+                children[i] = subtree
+                self._subtree_nodes[id(subtree)] = (subtree, nodes)
+            else:
+                pairs.append((children[i], size))
+        return pairs
+
+    def _reset_budgets(self) -> None:
+        self._nodes_left = (
+            sys.maxsize if self._max_nodes is None else self._max_nodes - 1
+        )
+        self._bytes_left = 0 if self._max_bytes is None else self._max_bytes - 2
+        self._exhausted = not self._nodes_left
+
+    def _admit(
+        self,
+        children: list[JSONValue],
+        keys: list[str] | None,
+        depth: int,
+        used_keys: Collection[str],
+        *,
+        first: bool,
+    ) -> int:
+        # Returns how many of the children of a collection at `depth` fit in
+        # the budgets (the collection has to be closed if that's not all of
+        # them), marking them as exhausted once a child doesn't
+        count = min(len(children), self._nodes_left)
+        exhausted = count < len(children)
+        if self._max_bytes is not None:
+            left = self._bytes_left
+            # each child takes its indent and its text (plus its key), and either
+            # a comma or, for the first one, the indent of the closing bracket
+            indent = 2 * depth + 1
+            for i, child in enumerate(children[:count]):
+                spacing = indent + (2 * depth - 1 if first and not i else 1)
+                cost = spacing + len(LEAF_ENCODERS[type(child)](child))
+                if keys is not None:
+                    cost += len(encode_basestring_ascii(keys[i])) + 2
+                if cost <= left:
+                    left -= cost
+                    continue
+                count = i
+                # Short of a target size, the child is steered into the room
+                # left, and only its parent gets closed
+                if self._target is None or left <= self._slack:
+                    exhausted = True
+                elif taken := self._fit(children, keys, i, left - spacing, used_keys):
+                    count += 1
+                    left -= spacing + taken
+                break
+            self._bytes_left = left
+        self._nodes_left -= count
+        if exhausted or not self._nodes_left:
+            self._exhausted = True
+        return count
+
+    def _fit(
+        self,
+        children: list[JSONValue],
+        keys: list[str] | None,
+        index: int,
+        room: int,
+        used_keys: Collection[str],
+    ) -> int:
+        # Steers a child that doesn't fit into the `room` left before the target
+        # size by shortening its key and (if it's a string) its text, replacing
+        # it with a string if it's too long otherwise and strings are allowed;
+        # returns the room it takes, or 0 if it can't fit
+        child = children[index]
+        # an emptied key takes its quotes and ": "
+        key_room = 0 if keys is None else 4
+        # not worth steering the rare one-digit numbers into less room
+        if room < key_room + 2:
+            return 0
+        if type(child) is str:
+            width = 2
+        elif (width := len(LEAF_ENCODERS[type(child)](child))) + key_room > room:
+            if not self._fills_with_strings:
+                return 0
+            child = random_text(self._rng, room, self._charset)
+            width = 2
+        if keys is not None:
+            key = _truncate(keys[index], room - width - key_room)
+            # a shortened key might not be unique anymore, in which case a free
+            # one is used, replacing the child with a string to make room for it
+            # if there's none
+            used = (used_keys, keys[:index])
+            if self._unique_keys and key != keys[index] and any(key in u for u in used):
+                free = self._free_key(room - width - key_room, *used)
+                if free is None and type(child) is not str and self._fills_with_strings:
+                    child = random_text(self._rng, room, self._charset)
+                    width = 2
+                    free = self._free_key(room - width - key_room, *used)
+                if free is None:
+                    return 0
+                key = free
+            keys[index] = key
+            taken = width + len(encode_basestring_ascii(key)) + 2
+        else:
+            taken = width
+        if type(child) is str:
+            children[index] = child = _truncate(child, room - taken)
+            taken += len(encode_basestring_ascii(child)) - 2
+        return taken
+
+    def _free_key(self, width: int, *used: Collection[str]) -> str | None:
+        # The longest key of at most `width` characters as JSON (not counting
+        # its quotes) that isn't used, if any
+        chars = [c for c in self._charset if len(encode_basestring_ascii(c)) == 3]
+        for length in range(width, -1, -1):
+            for key in map("".join, product(chars, repeat=length)):
+                if not any(key in keys for keys in used):
+                    return key
+        return None
+
+    def _draw_keys(self, count: int, used_keys: Collection[str]) -> list[str]:
+        # Draws the keys of the next `count` children of an object with
+        # the `used_keys`, which can't be repeated with unique keys. Colliding
+        # keys are redrawn until the object would take up more than half of
+        # the possible keys; the rest are then sampled from the keys left.
+        if not self._unique_keys:
+            return self._generate_keys(count)
+        keys: dict[str, None] = {}
+        while missing := count - len(keys):
+            if 2 * (len(used_keys) + count) > self._key_space:
+                keys.update(dict.fromkeys(self._sample_keys(missing, used_keys, keys)))
+                break
+            keys.update(
+                (key, None)
+                for key in self._generate_keys(missing)
+                if key not in used_keys
+            )
+        return list(keys)
+
+    def _sample_keys(self, count: int, *excluded: Collection[str]) -> list[str]:
+        keys: Iterable[str]
+        if self._key_pool is None:
+            low, high = self._string_size
+            keys = (
+                key
+                for length in range(low, high + 1)
+                for key in map("".join, product(self._charset, repeat=length))
+            )
+        else:
+            keys = self._key_pool
+        left = [key for key in keys if not any(key in used for used in excluded)]
+        return self._rng.sample(left, count)
+
+    def _build_key_pool(
+        self, vocabulary: int | tuple[str, ...] | None
+    ) -> tuple[str, ...] | None:
+        # Keys are interned, so that every occurrence of a key is the same object
+        if vocabulary is None:
+            return None
+        if isinstance(vocabulary, int):
+            # a seeded vocabulary is drawn from a stream of its own, so that
+            # every value uses the same one
+            self._use_stream(-1)
+            keys: dict[str, None] = {}
+            while missing := vocabulary - len(keys):
+                keys.update(dict.fromkeys(self._generate_keys(missing)))
+            vocabulary = tuple(keys)
+        return tuple(map(sys.intern, vocabulary))
+
+    def _generate_children(
+        self, count: int, depth: int
+    ) -> tuple[list[JSONValue], list[int]]:
+        # Generates `count` values at `depth`, along with the sizes of
+        # the collections among them (unless they have to be left empty)
+        if not count:
+            return [], []
+        if depth > self._max_depth:
+            pool, draw = self._leaf_pool, self._draw_leaf_types
+        else:
+            pool, draw = self._type_pool, self._draw_types
+        if len(pool) == 1:
+            # there's nothing to draw with a single type
+            children = pool[0](count)
+            collections = count if pool[0] in self._collection_makers else 0
+        elif count == 1:
+            make = draw(1)[0]
+            children = make(1)
+            collections = int(make in self._collection_makers)
+        else:
+            types = draw(count)
+            counts = Counter(types)
+            # one batch per type, consumed in the order the types were drawn in
+            batches = {t: iter(t(n)).__next__ for t, n in counts.items()}
+            children = [batches[t]() for t in types]
+            collections = sum(counts[make] for make in self._collection_makers)
+        if not collections or depth > self._fill_depth:
+            return children, []
+        if self._overflow_depth is not None and depth >= self._overflow_depth:
+            raise _recursion_error()
+        if self._target is None:
+            sizes = self._draw_collection_sizes(collections)
+        else:
+            # collections aren't drawn larger than what could fit the target
+            low, high = self._collection_size
+            high = max(low, min(high, self._bytes_left // (2 * depth + 3)))
+            sizes = randints(self._rng, collections, low, high)
+        if (cap := self._object_size_cap) is not None:
+            nested = (c for c in children if type(c) is dict or type(c) is list)
+            sizes = [
+                min(size, cap) if type(c) is dict else size
+                for c, size in zip(nested, sizes)
+            ]
+        return children, sizes
+
+    def _string_generator(self) -> BatchGenerator:
+        rng, charset = self._rng, self._charset
+        low, high = self._string_size
+        if low == high:
+            # strings of a fixed length are sliced from the text at fixed offsets
+            def generate_fixed(count: int) -> list[str]:
+                if not low:
+                    return [""] * count
+                text = random_text(rng, low * count, charset)
+                return [text[i : i + low] for i in range(0, low * count, low)]
+
+            return generate_fixed
+
+        draw_lengths = int_sampler(rng, low, high)
+
+        def generate(count: int) -> list[str]:
+            lengths = draw_lengths(count)
+            text = random_text(rng, sum(lengths), charset)
+            if count == 1:
+                return [text]
+            return [text[end - n : end] for n, end in zip(lengths, accumulate(lengths))]
+
+        return generate
+
+    def _generate_floats(self, count: int) -> list[float]:
+        return uniforms(self._rng, count, -1_000_000, 1_000_000)
+
+    def _generate_bools(self, count: int) -> list[bool]:
+        return [byte < 128 for byte in self._rng.randbytes(count)]
+
+
+class _Frame:
+    # A collection being written by the streaming writer
+
+    __slots__ = (
+        "children",
+        "index",
+        "is_object",
+        "keys",
+        "remaining",
+        "sizes",
+        "started",
+        "used_keys",
+    )
+
+    def __init__(self, collection: JSONValue, size: int) -> None:
+        self.is_object = type(collection) is dict
+        self.remaining = size
+        self.children: list[JSONValue] = []
+        self.keys: list[str] | None = None
+        self.sizes: Iterator[int] = iter(())
+        self.index = 0
+        self.started = False
+        # only kept track of with unique keys
+        self.used_keys: set[str] = set()
+
+
+def _exhaust(steps: Iterator[None]) -> None:
+    deque(steps, maxlen=0)
+
+
+async def _pause_between(chunks: Iterator[str]) -> AsyncIterator[str]:
+    import asyncio
+
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(0)
+
+
+async def _run_in_executor(
+    executor: Executor, items: Iterator[Any], stop: int | None = None
+) -> AsyncIterator[Any]:
+    # Yields the (first `stop`) items of an iterator advanced in `executor`,
+    # one at a time so that the iterator is never used by two threads at once
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    done = object()
+    count = 0
+    while count != stop:
+        item = await loop.run_in_executor(executor, next, items, done)
+        if item is done:
+            return
+        count += 1
+        yield item
+
+
+def _new_objects(count: int) -> list[JSONObject]:
+    return [{} for _ in range(count)]
+
+
+def _new_arrays(count: int) -> list[JSONArray]:
+    return [[] for _ in range(count)]
+
+
+def _generate_nulls(count: int) -> list[None]:
+    return [None] * count
+
+
+# estimating the size of diverging configs takes a while with "cap"
+@lru_cache(maxsize=128)
+def _check_divergence(config: Config) -> int | None:
+    # Returns the max_depth to use in place of the config's
+    if not (estimate := estimate_size(config)).diverges:
+        return None
+    if config.divergence == "cap":
+        return capped_depth(config, _DIVERGENCE_CAP)
+    msg = (
+        "the expected size of generated values diverges (branching factor"
+        f" {estimate.branching_factor:.3g}); set max_depth, max_nodes or max_bytes"
+        " to bound it"
+    )
+    raise OddsproutValueError(msg)
 
 
-def _generate_int() -> int:
-    return rand_int(-1_000_000, 1_000_000)
+def _truncate(text: str, width: int) -> str:
+    # The longest prefix of `text` taking at most `width` characters
+    # as JSON (not counting its quotes)
+    for i, char in enumerate(text):
+        width -= len(encode_basestring_ascii(char)) - 2
+        if width < 0:
+            return text[:i]
+    return text
 
 
-def _generate_float() -> float:
-    return uniform(-1_000_000, 1_000_000)
+def _recursion_error() -> OddsproutRecursionError:
+    msg = "recursion limit reached while generating JSON value"
+    return OddsproutRecursionError(msg)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING, Callable, Union, overload
+
+if TYPE_CHECKING:
+    from oddsprout.generators import JSONArray, JSONObject, JSONValue
+
+    LazyValue = Union["LazyObject", "LazyArray"]
+    LazyChild = Union[JSONValue, LazyValue]
+
+# marks children that haven't been generated yet
+_MISSING = object()
+
+
+class LazyObject(Mapping[str, "LazyChild"]):
+    """
+    A read-only JSON object whose keys are drawn upfront, the child of each key
+    being generated (by `load`, from its index among the keys) when first
+    accessed.
+    """
+
+    __slots__ = ("_children", "_indices", "_load")
+
+    def __init__(self, keys: list[str], load: Callable[[int], LazyChild]) -> None:
+        # like in a dict, a repeated key keeps its position but gets the child
+        # of its last occurrence
+        self._indices = {key: i for i, key in enumerate(keys)}
+        self._children: dict[str, LazyChild] = {}
+        self._load = load
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(size={len(self)}, loaded={len(self._children)})"
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._indices)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._indices
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return _equal(self, other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __getitem__(self, key: str) -> LazyChild:
+        try:
+            return self._children[key]
+        except KeyError:
+            pass
+        child = self._children[key] = self._load(self._indices[key])
+        return child
+
+    @property
+    def loaded(self) -> int:
+        """The number of children generated so far."""
+        return len(self._children)
+
+    def materialize(self) -> JSONObject:
+        """Generate all children (recursively) into a plain dict."""
+        obj: JSONObject = {}
+        _materialize_into(self, obj)
+        return obj
+
+
+class LazyArray(Sequence["LazyChild"]):
+    """
+    A read-only JSON array whose size is drawn upfront, each element being
+    generated (by `load`, from its index) when first accessed.
+    """
+
+    __slots__ = ("_items", "_load")
+
+    def __init__(self, size: int, load: Callable[[int], LazyChild]) -> None:
+        self._items: list[object] = [_MISSING] * size
+        self._load = load
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(size={len(self)}, loaded={self.loaded})"
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return _equal(self, other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    @overload
+    def __getitem__(self, index: int) -> LazyChild: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[LazyChild]: ...
+
+    def __getitem__(self, index: int | slice) -> LazyChild | list[LazyChild]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if not -len(self) <= index < len(self):
+            msg = f"array has {len(self)} elements, got index {index}"
+            raise IndexError(msg)
+        index %= len(self)
+        item = self._items[index]
+        if item is _MISSING:
+            item = self._items[index] = self._load(index)
+        return item  # type: ignore[return-value]
+
+    @property
+    def loaded(self) -> int:
+        """The number of elements generated so far."""
+        return sum(item is not _MISSING for item in self._items)
+
+    def materialize(self) -> JSONArray:
+        """Generate all elements (recursively) into a plain list."""
+        array: JSONArray = []
+        _materialize_into(self, array)
+        return array
+
+
+def materialize(value: LazyChild) -> JSONValue:
+    """Convert a (possibly) lazy value into a plain JSON value."""
+    if isinstance(value, (LazyObject, LazyArray)):
+        return value.materialize()
+    return value
+
+
+def _materialize_into(lazy: LazyValue, plain: JSONObject | JSONArray) -> None:
+    # Iterative like the encoder, so that values as deep as max_depth allows
+    # don't overflow the stack: each lazy collection is paired with the empty
+    # plain one taking its place, filled when popped
+    stack: list[tuple[LazyValue, JSONObject | JSONArray]] = [(lazy, plain)]
+    while stack:
+        lazy, plain = stack.pop()
+        items = lazy.items() if isinstance(lazy, LazyObject) else enumerate(lazy)
+        for key, child in items:
+            value: JSONValue
+            if isinstance(child, LazyObject):
+                value = {}
+                stack.append((child, value))
+            elif isinstance(child, LazyArray):
+                value = []
+                stack.append((child, value))
+            else:
+                value = child
+            if isinstance(plain, dict):
+                plain[str(key)] = value
+            else:
+                plain.append(value)
+
+
+def _equal(left: object, right: object) -> bool:
+    # Compares collections pairwise with an explicit stack, like
+    # _materialize_into; only pairs involving a lazy collection (or plain ones
+    # of the same type) are unpacked, everything else uses ==
+    stack = [(left, right)]
+    while stack:
+        left, right = stack.pop()
+        if (
+            isinstance(left, Mapping)
+            and isinstance(right, Mapping)
+            and _unpacks(left, right, LazyObject, dict)
+        ):
+            if left.keys() != right.keys():
+                return False
+            stack.extend((left[key], right[key]) for key in left)
+        elif (
+            isinstance(left, Sequence)
+            and isinstance(right, Sequence)
+            and _unpacks(left, right, LazyArray, list)
+        ):
+            if len(left) != len(right):
+                return False
+            stack.extend(zip(left, right))
+        elif left != right:
+            return False
+    return True
+
+
+def _unpacks(left: object, right: object, lazy: type, plain: type) -> bool:
+    if isinstance(left, (str, bytes)) or isinstance(right, (str, bytes)):
+        return False
+    if isinstance(left, lazy) or isinstance(right, lazy):
+        return True
+    return type(left) is plain and type(right) is plain
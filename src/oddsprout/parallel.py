@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from typing import TYPE_CHECKING, Any, TypeVar, cast
+
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator, JSONValue
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterator
+    from concurrent.futures import Future
+
+    from oddsprout.configuration import Config
+
+T = TypeVar("T")
+
+_worker_generator: JSONGenerator | None = None
+
+
+def generate_parallel(
+    config: Config, n: int, jobs: int | None = None, *, batch_size: int = 16
+) -> Iterator[JSONValue]:
+    """
+    Generate `n` random JSON values across `jobs` worker processes
+    (one per CPU by default), yielding them in order.
+    """
+    return _iter_batches(config, n, _check_args(n, jobs, batch_size), batch_size, None)
+
+
+def dump_parallel(
+    config: Config,
+    n: int,
+    dumps: Callable[[JSONValue], T],
+    jobs: int | None = None,
+    *,
+    batch_size: int = 16,
+) -> Iterator[T]:
+    """
+    Generate `n` random JSON values across `jobs` worker processes
+    (one per CPU by default) and serialize them with `dumps` in the workers
+    (e.g. to JSON text or MessagePack), yielding the results in order.
+    `dumps` has to be picklable.
+    """
+    return _iter_batches(config, n, _check_args(n, jobs, batch_size), batch_size, dumps)
+
+
+def agenerate_parallel(
+    config: Config, n: int, jobs: int | None = None, *, batch_size: int = 16
+) -> AsyncIterator[JSONValue]:
+    """
+    Asynchronously generate `n` random JSON values across `jobs` worker
+    processes (one per CPU by default), yielding them in order. Workers only
+    get ahead of the consumer by a few batches.
+    """
+    return _aiter_batches(config, n, _check_args(n, jobs, batch_size), batch_size)
+
+
+def _check_args(n: int, jobs: int | None, batch_size: int) -> int:
+    # Returns the number of jobs to use
+    if n < 0:
+        msg = f"number of values can't be negative, got {n}"
+        raise OddsproutValueError(msg)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 1:
+        msg = f"number of jobs has to be positive, got {jobs}"
+        raise OddsproutValueError(msg)
+    if batch_size < 1:
+        msg = f"batch size has to be positive, got {batch_size}"
+        raise OddsproutValueError(msg)
+    return jobs
+
+
+def _iter_batches(
+    config: Config,
+    n: int,
+    jobs: int,
+    batch_size: int,
+    dumps: Callable[[JSONValue], Any] | None,
+) -> Iterator[Any]:
+    # imports multiprocessing, which is slow to import
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        jobs, initializer=_init_worker, initargs=(config,)
+    ) as executor:
+        # Keeping a bounded number of batches in flight keeps memory usage
+        # independent of n while every worker stays busy
+        pending: deque[Future[list[Any]]] = deque()
+        for start in range(0, n, batch_size):
+            pending.append(
+                executor.submit(
+                    _generate_batch, start, min(batch_size, n - start), dumps
+                )
+            )
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+async def _aiter_batches(
+    config: Config, n: int, jobs: int, batch_size: int
+) -> AsyncIterator[JSONValue]:
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(config,))
+    pending: deque[asyncio.Future[list[Any]]] = deque()
+    try:
+        for start in range(0, n, batch_size):
+            batch = executor.submit(
+                _generate_batch, start, min(batch_size, n - start), None
+            )
+            pending.append(asyncio.wrap_future(batch))
+            if len(pending) >= 2 * jobs:
+                for value in await pending.popleft():
+                    yield value
+        while pending:
+            for value in await pending.popleft():
+                yield value
+    finally:
+        # waiting for the workers would block the event loop
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_worker(config: Config) -> None:
+    global _worker_generator  # noqa: PLW0603
+    _worker_generator = JSONGenerator(config)
+
+
+def _generate_batch(
+    start: int, count: int, dumps: Callable[[JSONValue], Any] | None
+) -> list[Any]:
+    gen = cast(JSONGenerator, _worker_generator)
+    # Seeded values are generated from the substream of their index, so the
+    # output doesn't depend on how the work was split between the workers
+    if gen.config.seed is None:
+        values: Iterator[JSONValue] = gen.generate_many(count)
+    else:
+        values = map(gen.generate_document, range(start, start + count))
+    if dumps is None:
+        return list(values)
+    return list(map(dumps, values))
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import math
+import re
+import sys
+from array import array
+from functools import cache, lru_cache
+from hashlib import blake2b
+from os import urandom
+from random import Random
+from typing import TYPE_CHECKING, Any, Callable, NoReturn, TypeVar
+
+from oddsprout.exceptions import OddsproutValueError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+T = TypeVar("T")
+
+_RECIP_BPF = 2**-53
+_WORD_BITS = 64
+# array typecodes of unsigned integers by their size in bytes
+_UNSIGNED_TYPECODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+# alias tables of small populations have a column for every byte value, each
+# split between its own outcome and an alias in units of 2**-32
+_ALIAS_COLUMNS = 256
+_ALIAS_COIN_BITS = 32
+
+
+class IxiaRandom(Random):
+    """
+    A random number generator drawing every value from ixia,
+    i.e. straight from the OS entropy source.
+    """
+
+    def __init__(self) -> None:
+        # only needed by this RNG
+        from ixia import rand_bits, rand_bytes, random
+
+        self._random = random
+        self._rand_bits = rand_bits
+        self._rand_bytes = rand_bytes
+        super().__init__()
+
+    def random(self) -> float:
+        """Get a random float in [0.0, 1.0)."""
+        return self._random()
+
+    def getrandbits(self, k: int) -> int:
+        """Get a random integer with `k` random bits."""
+        return self._rand_bits(k)
+
+    def randbytes(self, n: int) -> bytes:
+        """Get `n` random bytes."""
+        return self._rand_bytes(n)
+
+    def seed(self, *_args: Any, **_kwargs: Any) -> None:
+        """Do nothing, as ixia can't be seeded."""
+        return
+
+    def _stateless(self, *_args: Any, **_kwargs: Any) -> NoReturn:
+        msg = "ixia does not have a state"
+        raise NotImplementedError(msg)
+
+    getstate = setstate = _stateless
+
+
+class EntropyPool(Random):
+    """
+    A random number generator pulling large blocks from the OS entropy source
+    and serving values from memory.
+    """
+
+    def __init__(self, block_size: int = 1 << 16) -> None:
+        if block_size < 8 or block_size % 8:
+            msg = "block size must be a positive multiple of 8"
+            raise OddsproutValueError(msg)
+        self._block_size = block_size
+        self._words: Iterator[int] = iter(())
+        self._bytes = b""
+        self._bytes_offset = 0
+        super().__init__()
+
+    def _next_word(self) -> int:
+        try:
+            return next(self._words)
+        except StopIteration:
+            self._words = iter(memoryview(urandom(self._block_size)).cast("Q"))
+            return next(self._words)
+
+    def random(self) -> float:
+        """Get a random float in [0.0, 1.0)."""
+        # _next_word inlined, since this is called for every drawn value
+        try:
+            return (next(self._words) >> 11) * _RECIP_BPF
+        except StopIteration:
+            return (self._next_word() >> 11) * _RECIP_BPF
+
+    def getrandbits(self, k: int) -> int:
+        """Get a random integer with `k` random bits."""
+        if k < 0:
+            msg = "number of bits must be non-negative"
+            raise ValueError(msg)
+        if k <= _WORD_BITS:
+            return self._next_word() >> (_WORD_BITS - k)
+        words, rest = divmod(k, _WORD_BITS)
+        x = 0
+        for _ in range(words):
+            x = (x << _WORD_BITS) | self._next_word()
+        return (x << rest) | (self._next_word() >> (_WORD_BITS - rest))
+
+    def randbytes(self, n: int) -> bytes:
+        """Get `n` random bytes."""
+        if n > self._block_size >> 2:
+            return urandom(n)
+        start = self._bytes_offset
+        if (end := start + n) > len(self._bytes):
+            self._bytes = urandom(self._block_size)
+            start, end = 0, n
+        self._bytes_offset = end
+        return self._bytes[start:end]
+
+    def seed(self, *_args: Any, **_kwargs: Any) -> None:
+        """Do nothing, as entropy pools can't be seeded."""
+        return
+
+    def _stateless(self, *_args: Any, **_kwargs: Any) -> NoReturn:
+        msg = "entropy pools do not have a state"
+        raise NotImplementedError(msg)
+
+    getstate = setstate = _stateless
+
+
+def create_rng(kind: str) -> Random:
+    """Create a random number generator of the given kind."""
+    if kind == "ixia":
+        return IxiaRandom()
+    if kind == "mersenne":
+        return Random()  # noqa: S311
+    if kind == "pool":
+        return EntropyPool()
+    msg = f"invalid RNG {kind!r}"
+    raise OddsproutValueError(msg)
+
+
+def derive_seed(seed: int, *path: int) -> int:
+    """
+    Derive an independent seed for the given path (e.g. a document index)
+    from a seed.
+    """
+    key = ":".join(map(str, (seed, *path))).encode()
+    digest = blake2b(key, digest_size=16, person=b"oddsprout").digest()
+    return int.from_bytes(digest, "big")
+
+
+def random_words(rng: Random, count: int, size: int = 8) -> array[int]:
+    """
+    Draw `count` random unsigned integers of `size` bytes (1, 2, 4 or 8)
+    from a single block of random bytes.
+    """
+    words = array(_UNSIGNED_TYPECODES[size], rng.randbytes(count * size))
+    if sys.byteorder == "big":  # pragma: no cover
+        # keeps seeded output independent of the platform
+        words.byteswap()
+    return words
+
+
+def randints(rng: Random, count: int, a: int, b: int) -> list[int]:
+    """
+    Draw `count` random integers in range `[a, b]`, equivalent to
+    calling `rng.randint(a, b)` `count` times.
+    """
+    return int_sampler(rng, a, b)(count)
+
+
+def int_sampler(rng: Random, a: int, b: int) -> Callable[[int], list[int]]:
+    """
+    Return a function drawing `count` random integers in range `[a, b]`,
+    equivalent to `randints(rng, count, a, b)` with the word size and
+    the rejection bound worked out upfront.
+    """
+    span = b - a + 1
+    if span == 1:
+        return lambda count: [a] * count
+    size = next((size for size in (1, 2, 4) if span <= 1 << (8 * size)), None)
+    if size is None:
+        return lambda count: [rng.randint(a, b) for _ in range(count)]
+    # rejecting the top (2**bits % span) words keeps the distribution uniform
+    bound = 1 << (8 * size)
+    limit = bound - bound % span
+
+    def draw(count: int) -> list[int]:
+        result: list[int] = []
+        while missing := count - len(result):
+            words = random_words(rng, missing, size)
+            result += [a + w % span for w in words if w < limit]
+        return result
+
+    return draw
+
+
+def uniforms(rng: Random, count: int, a: float, b: float) -> list[float]:
+    """
+    Draw `count` random floats in range `[a, b)`, equivalent to
+    calling `rng.uniform(a, b)` `count` times.
+    """
+    scale = (b - a) * _RECIP_BPF
+    return [a + (w >> 11) * scale for w in random_words(rng, count)]
+
+
+def random_text(rng: Random, length: int, charset: str) -> str:
+    """
+    Draw a random string of `length` characters from an ASCII `charset`,
+    equivalent to `"".join(rng.choices(charset, k=length))`.
+    """
+    table, rejected, limit = _charset_table(charset)
+    text = b""
+    while (missing := length - len(text)) > 0:
+        # drawing slightly more than expected makes another round unlikely
+        chunk = rng.randbytes(missing * 256 // limit + 16)
+        text += chunk.translate(table, rejected)[:missing]
+    return text.decode("ascii")
+
+
+def zipf_weights(n: int, skew: float) -> list[float]:
+    """Get the weights of ranks 1 to `n` under Zipf's law with exponent `skew`."""
+    return [math.pow(rank, -skew) for rank in range(1, n + 1)]
+
+
+def alias_sampler(
+    rng: Random, population: Sequence[T], weights: Sequence[float]
+) -> Callable[[int], list[T]]:
+    """
+    Compile `weights` into an alias table and return a function drawing
+    `count` random elements of `population` in O(1) time each, equivalent to
+    `rng.choices(population, weights, k=count)`.
+    """
+    if len(population) != len(weights):
+        msg = "the number of weights doesn't match the population size"
+        raise OddsproutValueError(msg)
+    if len(population) == 1:
+        return lambda count: list(population) * count
+    if len(population) < _ALIAS_COLUMNS // 2:
+        return _byte_alias_sampler(rng, population, tuple(weights))
+    return _word_alias_sampler(rng, population, tuple(weights))
+
+
+def _byte_alias_sampler(
+    rng: Random, population: Sequence[T], weights: tuple[float, ...]
+) -> Callable[[int], list[T]]:
+    # Small populations get a column per random byte, the columns being looked
+    # up with bytes.translate()
+    table, splits = _byte_alias_table(weights)
+    # split columns are translated to markers past the population
+    outcomes = [*population, *(population[0] for _ in splits)]
+    if not splits:
+        return lambda count: list(
+            map(outcomes.__getitem__, rng.randbytes(count).translate(table))
+        )
+    find_splits = re.compile(b"[" + re.escape(bytes(splits)) + b"]").finditer
+
+    def draw(count: int) -> list[T]:
+        drawn = rng.randbytes(count).translate(table)
+        values = list(map(outcomes.__getitem__, drawn))
+        for match in find_splits(drawn):
+            position = match.start()
+            threshold, own, alias = splits[drawn[position]]
+            coin = rng.getrandbits(_ALIAS_COIN_BITS)
+            values[position] = population[own if coin < threshold else alias]
+        return values
+
+    return draw
+
+
+def _word_alias_sampler(
+    rng: Random, population: Sequence[T], weights: tuple[float, ...]
+) -> Callable[[int], list[T]]:
+    # Larger ones get a power of two of columns, at least 8 per outcome so
+    # that few draws land in split columns
+    columns = 1 << (8 * len(population) - 1).bit_length()
+    size = 2 if columns <= 1 << 16 else 4
+    mask = columns - 1
+    outcomes, splits = _alias_table(weights, columns)
+    cells = [population[i] if i >= 0 else population[0] for i in outcomes]
+
+    def draw(count: int) -> list[T]:
+        words = [w & mask for w in random_words(rng, count, size)]
+        values = list(map(cells.__getitem__, words))
+        for position in [i for i, column in enumerate(words) if column in splits]:
+            threshold, own, alias = splits[words[position]]
+            coin = rng.getrandbits(_ALIAS_COIN_BITS)
+            values[position] = population[own if coin < threshold else alias]
+        return values
+
+    return draw
+
+
+# generators with the same weights share their tables
+@lru_cache(maxsize=128)
+def _alias_table(
+    weights: tuple[float, ...], columns: int
+) -> tuple[list[int], dict[int, tuple[int, int, int]]]:
+    # Vose's alias method over equally likely columns (at least one per
+    # outcome), the weights being padded with zeros up to the number of
+    # columns. Masses are integers so that the columns add up exactly. Returns
+    # the outcome of every column (-1 for split ones), along with the
+    # (threshold, own outcome, alias) of every split column.
+    if any(w < 0 for w in weights) or (total := sum(weights)) <= 0:
+        msg = "weights must be non-negative and can't all be zero"
+        raise OddsproutValueError(msg)
+    unit = 1 << _ALIAS_COIN_BITS
+    masses = [round(w * columns * unit / total) for w in weights]
+    # rounding leftovers go to the heaviest outcome
+    masses[masses.index(max(masses))] += columns * unit - sum(masses)
+    masses += [0] * (columns - len(masses))
+    thresholds = [unit] * columns
+    aliases = list(range(columns))
+    small = [i for i, mass in enumerate(masses) if mass < unit]
+    large = [i for i, mass in enumerate(masses) if mass >= unit]
+    while small and large:
+        column, donor = small.pop(), large.pop()
+        thresholds[column] = masses[column]
+        aliases[column] = donor
+        masses[donor] -= unit - masses[column]
+        (small if masses[donor] < unit else large).append(donor)
+
+    outcomes: list[int] = []
+    splits: dict[int, tuple[int, int, int]] = {}
+    for column, (threshold, alias) in enumerate(zip(thresholds, aliases)):
+        if threshold == unit:
+            outcomes.append(column)
+        elif threshold == 0:
+            outcomes.append(alias)
+        else:
+            splits[column] = (threshold, column, alias)
+            outcomes.append(-1)
+    return outcomes, splits
+
+
+@lru_cache(maxsize=128)
+def _byte_alias_table(
+    weights: tuple[float, ...],
+) -> tuple[bytes, dict[int, tuple[int, int, int]]]:
+    # A translation table from random bytes to outcomes, split columns getting
+    # markers past the outcomes; returns it along with the split columns by
+    # their markers
+    outcomes, splits = _alias_table(weights, _ALIAS_COLUMNS)
+    table = bytearray(max(outcome, 0) for outcome in outcomes)
+    markers = {}
+    for marker, (column, split) in enumerate(splits.items(), len(weights)):
+        table[column] = marker
+        markers[marker] = split
+    return bytes(table), markers
+
+
+@cache
+def _charset_table(charset: str) -> tuple[bytes, bytes, int]:
+    # Maps random bytes onto the charset through bytes.translate(); bytes
+    # past the largest multiple of the charset size are deleted instead,
+    # so that every character stays equally likely
+    if not charset or not charset.isascii():
+        msg = "charset must be a non-empty ASCII string"
+        raise OddsproutValueError(msg)
+    limit = 256 - 256 % len(charset)
+    encoded = charset.encode("ascii")
+    table = bytes(encoded[b % len(charset)] for b in range(limit)).ljust(256, b"\0")
+    return table, bytes(range(limit, 256)), limit
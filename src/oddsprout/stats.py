@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class GenerationStats:
+    """Statistics collected by a JSONGenerator while generating values."""
+
+    values: int = 0
+    # nodes (values at any depth) by type
+    nodes: Counter[str] = field(default_factory=Counter)
+    # histograms of node depths (the root being at depth 1), collection sizes
+    # and string lengths (not including keys)
+    depths: Counter[int] = field(default_factory=Counter)
+    collection_sizes: Counter[int] = field(default_factory=Counter)
+    string_lengths: Counter[int] = field(default_factory=Counter)
+    # characters of JSON text written by iter_chunks/write_to
+    bytes_emitted: int = 0
+    # seconds spent generating values of each type (and keys)
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the stats into a JSON-serializable dict."""
+        return {
+            "values": self.values,
+            "nodes": dict(self.nodes),
+            "depths": _sorted_histogram(self.depths),
+            "collection_sizes": _sorted_histogram(self.collection_sizes),
+            "string_lengths": _sorted_histogram(self.string_lengths),
+            "bytes_emitted": self.bytes_emitted,
+            "timings": dict(self.timings),
+        }
+
+    def format(self) -> str:
+        """Format the stats as a human-readable report."""
+        lines = [
+            f"values: {self.values:,}",
+            f"nodes: {sum(self.nodes.values()):,}",
+            *(f"  {type_}: {n:,}" for type_, n in self.nodes.most_common()),
+            f"bytes emitted: {self.bytes_emitted:,}",
+            "time spent:",
+            *(
+                f"  {name}: {seconds * 1000:.2f} ms"
+                for name, seconds in sorted(
+                    self.timings.items(), key=lambda item: -item[1]
+                )
+            ),
+            "depths:",
+            *(f"  {depth}: {n:,}" for depth, n in sorted(self.depths.items())),
+            f"collection sizes: {_summarize(self.collection_sizes)}",
+            f"string lengths: {_summarize(self.string_lengths)}",
+        ]
+        return "\n".join(lines)
+
+
+def _sorted_histogram(histogram: Counter[int]) -> dict[str, int]:
+    return {str(k): histogram[k] for k in sorted(histogram)}
+
+
+def _summarize(histogram: Counter[int]) -> str:
+    if not (total := sum(histogram.values())):
+        return "none"
+    mean = sum(k * n for k, n in histogram.items()) / total
+    return f"min {min(histogram)}, mean {mean:.1f}, max {max(histogram)}"
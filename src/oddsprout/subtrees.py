@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from random import Random
+
+    from oddsprout.generators import JSONValue
+
+
+class _Subtree:
+    __slots__ = ("depth", "nodes", "slot", "texts", "value")
+
+    def __init__(self, value: JSONValue, nodes: int, depth: int, slot: int) -> None:
+        self.value = value
+        self.nodes = nodes
+        self.depth = depth
+        # the index of the subtree among the pooled subtrees of its depth
+        self.slot = slot
+        # by indent width, as indented at the top level
+        self.texts: dict[int, str] = {}
+
+
+class SubtreePool:
+    """
+    A pool of generated subtrees for a JSONGenerator to reuse, holding up to
+    `max_nodes` nodes and evicting the least recently used subtrees first.
+    Subtrees are only reused at the depth they were generated at, so that
+    values keep the same shape.
+    """
+
+    def __init__(self, max_nodes: int) -> None:
+        self.max_nodes = max_nodes
+        # subtrees by the id of their value, from least to most recently used
+        self._subtrees: OrderedDict[int, _Subtree] = OrderedDict()
+        # the same subtrees by depth, for drawing them at random
+        self._slots: dict[int, list[_Subtree]] = {}
+        self.nodes = 0
+        # counts of subtrees added to the pool, reused, and evicted from it,
+        # along with the number of nodes reused
+        self.added = 0
+        self.reused = 0
+        self.reused_nodes = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._subtrees)
+
+    def __contains__(self, value: object) -> bool:
+        return id(value) in self._subtrees
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(max_nodes={self.max_nodes},"
+            f" subtrees={len(self)}, nodes={self.nodes})"
+        )
+
+    def add(self, value: JSONValue, nodes: int, depth: int) -> None:
+        """
+        Add a subtree of `nodes` nodes generated at `depth`, evicting others to
+        make room for it.
+        """
+        if nodes > self.max_nodes or id(value) in self._subtrees:
+            return
+        while self.nodes + nodes > self.max_nodes:
+            self._evict()
+        slots = self._slots.setdefault(depth, [])
+        subtree = _Subtree(value, nodes, depth, len(slots))
+        self._subtrees[id(value)] = subtree
+        slots.append(subtree)
+        self.nodes += nodes
+        self.added += 1
+
+    def has_depth(self, depth: int) -> bool:
+        """Check if there are subtrees generated at `depth` to reuse."""
+        return bool(self._slots.get(depth))
+
+    def draw(self, rng: Random, depth: int) -> tuple[JSONValue, int]:
+        """
+        Draw a random subtree generated at `depth` to reuse, returning its value
+        along with its number of nodes.
+        """
+        slots = self._slots[depth]
+        subtree = slots[int(rng.random() * len(slots))]
+        self._subtrees.move_to_end(id(subtree.value))
+        self.reused += 1
+        self.reused_nodes += subtree.nodes
+        return subtree.value, subtree.nodes
+
+    def text(self, value: JSONValue, indent: int) -> str | None:
+        """
+        Get the JSON text of a pooled subtree indented with `indent` spaces
+        at the top level, if it has been cached.
+        """
+        if (subtree := self._subtrees.get(id(value))) is None:
+            return None
+        return subtree.texts.get(indent)
+
+    def cache_text(self, value: JSONValue, indent: int, text: str) -> None:
+        """
+        Cache the JSON text of a pooled subtree indented with `indent` spaces
+        at the top level.
+        """
+        self._subtrees[id(value)].texts[indent] = text
+
+    def clear(self) -> None:
+        """Remove all subtrees (without resetting the counts)."""
+        self._subtrees.clear()
+        self._slots.clear()
+        self.nodes = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the pool's stats into a JSON-serializable dict."""
+        return {
+            "subtrees": len(self),
+            "nodes": self.nodes,
+            "added": self.added,
+            "reused": self.reused,
+            "reused_nodes": self.reused_nodes,
+            "evicted": self.evicted,
+        }
+
+    def format(self) -> str:
+        """Format the pool's stats as a human-readable report."""
+        return "\n".join(
+            [
+                f"subtree pool: {len(self):,} subtrees, {self.nodes:,} nodes",
+                f"  added: {self.added:,}",
+                f"  reused: {self.reused:,} ({self.reused_nodes:,} nodes)",
+                f"  evicted: {self.evicted:,}",
+            ]
+        )
+
+    def _evict(self) -> None:
+        _, subtree = self._subtrees.popitem(last=False)
+        # the last subtree of the depth takes the slot of the evicted one
+        slots = self._slots[subtree.depth]
+        last = slots.pop()
+        if last is not subtree:
+            slots[subtree.slot] = last
+            last.slot = subtree.slot
+        self.nodes -= subtree.nodes
+        self.evicted += 1
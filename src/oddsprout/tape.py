@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from collections import defaultdict
+from json.encoder import encode_basestring_ascii
+from typing import TYPE_CHECKING, Any
+
+from oddsprout.encoder import LEAF_ENCODERS, Indents
+from oddsprout.exceptions import OddsproutValueError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Mapping
+
+    from _typeshed import SupportsWrite
+
+    from oddsprout.generators import JSONValue
+
+# Node tags. Ints, strings (by their length) and collections (by their number
+# of children) also take a number, and floats a float; object members are
+# stored as a string node for the key followed by the value's nodes.
+_NULL, _FALSE, _TRUE, _INT, _FLOAT, _STRING, _ARRAY, _OBJECT = range(8)
+_CONSTANTS = {_NULL: None, _FALSE: False, _TRUE: True}
+_COLLECTIONS = frozenset((_ARRAY, _OBJECT))
+
+
+class Tape:
+    """
+    A compact representation of a sequence of JSON values, flattened into
+    a tape of type tags and numbers in arrays, with the strings of each value
+    in a single buffer. Values are only turned back into Python objects or
+    JSON text on demand.
+    """
+
+    def __init__(self, values: Iterable[JSONValue] = ()) -> None:
+        self._tags = bytearray()
+        self._numbers = array("q")
+        self._floats = array("d")
+        self._texts: list[str] = []
+        # where each value starts in the tags, numbers and floats
+        self._starts: list[tuple[int, int, int]] = []
+        for value in values:
+            self.append(value)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(values={len(self)}, nodes={len(self._tags)})"
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index: int) -> JSONValue:
+        """Convert the `index`-th value (counting from 0) to Python objects."""
+        return self._decode(index)
+
+    @property
+    def nbytes(self) -> int:
+        """The approximate number of bytes the tape takes up in memory."""
+        return (
+            len(self._tags)
+            + self._numbers.itemsize * len(self._numbers)
+            + self._floats.itemsize * len(self._floats)
+            + sum(map(sys.getsizeof, self._texts))
+        )
+
+    def append(self, value: JSONValue) -> None:
+        """Add a value to the end of the tape."""
+        self._starts.append((len(self._tags), len(self._numbers), len(self._floats)))
+        tags = self._tags
+        numbers = self._numbers
+        texts: list[str] = []
+        stack: list[Any] = [value]
+        while stack:
+            node = stack.pop()
+            type_ = type(node)
+            if type_ is str:
+                tags.append(_STRING)
+                numbers.append(len(node))
+                texts.append(node)
+            elif type_ is int:
+                tags.append(_INT)
+                numbers.append(node)
+            elif type_ is float:
+                tags.append(_FLOAT)
+                self._floats.append(node)
+            elif type_ is dict:
+                tags.append(_OBJECT)
+                numbers.append(len(node))
+                for key, child in reversed(node.items()):
+                    stack.append(child)
+                    stack.append(key)
+            elif type_ is list:
+                tags.append(_ARRAY)
+                numbers.append(len(node))
+                stack.extend(reversed(node))
+            else:
+                tags.append(_NULL if node is None else _TRUE if node else _FALSE)
+        self._texts.append("".join(texts))
+
+    def dumps(self, index: int, indent: int | None = 2) -> str:
+        """
+        Encode the `index`-th value as JSON text, like
+        `json.dumps(value, indent=indent)` (or, with `indent=None`, as
+        `json.dumps(value, separators=(",", ":"))`).
+        """
+        return "".join(self._iter_tokens(index, indent))
+
+    def iter_dumps(self, indent: int | None = 2) -> Iterator[str]:
+        """Encode every value as JSON text, see `dumps`."""
+        return (self.dumps(i, indent) for i in range(len(self)))
+
+    def write_ndjson(self, fp: SupportsWrite[str]) -> None:
+        """Write every value to `fp` as NDJSON."""
+        for text in self.iter_dumps(None):
+            fp.write(text)
+            fp.write("\n")
+
+    def _iter_nodes(self, index: int) -> Iterator[tuple[int, Any]]:
+        # Yields the tag of every node of the `index`-th value along with its
+        # value, or its number of children for collections
+        if not 0 <= index < len(self):
+            msg = f"tape has {len(self)} values, got index {index}"
+            raise OddsproutValueError(msg)
+        numbers = self._numbers
+        floats = self._floats
+        text = self._texts[index]
+        node, number, float_ = self._starts[index]
+        end = self._starts[index + 1][0] if index + 1 < len(self) else None
+        offset = 0
+        for tag in self._tags[node:end]:
+            if tag == _FLOAT:
+                yield tag, floats[float_]
+                float_ += 1
+            elif tag in _CONSTANTS:
+                yield tag, _CONSTANTS[tag]
+            else:
+                number += 1
+                if tag != _STRING:
+                    yield tag, numbers[number - 1]
+                    continue
+                length = numbers[number - 1]
+                yield tag, text[offset : offset + length]
+                offset += length
+
+    def _decode(self, index: int) -> JSONValue:
+        root: JSONValue = None
+        # the collections being filled along with their number of children
+        # left to add
+        stack: list[list[Any]] = []
+        # the key of the object member being read
+        key = None
+        for tag, payload in self._iter_nodes(index):
+            if key is None and stack and type(stack[-1][0]) is dict:
+                key = payload
+                continue
+            count = 0
+            value: JSONValue = payload
+            if tag in _COLLECTIONS:
+                count = payload
+                value = {} if tag == _OBJECT else []
+            if not stack:
+                root = value
+            else:
+                parent = stack[-1]
+                if key is None:
+                    parent[0].append(value)
+                else:
+                    parent[0][key] = value
+                    key = None
+                parent[1] -= 1
+            if count:
+                stack.append([value, count])
+                continue
+            while stack and not stack[-1][1]:
+                stack.pop()
+        return root
+
+    def _iter_tokens(self, index: int, indent: int | None) -> Iterator[str]:
+        indents: Mapping[int, str]
+        if indent is None:
+            indents, colon = defaultdict(str), ":"
+        else:
+            indents, colon = Indents(indent), ": "
+        # the open collections, with their number of children left to write
+        # and whether they're objects
+        stack: list[list[Any]] = []
+        # whether the key of an object member was just written
+        keyed = False
+        for tag, payload in self._iter_nodes(index):
+            if not keyed and stack and stack[-1][1]:
+                yield encode_basestring_ascii(payload) + colon
+                keyed = True
+                continue
+            keyed = False
+            if tag in _COLLECTIONS:
+                is_object = tag == _OBJECT
+                if payload:
+                    stack.append([payload, is_object])
+                    yield ("{" if is_object else "[") + indents[len(stack)]
+                    continue
+                yield "{}" if is_object else "[]"
+            else:
+                yield LEAF_ENCODERS[type(payload)](payload)
+            # the node is complete, along with the collections it was last in
+            while stack:
+                frame = stack[-1]
+                frame[0] -= 1
+                if frame[0]:
+                    yield "," + indents[len(stack)]
+                    break
+                stack.pop()
+                yield indents[len(stack)] + ("}" if frame[1] else "]")
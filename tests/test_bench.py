@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import pytest
+
+from oddsprout.bench import (
+    PRESETS,
+    BenchmarkResult,
+    EncodingResult,
+    _count_nodes,
+    peak_rss,
+    run_benchmark,
+    run_encoding_benchmark,
+    time_types,
+)
+from oddsprout.configuration import Config
+from oddsprout.exceptions import OddsproutValueError
+
+
+@pytest.mark.parametrize("config", PRESETS.values(), ids=PRESETS)
+def test_run_benchmark(config: Config) -> None:
+    result = run_benchmark(config, duration=0)
+    assert result.values == 1
+    assert result.nodes >= 1
+    assert result.size >= 2
+    assert result.seconds > 0
+
+
+def test_run_benchmark_duration() -> None:
+    result = run_benchmark(Config(max_depth=2), duration=0.05)
+    assert result.seconds >= 0.05
+    assert result.values > 1
+
+
+def test_run_benchmark_negative_duration() -> None:
+    with pytest.raises(OddsproutValueError, match="can't be negative"):
+        run_benchmark(Config(), duration=-1)
+
+
+def test_benchmark_result_rates() -> None:
+    result = BenchmarkResult(values=2, nodes=10, size=100, seconds=0.5)
+    assert result.values_per_second == 4
+    assert result.nodes_per_second == 20
+    assert result.bytes_per_second == 200
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_run_encoding_benchmark(indent: int | None) -> None:
+    result = run_encoding_benchmark(Config(max_depth=3), indent=indent, n=5)
+    assert result.size >= 10
+    assert result.seconds > 0
+    assert result.json_seconds > 0
+
+
+def test_run_encoding_benchmark_invalid_n() -> None:
+    with pytest.raises(OddsproutValueError, match="has to be positive"):
+        run_encoding_benchmark(Config(), n=0)
+
+
+def test_encoding_result_rates() -> None:
+    result = EncodingResult(size=100, seconds=0.5, json_seconds=1.0)
+    assert result.bytes_per_second == 200
+    assert result.json_bytes_per_second == 100
+    assert result.speedup == 2
+
+
+def test_time_types() -> None:
+    assert time_types(Config(), n=10).keys() == {
+        "int",
+        "float",
+        "string",
+        "boolean",
+        "null",
+    }
+    assert time_types(Config(types=("number", "array")), n=10).keys() == {
+        "int",
+        "float",
+    }
+    assert time_types(Config(types=("array", "object")), n=10) == {}
+
+
+def test_time_types_invalid_n() -> None:
+    with pytest.raises(OddsproutValueError, match="has to be positive"):
+        time_types(Config(), n=0)
+
+
+def test_peak_rss() -> None:
+    rss = peak_rss()
+    assert rss is None or rss > 1 << 20
+
+
+def test_count_nodes() -> None:
+    assert _count_nodes(None) == 1
+    assert _count_nodes([]) == 1
+    assert _count_nodes({"a": [1, {"b": None}], "c": "d"}) == 6
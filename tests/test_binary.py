@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import struct
+from typing import Any, Callable
+
+import pytest
+
+from oddsprout.binary import BINARY_ENCODERS, encode_cbor, encode_msgpack
+from oddsprout.configuration import Config
+from oddsprout.generators import JSONGenerator, JSONValue
+
+CONFIGS = [
+    Config(seed=1),
+    Config(seed=2, charset="alnum", max_depth=4),
+    Config(seed=3, unique_keys=True, string_size=(0, 40), base="object"),
+]
+
+
+def _decode_msgpack(data: bytes, pos: int = 0) -> tuple[Any, int]:
+    # A decoder for the subset of MessagePack the encoder writes
+    marker = data[pos]
+    pos += 1
+    if marker < 0x80 or marker >= 0xE0:
+        return marker - (marker >= 0xE0) * 0x100, pos
+    if marker in {0xC0, 0xC2, 0xC3}:
+        return {0xC0: None, 0xC2: False, 0xC3: True}[marker], pos
+    if marker == 0xCB:
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    if 0xCC <= marker <= 0xD3:
+        size = 1 << (marker - 0xCC) % 4
+        value = int.from_bytes(data[pos : pos + size], "big", signed=marker >= 0xD0)
+        return value, pos + size
+    if marker >> 5 == 0b101 or marker in {0xD9, 0xDA, 0xDB}:
+        if marker >> 5 == 0b101:
+            length = marker & 0x1F
+        else:
+            size = 1 << marker - 0xD9
+            length = int.from_bytes(data[pos : pos + size], "big")
+            pos += size
+        return data[pos : pos + length].decode(), pos + length
+    if marker >> 4 in {0x8, 0x9}:
+        length = marker & 0xF
+    else:
+        size = 2 if marker in {0xDC, 0xDE} else 4
+        length = int.from_bytes(data[pos : pos + size], "big")
+        pos += size
+    items = []
+    for _ in range(length * (2 if marker >> 4 == 0x8 or marker >= 0xDE else 1)):
+        item, pos = _decode_msgpack(data, pos)
+        items.append(item)
+    if marker >> 4 == 0x8 or marker >= 0xDE:
+        return dict(zip(items[::2], items[1::2])), pos
+    return items, pos
+
+
+def _decode_cbor(data: bytes, pos: int = 0) -> tuple[Any, int]:
+    # A decoder for the subset of CBOR the encoder writes
+    major, info = data[pos] >> 5, data[pos] & 0x1F
+    pos += 1
+    if major == 7:
+        if info == 27:
+            return struct.unpack_from(">d", data, pos)[0], pos + 8
+        return {20: False, 21: True, 22: None}[info], pos
+    argument = info
+    if info >= 24:
+        size = 1 << info - 24
+        argument = int.from_bytes(data[pos : pos + size], "big")
+        pos += size
+    if major in {0, 1}:
+        return argument if major == 0 else -1 - argument, pos
+    if major == 3:
+        return data[pos : pos + argument].decode(), pos + argument
+    items = []
+    for _ in range(argument * (2 if major == 5 else 1)):
+        item, pos = _decode_cbor(data, pos)
+        items.append(item)
+    if major == 5:
+        return dict(zip(items[::2], items[1::2])), pos
+    return items, pos
+
+
+_DECODERS: dict[str, Callable[[bytes, int], tuple[Any, int]]] = {
+    "msgpack": _decode_msgpack,
+    "cbor": _decode_cbor,
+}
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (None, "c0"),
+        (False, "c2"),
+        (True, "c3"),
+        (0, "00"),
+        (127, "7f"),
+        (128, "cc80"),
+        (256, "cd0100"),
+        (65536, "ce00010000"),
+        (1 << 32, "cf0000000100000000"),
+        (-1, "ff"),
+        (-32, "e0"),
+        (-33, "d0df"),
+        (-129, "d1ff7f"),
+        (-32769, "d2ffff7fff"),
+        (-(1 << 31) - 1, "d3ffffffff7fffffff"),
+        (1.5, "cb3ff8000000000000"),
+        ("", "a0"),
+        ("é", "a2c3a9"),
+        ("a" * 32, "d920" + "61" * 32),
+        ("a" * 256, "da0100" + "61" * 256),
+        ([], "90"),
+        ([1, [None]], "920191c0"),
+        ([0] * 16, "dc0010" + "00" * 16),
+        ({}, "80"),
+        ({"a": {"b": False}}, "81a16181a162c2"),
+    ],
+)
+def test_encode_msgpack(value: JSONValue, expected: str) -> None:
+    assert encode_msgpack(value).hex() == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (None, "f6"),
+        (False, "f4"),
+        (True, "f5"),
+        (0, "00"),
+        (23, "17"),
+        (24, "1818"),
+        (256, "190100"),
+        (65536, "1a00010000"),
+        (1 << 32, "1b0000000100000000"),
+        (-1, "20"),
+        (-25, "3818"),
+        (1.5, "fb3ff8000000000000"),
+        ("", "60"),
+        ("é", "62c3a9"),
+        ("a" * 24, "7818" + "61" * 24),
+        ([], "80"),
+        ([1, [None]], "820181f6"),
+        ([0] * 24, "9818" + "00" * 24),
+        ({}, "a0"),
+        ({"a": {"b": False}}, "a16161a16162f4"),
+    ],
+)
+def test_encode_cbor(value: JSONValue, expected: str) -> None:
+    assert encode_cbor(value).hex() == expected
+
+
+@pytest.mark.parametrize(
+    ("encode", "value"),
+    [
+        (encode_msgpack, 1 << 64),
+        (encode_msgpack, -(1 << 63) - 1),
+        (encode_cbor, 1 << 64),
+        (encode_cbor, -(1 << 64) - 1),
+    ],
+)
+def test_encode_overflow(encode: Callable[[JSONValue], bytes], value: int) -> None:
+    with pytest.raises(OverflowError, match="64 bits"):
+        encode(value)
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("fmt", ["msgpack", "cbor"])
+def test_encode_generated(config: Config, fmt: str) -> None:
+    for value in JSONGenerator(config).generate_many(10):
+        data = BINARY_ENCODERS[fmt](value)
+        assert _DECODERS[fmt](data, 0) == (value, len(data))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import pickle
 import re
 from typing import TYPE_CHECKING, Any
 
@@ -18,6 +19,8 @@ from oddsprout.exceptions import OddsproutConfigurationError, OddsproutValueErro
 if TYPE_CHECKING:
     from pathlib import Path
 
+    from oddsprout.configuration import Charset, RNGKind
+
 
 def test_invalid_syntax_toml(tmp_path: Path) -> None:
     path = tmp_path / "invalid_syntax.toml"
@@ -63,6 +66,11 @@ def test_no_unexpected_items() -> None:
         ({"string": [1, "invalid"]}, "expected a [min, max] array for 'string'"),
         ({"collection": [1, 2, 3]}, "expected a [min, max] array for 'collection'"),
         ({"base": [1, 2], "base-max": 1}, "can't use 'base' and 'base-max' at once"),
+        ({"max-nodes": 0}, "expected a positive integer for 'max-nodes'"),
+        ({"max-bytes": "1kB"}, "expected a positive integer for 'max-bytes'"),
+        ({"max-depth": True}, "expected a positive integer for 'max-depth'"),
+        ({"target-bytes": 0}, "expected a positive integer for 'target-bytes'"),
+        ({"tolerance": 1}, "expected a number in [0, 1) for 'tolerance'"),
     ],
 )
 def test_check_bounds_config_fail(config: dict[str, Any], err_msg: str) -> None:
@@ -76,6 +84,10 @@ def test_check_bounds_config_pass() -> None:
             "string": [1, 2],
             "collection": [1, 2],
             "base-max": 1,
+            "max-depth": 3,
+            "max-nodes": 1000,
+            "max-bytes": 65536,
+            "tolerance": 0.5,
         }
     )
 
@@ -92,6 +104,26 @@ def test_check_bounds_config_pass() -> None:
         ({"include": 1}, "expected an array of type names for 'include'"),
         ({"include": ["invalid"]}, "invalid type 'invalid' in 'include'"),
         ({"include": [], "exclude": []}, "can't use 'include' and 'exclude' at once"),
+        ({"unique-keys": 1}, "expected a boolean for 'unique-keys'"),
+        (
+            {"key-vocabulary": 0},
+            "expected a positive integer or a non-empty array of strings",
+        ),
+        (
+            {"key-vocabulary": ["a", 1]},
+            "expected a positive integer or a non-empty array of strings",
+        ),
+        ({"key-skew": -1}, "expected a non-negative number for 'key-skew'"),
+        ({"weights": [1]}, "expected a table of type weights for 'weights'"),
+        ({"weights": {"invalid": 1}}, "invalid type 'invalid' in 'weights'"),
+        (
+            {"weights": {"string": -1}},
+            "expected a non-negative number for the weight of 'string'",
+        ),
+        (
+            {"weights": {"string": "1"}},
+            "expected a non-negative number for the weight of 'string'",
+        ),
     ],
 )
 def test_check_types_config_fail(config: dict[str, Any], err_msg: str) -> None:
@@ -105,6 +137,7 @@ def test_check_types_config_pass() -> None:
             "charset": "ascii",
             "base": "any",
             "exclude": ["string"],
+            "weights": {"int": 2, "object": 0.5},
         }
     )
 
@@ -120,6 +153,23 @@ def test_check_types_config_pass() -> None:
             {"bounds": {"base": [1, 2], "string-max": 10}},
             Config(base_size=(1, 2), string_size=(0, 10)),
         ),
+        (
+            {"bounds": {"max-depth": 3, "max-nodes": 100, "max-bytes": 4096}},
+            Config(max_depth=3, max_nodes=100, max_bytes=4096),
+        ),
+        (
+            {"bounds": {"target-bytes": 1024, "tolerance": 0.1}},
+            Config(target_bytes=1024, tolerance=0.1),
+        ),
+        (
+            {"types": {"weights": {"string": 3, "array": 0.5}}},
+            Config(weights={"string": 3, "array": 0.5}),
+        ),
+        ({"types": {"unique-keys": True}}, Config(unique_keys=True)),
+        (
+            {"types": {"key-vocabulary": ["id", "name"], "key-skew": 1}},
+            Config(key_vocabulary=("id", "name"), key_skew=1),
+        ),
     ],
 )
 def test_transform_config(config: dict[str, Any], transformed: Config) -> None:
@@ -219,3 +269,241 @@ def test_config_types_invalid() -> None:
         match="invalid types: 'invalid'",
     ):
         Config(types=("invalid", "int"))
+
+
+def test_config_invalid_rng() -> None:
+    with pytest.raises(
+        OddsproutValueError,
+        match="invalid RNG 'invalid'",
+    ):
+        Config(rng="invalid")  # type: ignore[arg-type]
+
+
+def test_config_rng_kind() -> None:
+    assert Config().rng_kind() == "ixia"
+    assert Config(rng="pool").rng_kind() == "pool"
+    assert Config(seed=1).rng_kind() == "mersenne"
+    assert Config(seed=1, rng="mersenne").rng_kind() == "mersenne"
+
+
+@pytest.mark.parametrize("rng", ["ixia", "pool"])
+def test_config_seed_invalid_rng(rng: RNGKind) -> None:
+    with pytest.raises(
+        OddsproutValueError, match=f"only the 'mersenne' RNG can be seeded, got '{rng}'"
+    ):
+        Config(seed=1, rng=rng)
+
+
+@pytest.mark.parametrize("seed", ["1", 1.5, True])
+def test_config_invalid_seed(seed: object) -> None:
+    with pytest.raises(OddsproutValueError, match="expected an integer for 'seed'"):
+        Config(seed=seed)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize(
+    "field", ["max_depth", "max_nodes", "max_bytes", "target_bytes"]
+)
+@pytest.mark.parametrize("value", [0, -1, 1.5, True])
+def test_config_invalid_budget(field: str, value: object) -> None:
+    with pytest.raises(
+        OddsproutValueError, match=f"expected a positive integer for '{field}'"
+    ):
+        Config(**{field: value})  # type: ignore[arg-type]
+
+
+def test_config_invalid_divergence() -> None:
+    with pytest.raises(OddsproutValueError, match="invalid divergence policy 'never'"):
+        Config(divergence="never")  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("tolerance", [-0.1, 1, 2.5, True, "0.1"])
+def test_config_invalid_tolerance(tolerance: object) -> None:
+    with pytest.raises(
+        OddsproutValueError, match=r"expected a number in \[0, 1\) for 'tolerance'"
+    ):
+        Config(tolerance=tolerance)  # type: ignore[arg-type]
+
+
+def test_config_type_weights() -> None:
+    assert Config().type_weights() == {
+        "int": 1,
+        "float": 1,
+        "string": 1,
+        "boolean": 1,
+        "null": 1,
+        "array": 0.05,
+        "object": 0.05,
+    }
+    config = Config(
+        types=("object", "number", "null"),
+        weights={"number": 2, "float": 0.5, "object": 1, "string": 0},
+    )
+    assert config.type_weights() == {"int": 2, "float": 0.5, "null": 1, "object": 1}
+
+
+def test_config_weights_copied() -> None:
+    weights = {"string": 2.0}
+    config = Config(weights=weights)
+    weights["string"] = 0
+    assert config.weights == {"string": 2.0}
+    with pytest.raises(TypeError):
+        config.weights["int"] = -3  # type: ignore[index]
+    assert hash(config) == hash(Config(weights={"string": 2.0}))
+    assert hash(config) != hash(Config(weights={"string": 3.0}))
+    assert pickle.loads(pickle.dumps(config)) == config  # noqa: S301
+
+
+@pytest.mark.parametrize(
+    ("weights", "err_msg"),
+    [
+        ([("int", 1)], "expected a mapping of type names to numbers for 'weights'"),
+        ({"str": 1, "list": 1}, "invalid types in 'weights': 'list', 'str'"),
+        ({"int": -1}, "expected a non-negative number for the weight of 'int'"),
+        ({"null": False}, "expected a non-negative number for the weight of 'null'"),
+        (
+            {"int": 0, "float": 0, "string": 2},
+            "the weights of the included types can't all be zero",
+        ),
+    ],
+)
+def test_config_invalid_weights(weights: object, err_msg: str) -> None:
+    with pytest.raises(OddsproutValueError, match=re.escape(err_msg)):
+        Config(types=("number",), weights=weights)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize(
+    ("charset", "string_size", "key_space"),
+    [("digits", (0, 2), 111), ("alpha", (3, 3), 52**3), ("ascii", (0, 0), 1)],
+)
+def test_config_key_space(
+    charset: Charset, string_size: tuple[int, int], key_space: int
+) -> None:
+    assert Config(charset=charset, string_size=string_size).key_space() == key_space
+
+
+@pytest.mark.parametrize("limit", [200, 1000])
+def test_config_key_space_limit(limit: int) -> None:
+    # counting all 95 ** 100_000 strings exactly would take a while
+    config = Config(string_size=(0, 100_000), unique_keys=True)
+    assert config.key_space(limit) > limit
+    assert Config(charset="digits", string_size=(0, 2)).key_space(limit) == 111
+
+
+@pytest.mark.parametrize(
+    ("config", "err_msg"),
+    [
+        (
+            {"collection_size": (0, 12)},
+            "'collection_size' allows objects with up to 12 children with"
+            " 'unique_keys', but there are only 11 possible keys",
+        ),
+        (
+            {"base": "object", "base_size": (5, 20)},
+            "'base_size' allows objects with up to 20 children",
+        ),
+    ],
+)
+def test_config_unique_keys_too_few_keys(config: dict[str, Any], err_msg: str) -> None:
+    with pytest.raises(OddsproutValueError, match=re.escape(err_msg)):
+        Config(
+            unique_keys=True,
+            charset="digits",
+            string_size=(0, 1),
+            collection_size=config.get("collection_size", (0, 10)),
+            base=config.get("base", "any"),
+            base_size=config.get("base_size", (0, 10)),
+        )
+
+
+def test_config_unique_keys_enough_keys() -> None:
+    # objects aren't generated below the root, and the root is an array
+    Config(unique_keys=True, types=("int", "array"), base="array", charset="digits")
+    # with a target size, base_size doesn't bound the size of the root
+    Config(
+        unique_keys=True,
+        charset="digits",
+        string_size=(1, 1),
+        collection_size=(0, 5),
+        target_bytes=1000,
+    )
+    # the keys don't have to be unique otherwise
+    Config(charset="digits", string_size=(1, 1))
+
+
+def test_config_invalid_unique_keys() -> None:
+    with pytest.raises(
+        OddsproutValueError, match="expected a boolean for 'unique_keys'"
+    ):
+        Config(unique_keys=1)  # type: ignore[arg-type]
+
+
+def test_config_key_vocabulary() -> None:
+    config = Config(key_vocabulary=["id", "name", "id"])  # type: ignore[arg-type]
+    assert config.key_vocabulary == ("id", "name")
+    assert config.key_space() == 2
+    assert Config(key_vocabulary=50, key_skew=1.5).key_space() == 50
+
+
+@pytest.mark.parametrize(
+    ("config", "err_msg"),
+    [
+        (
+            {"key_vocabulary": ()},
+            "expected a non-empty sequence of strings for 'key_vocabulary'",
+        ),
+        (
+            {"key_vocabulary": ("a", 1)},
+            "expected a non-empty sequence of strings for 'key_vocabulary'",
+        ),
+        (
+            {"key_vocabulary": ("12", "a1"), "charset": "digits"},
+            "keys in 'key_vocabulary' can only have characters of the charset,"
+            " got 'a1'",
+        ),
+        (
+            {"key_vocabulary": 0},
+            "expected a positive integer or a sequence of strings"
+            " for 'key_vocabulary'",
+        ),
+        (
+            {"key_vocabulary": 112, "charset": "digits", "string_size": (0, 2)},
+            "'key_vocabulary' can't have more than the 111 strings",
+        ),
+        (
+            {"key_vocabulary": 10, "key_skew": -1},
+            "expected a non-negative number for 'key_skew'",
+        ),
+        ({"key_skew": 1}, "'key_skew' requires a 'key_vocabulary'"),
+    ],
+)
+def test_config_invalid_key_vocabulary(config: dict[str, Any], err_msg: str) -> None:
+    with pytest.raises(OddsproutValueError, match=re.escape(err_msg)):
+        Config(**config)
+
+
+def test_config_unique_keys_key_vocabulary() -> None:
+    with pytest.raises(OddsproutValueError, match="but there are only 5 possible keys"):
+        Config(unique_keys=True, key_vocabulary=5, collection_size=(0, 6))
+    Config(unique_keys=True, key_vocabulary=5, collection_size=(0, 5), base="array")
+
+
+@pytest.mark.parametrize(
+    ("config", "err_msg"),
+    [
+        ({"subtree_reuse": -0.1}, "expected a number in [0, 1] for 'subtree_reuse'"),
+        ({"subtree_reuse": 1.5}, "expected a number in [0, 1] for 'subtree_reuse'"),
+        ({"subtree_reuse": True}, "expected a number in [0, 1] for 'subtree_reuse'"),
+        (
+            {"subtree_pool_size": 0},
+            "expected a positive integer for 'subtree_pool_size'",
+        ),
+        (
+            {"subtree_reuse": 0.5, "max_nodes": 100},
+            "'subtree_reuse' can't be used with 'max_nodes', 'max_bytes'"
+            " or 'target_bytes'",
+        ),
+    ],
+)
+def test_config_invalid_subtree_reuse(config: dict[str, Any], err_msg: str) -> None:
+    with pytest.raises(OddsproutValueError, match=re.escape(err_msg)):
+        Config(**config)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import TYPE_CHECKING
+
+import pytest
+
+from oddsprout.configuration import Config
+from oddsprout.corpus import INDEX_NAME, Corpus, shard_name, write_corpus
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+CONFIG = Config(seed=3, base_size=(0, 20), collection_size=(0, 10))
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_write_corpus(tmp_path: Path, jobs: int) -> None:
+    write_corpus(CONFIG, tmp_path / "corpus", 50, shard_size=2000, jobs=jobs)
+    gen = JSONGenerator(CONFIG)
+    with Corpus(tmp_path / "corpus") as corpus:
+        assert len(corpus) == 50
+        for i in (49, 0, 17):
+            assert corpus.load(i) == gen.generate_document(i)
+            assert json.loads(corpus.read(i)) == corpus.load(i)
+
+
+def test_write_corpus_shards(tmp_path: Path) -> None:
+    write_corpus(CONFIG, tmp_path, 50, shard_size=2000)
+    shards = sorted(tmp_path.glob("shard-*.ndjson"))
+    assert len(shards) > 1
+    assert shards[0].name == shard_name(0)
+    lines = [line for shard in shards for line in shard.read_text().splitlines()]
+    assert lines == [
+        json.dumps(value, separators=(",", ":"))
+        for value in JSONGenerator(CONFIG).generate_many(50)
+    ]
+    # shards only exceed their size with a single value
+    for shard in shards:
+        text = shard.read_text()
+        assert len(text) <= 2000 or text.count("\n") == 1
+
+
+def test_write_corpus_nothing(tmp_path: Path) -> None:
+    write_corpus(CONFIG, tmp_path, 0)
+    assert [p.name for p in tmp_path.iterdir()] == [INDEX_NAME]
+    with Corpus(tmp_path) as corpus:
+        assert len(corpus) == 0
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "err_msg"),
+    [
+        ({"n": -1}, "number of values can't be negative, got -1"),
+        ({"shard_size": 0}, "shard size has to be in range [1, 2**32], got 0"),
+        (
+            {"shard_size": 2**32 + 1},
+            "shard size has to be in range [1, 2**32], got 4294967297",
+        ),
+    ],
+)
+def test_write_corpus_invalid(
+    tmp_path: Path, kwargs: dict[str, int], err_msg: str
+) -> None:
+    with pytest.raises(OddsproutValueError, match=re.escape(err_msg)):
+        write_corpus(CONFIG, tmp_path, **{"n": 1, **kwargs})
+
+
+def test_write_corpus_not_empty(tmp_path: Path) -> None:
+    (tmp_path / "notes.txt").write_text("")
+    with pytest.raises(OddsproutValueError, match="isn't empty"):
+        write_corpus(CONFIG, tmp_path, 1)
+
+
+def test_write_corpus_not_directory(tmp_path: Path) -> None:
+    (tmp_path / "corpus").write_text("")
+    with pytest.raises(OddsproutValueError, match="isn't a directory"):
+        write_corpus(CONFIG, tmp_path / "corpus", 1)
+
+
+@pytest.mark.parametrize("index", [-1, 5])
+def test_corpus_out_of_range(tmp_path: Path, index: int) -> None:
+    write_corpus(CONFIG, tmp_path, 5)
+    with (
+        Corpus(tmp_path) as corpus,
+        pytest.raises(
+            OddsproutValueError, match=f"corpus has 5 values, got index {index}"
+        ),
+    ):
+        corpus.read(index)
+
+
+@pytest.mark.parametrize("data", [b"\0", b"ODDSIDX0", b"ODDSIDX1\0\0\0\0"])
+def test_corpus_invalid_index(tmp_path: Path, data: bytes) -> None:
+    (tmp_path / INDEX_NAME).write_bytes(data)
+    with pytest.raises(OddsproutValueError, match="isn't a corpus index"):
+        Corpus(tmp_path)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+import pickle
+import sys
+
+import pytest
+
+from oddsprout.configuration import Charset, Config
+from oddsprout.encoder import Encoder
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator, JSONValue
+
+
+# json.dumps in the layout of the encoder, also used by the tape tests
+def dumps(value: JSONValue, indent: int | None) -> str:
+    if indent is None:
+        return json.dumps(value, separators=(",", ":"))
+    return json.dumps(value, indent=indent)
+
+
+@pytest.mark.parametrize("indent", [None, 0, 2, 4])
+@pytest.mark.parametrize("charset", ["ascii", "alpha", "digits"])
+def test_encoder(indent: int | None, charset: Charset) -> None:
+    gen = JSONGenerator(Config(seed=1, charset=charset, max_depth=5))
+    encoder = Encoder(indent, charset)
+    for _ in range(20):
+        value = gen.generate_value()
+        assert encoder(value) == dumps(value, indent)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [1, -1.5, "a\nb", True, False, None, [], {}, [[]], {"a": {}}, [{"b": [None]}]],
+)
+@pytest.mark.parametrize("indent", [None, 2])
+def test_encoder_small_values(value: JSONValue, indent: int | None) -> None:
+    assert Encoder(indent)(value) == dumps(value, indent)
+
+
+@pytest.mark.parametrize("indent", [None, 1])
+def test_encoder_deep_nesting(indent: int | None) -> None:
+    value: JSONValue = [1]
+    for i in range(3000):
+        value = {str(i): value} if i % 2 else [value, []]
+    text = Encoder(indent)(value)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(20_000)
+    try:
+        assert text == dumps(value, indent)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+@pytest.mark.parametrize("indent", [None, 0, 2, 4])
+def test_encoder_subtrees(indent: int | None) -> None:
+    gen = JSONGenerator(Config(subtree_reuse=0.5, max_depth=5, collection_size=(0, 8)))
+    encoder = Encoder(indent, subtrees=gen.subtree_pool)
+    for _ in range(30):
+        value = gen.generate_value()
+        assert encoder(value) == dumps(value, indent)
+        # reused subtrees are written from the cached text the second time
+        assert encoder(value) == dumps(value, indent)
+    assert gen.subtree_pool
+    assert gen.subtree_pool.reused
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_encoder_pickle(indent: int | None) -> None:
+    encoder = pickle.loads(pickle.dumps(Encoder(indent, "alnum")))  # noqa: S301
+    assert encoder == Encoder(indent, "alnum")
+    assert encoder({"a": [1, "b"]}) == dumps({"a": [1, "b"]}, indent)
+
+
+def test_encoder_invalid_indent() -> None:
+    with pytest.raises(OddsproutValueError, match="indent can't be negative"):
+        Encoder(-1)
+
+
+def test_encoder_invalid_charset() -> None:
+    with pytest.raises(OddsproutValueError, match="invalid charset 'latin'"):
+        Encoder(charset="latin")  # type: ignore[arg-type]
@@ -0,0 +1,168 @@
+import json
+import math
+from dataclasses import replace
+
+import pytest
+
+from oddsprout.bench import _count_nodes
+from oddsprout.configuration import Config
+from oddsprout.estimate import _mean_int_width, capped_depth, estimate_size
+from oddsprout.generators import JSONGenerator
+
+DIVERGING = Config(collection_size=(100, 200))
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        Config(types=("null",), base="array", base_size=(3, 3)),
+        Config(
+            types=("array",),
+            base="array",
+            base_size=(2, 2),
+            collection_size=(2, 2),
+            max_depth=3,
+        ),
+        Config(
+            types=("array", "int"),
+            base="array",
+            base_size=(0, 0),
+            max_depth=5,
+        ),
+        Config(
+            types=("array", "string"),
+            base="array",
+            base_size=(1, 1),
+            collection_size=(1, 1),
+            string_size=(3, 3),
+            charset="digits",
+            max_depth=1,
+        ),
+        Config(
+            types=("null",),
+            base="object",
+            base_size=(3, 3),
+            unique_keys=True,
+            key_vocabulary=("ab", "cd", "ef"),
+            key_skew=1,
+        ),
+        # every child but the last is overwritten
+        Config(
+            types=("null",),
+            base="object",
+            base_size=(3, 3),
+            key_vocabulary=("ab",),
+        ),
+    ],
+)
+def test_estimate_size_exact(config: Config) -> None:
+    # values of these configs are all the same size
+    value = JSONGenerator(config).generate_value()
+    estimate = estimate_size(config)
+    assert estimate.expected_bytes == len(json.dumps(value, indent=2))
+    assert estimate.expected_nodes == _count_nodes(value)
+
+
+def test_estimate_size_default() -> None:
+    # with unique keys, objects are as large as drawn
+    estimate = estimate_size(Config(unique_keys=True))
+    assert estimate.branching_factor == pytest.approx(0.1 / 5.1 * 50)
+    assert estimate.expected_nodes == pytest.approx(1 + 50 / (1 - 50 / 51))
+    assert not estimate.diverges
+    tails = list(estimate.depth_tail.values())
+    assert tails == sorted(tails, reverse=True)
+    assert 0 < tails[-1] < tails[0] < 1
+
+
+def test_estimate_size_weights() -> None:
+    config = Config(
+        weights={"object": 1, "array": 0, "string": 3},
+        unique_keys=True,
+        max_depth=4,
+    )
+    estimate = estimate_size(config)
+    assert estimate.branching_factor == pytest.approx(1 / 8 * 50)
+    values = [
+        JSONGenerator(replace(config, seed=i)).generate_value() for i in range(50)
+    ]
+    nodes = sum(map(_count_nodes, values)) / len(values)
+    assert nodes == pytest.approx(estimate.expected_nodes, rel=0.3)
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        Config(
+            types=("object",),
+            base="object",
+            string_size=(1, 1),
+            charset="digits",
+            max_depth=3,
+        ),
+        Config(
+            types=("object", "null"),
+            base="object",
+            key_vocabulary=20,
+            key_skew=1.2,
+            max_depth=4,
+        ),
+    ],
+)
+def test_estimate_size_key_collisions(config: Config) -> None:
+    # objects lose the children of repeated keys, most of them with 10 or 20
+    # possible keys
+    estimate = estimate_size(config)
+    values = [
+        JSONGenerator(replace(config, seed=i)).generate_value() for i in range(200)
+    ]
+    nodes = sum(map(_count_nodes, values)) / len(values)
+    assert nodes == pytest.approx(estimate.expected_nodes, rel=0.1)
+
+
+def test_estimate_size_max_depth() -> None:
+    estimate = estimate_size(Config(max_depth=5))
+    assert estimate.depth_tail[2] > 0
+    assert estimate.depth_tail[5] == estimate.depth_tail[10] == 0
+
+
+def test_estimate_size_diverging() -> None:
+    estimate = estimate_size(DIVERGING)
+    assert estimate.branching_factor > 1
+    assert estimate.diverges
+    assert math.isinf(estimate.expected_bytes)
+    assert "expected nodes: infinite" in estimate.format()
+
+
+def test_estimate_size_diverging_arrays() -> None:
+    estimate = estimate_size(Config(types=("array",)))
+    assert estimate.diverges
+    assert math.isinf(estimate.expected_bytes)
+    assert "expected bytes: infinite" in estimate.format()
+    # roots are always empty
+    estimate = estimate_size(replace(DIVERGING, base_size=(0, 0)))
+    assert (estimate.expected_nodes, estimate.expected_bytes) == (1, 2)
+
+
+def test_estimate_size_huge_max_depth() -> None:
+    assert estimate_size(Config(max_depth=10**9)).expected_nodes == pytest.approx(
+        estimate_size(Config()).expected_nodes
+    )
+    bounded = replace(DIVERGING, max_depth=10**9)
+    assert math.isinf(estimate_size(bounded).expected_nodes)
+
+
+def test_capped_depth() -> None:
+    depth = capped_depth(DIVERGING, 10_000)
+    for max_depth, fits in ((depth, True), (depth + 1, False)):
+        config = replace(DIVERGING, max_depth=max_depth)
+        assert (estimate_size(config).expected_nodes <= 10_000) is fits
+
+
+@pytest.mark.parametrize(
+    ("low", "high", "width"),
+    [(0, 9, 1), (5, 12, 11 / 8), (-12, 0, 28 / 13), (-3, -1, 2)],
+)
+def test_mean_int_width(low: int, high: int, width: float) -> None:
+    assert _mean_int_width(low, high) == pytest.approx(width)
+    numbers = range(low, high + 1)
+    assert width == pytest.approx(sum(len(str(n)) for n in numbers) / len(numbers))
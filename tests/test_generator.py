@@ -1,10 +1,36 @@
-from typing import Literal
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import TYPE_CHECKING, Callable, Literal, TypeVar, cast
 
 import pytest
 
+from oddsprout.bench import _count_nodes
+from oddsprout.binary import encode_cbor, encode_msgpack
 from oddsprout.configuration import Config
-from oddsprout.exceptions import OddsproutRecursionError
-from oddsprout.generators import JSONGenerator, _generate_float, _generate_int
+from oddsprout.estimate import capped_depth
+from oddsprout.exceptions import OddsproutRecursionError, OddsproutValueError
+from oddsprout.generators import (
+    _TYPE_NAMES,
+    JSONArray,
+    JSONGenerator,
+    JSONObject,
+    JSONValue,
+    _check_divergence,
+)
+from oddsprout.lazy import LazyArray, LazyObject, materialize
+from oddsprout.stats import GenerationStats
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+_T = TypeVar("_T")
 
 
 @pytest.mark.parametrize("base_type", ["array", "object", "any"])
@@ -13,10 +39,72 @@ def test_json_generator(base_type: Literal["array", "object", "any"]) -> None:
     gen.generate_value()
 
 
+@pytest.mark.parametrize("rng", ["ixia", "mersenne", "pool"])
+def test_json_generator_rng(rng: Literal["ixia", "mersenne", "pool"]) -> None:
+    gen = JSONGenerator(Config(rng=rng))
+    gen.generate_value()
+
+
 def test_json_generator_number_alias() -> None:
     gen = JSONGenerator(Config(types=("number",)))
 
-    assert set(gen._type_pool) & {_generate_int, _generate_float}
+    assert len(gen._type_pool) == 2
+    assert gen._generate_floats in gen._type_pool
+
+
+def test_json_generator_weights() -> None:
+    gen = JSONGenerator(
+        Config(
+            seed=0,
+            base="array",
+            base_size=(1000, 1000),
+            types=("int", "string", "null", "array"),
+            weights={"int": 3, "string": 0, "array": 0.1},
+            max_depth=2,
+        ),
+        stats=True,
+    )
+    value = cast(list[JSONValue], gen.generate_value())
+    assert gen.stats is not None
+    assert "string" not in gen.stats.nodes
+    ints = sum(type(child) is int for child in value)
+    assert ints / len(value) == pytest.approx(3 / 4.1, abs=0.05)
+    # leaves are drawn with their weights too once max_depth is reached
+    nested = [child for array in value if type(array) is list for child in array]
+    assert sum(type(child) is int for child in nested) > 2 * nested.count(None)
+
+
+@pytest.mark.parametrize("size", [0, 7])
+def test_json_generator_fixed_string_size(size: int) -> None:
+    gen = JSONGenerator(
+        Config(
+            types=("string",),
+            base="object",
+            base_size=(200, 200),
+            string_size=(size, size),
+        )
+    )
+    value = cast(dict[str, str], gen.generate_value())
+    assert {len(s) for s in value.values()} == {size}
+    # keys are drawn with the same length
+    assert {len(k) for k in value} <= {size}
+
+
+def test_json_generator_single_type() -> None:
+    gen = JSONGenerator(
+        Config(types=("array",), base="array", collection_size=(2, 2), max_depth=4)
+    )
+    value = cast(JSONArray, gen.generate_value())
+    # every child of the root has 2 children with 2 empty arrays each
+    assert _count_nodes(value) == 1 + 7 * len(value)
+
+
+def test_json_generator_divergence_cached() -> None:
+    config = Config(collection_size=(100, 200), divergence="cap")
+    JSONGenerator(config)
+    hits = _check_divergence.cache_info().hits
+    assert JSONGenerator(config)._max_depth == JSONGenerator(config)._max_depth
+    assert _check_divergence.cache_info().hits == hits + 2
 
 
 def test_json_generator_repr() -> None:
@@ -32,3 +120,858 @@ def test_json_generator_recursion_error() -> None:
     )
     with pytest.raises(OddsproutRecursionError):
         gen.generate_value()
+    with pytest.raises(OddsproutRecursionError):
+        "".join(gen.iter_chunks())
+
+
+def test_json_generator_seed() -> None:
+    config = Config(seed=42, base_size=(5, 10), collection_size=(0, 5))
+    first, second = JSONGenerator(config), JSONGenerator(config)
+    values = [first.generate_value() for _ in range(5)]
+
+    assert values == [second.generate_value() for _ in range(5)]
+    assert values != [JSONGenerator(Config(seed=43)).generate_value()] * 5
+
+
+def test_json_generator_generate_document() -> None:
+    gen = JSONGenerator(Config(seed=1, collection_size=(0, 5)))
+    values = [gen.generate_value() for _ in range(4)]
+
+    assert gen.generate_document(3) == values[3]
+    assert gen.generate_document(0) == values[0]
+
+
+@pytest.mark.parametrize("base", ["array", "object"])
+def test_json_generator_generate_child(base: Literal["array", "object"]) -> None:
+    gen = JSONGenerator(
+        Config(seed=7, base=base, base_size=(5, 5), collection_size=(0, 5))
+    )
+    gen.generate_value()
+    value = gen.generate_value()
+
+    if isinstance(value, dict):
+        items = list(value.items())
+        for i in range(5):
+            assert gen.generate_child(1, i) == dict((items[i],))
+    else:
+        assert isinstance(value, list)
+        for i in range(5):
+            assert gen.generate_child(1, i) == [value[i]]
+
+
+def test_json_generator_generate_child_out_of_range() -> None:
+    gen = JSONGenerator(Config(seed=7, base_size=(3, 3)))
+    with pytest.raises(OddsproutValueError, match="document 0 has 3 children"):
+        gen.generate_child(0, 3)
+
+
+def test_json_generator_regenerate_without_seed() -> None:
+    gen = JSONGenerator()
+    with pytest.raises(OddsproutValueError, match="requires a seed"):
+        gen.generate_document(0)
+    with pytest.raises(OddsproutValueError, match="requires a seed"):
+        gen.generate_child(0, 0)
+
+
+def test_json_generator_regenerate_negative_index() -> None:
+    gen = JSONGenerator(Config(seed=1))
+    with pytest.raises(OddsproutValueError, match="can't be negative"):
+        gen.generate_document(-1)
+
+
+def _depth(value: JSONValue) -> int:
+    depth = 0
+    stack = [(value, 1)]
+    while stack:
+        value, level = stack.pop()
+        if isinstance(value, dict):
+            value = list(value.values())
+        if isinstance(value, list):
+            depth = max(depth, level)
+            stack.extend((child, level + 1) for child in value)
+    return depth
+
+
+@pytest.mark.parametrize("max_depth", [1, 2, 5])
+def test_json_generator_max_depth(max_depth: int) -> None:
+    gen = JSONGenerator(
+        Config(
+            types=("array", "object", "null"),
+            base_size=(5, 5),
+            collection_size=(5, 5),
+            max_depth=max_depth,
+        )
+    )
+    for _ in range(10):
+        assert _depth(gen.generate_value()) <= max_depth
+
+
+def test_json_generator_max_depth_collections_only() -> None:
+    gen = JSONGenerator(
+        Config(
+            types=("array",),
+            base="array",
+            base_size=(2, 2),
+            collection_size=(2, 2),
+            max_depth=3,
+        )
+    )
+    assert gen.generate_value() == [[[], []], [[], []]]
+
+
+def test_json_generator_deep_nesting() -> None:
+    depth = sys.getrecursionlimit() * 10
+    gen = JSONGenerator(
+        Config(
+            types=("array",),
+            base="array",
+            base_size=(1, 1),
+            collection_size=(1, 1),
+            max_depth=depth,
+        )
+    )
+    value = gen.generate_value()
+    for _ in range(depth - 1):
+        assert isinstance(value, list)
+        assert len(value) == 1
+        value = value[0]
+    assert value == []
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_json_generator_iter_chunks(seed: int) -> None:
+    config = Config(seed=seed, string_size=(20, 30), collection_size=(0, 8))
+    expected = json.dumps(JSONGenerator(config).generate_value(), indent=2)
+
+    chunks = list(JSONGenerator(config).iter_chunks(chunk_size=16))
+
+    assert "".join(chunks) == expected
+    assert all(len(chunk) >= 16 for chunk in chunks[:-1])
+
+
+@pytest.mark.parametrize("base", ["array", "object"])
+def test_json_generator_iter_chunks_empty(base: Literal["array", "object"]) -> None:
+    gen = JSONGenerator(Config(base=base, base_size=(0, 0)))
+    assert "".join(gen.iter_chunks()) == ("{}" if base == "object" else "[]")
+
+
+def test_json_generator_write_to() -> None:
+    config = Config(seed=0, types=("string", "number", "boolean", "null", "array"))
+    fp = io.StringIO()
+    JSONGenerator(config).write_to(fp)
+
+    assert json.loads(fp.getvalue()) == JSONGenerator(config).generate_value()
+
+
+def test_json_generator_iter_chunks_max_depth() -> None:
+    config = Config(
+        seed=0, types=("array", "object", "int"), string_size=(20, 30), max_depth=3
+    )
+    expected = json.dumps(JSONGenerator(config).generate_value(), indent=2)
+    assert "".join(JSONGenerator(config).iter_chunks()) == expected
+
+
+def test_json_generator_iter_chunks_advances_document() -> None:
+    config = Config(seed=5, string_size=(20, 30))
+    gen = JSONGenerator(config)
+    gen.generate_value()
+
+    assert json.loads("".join(gen.iter_chunks())) == gen.generate_document(1)
+
+
+def test_json_generator_generate_many() -> None:
+    config = Config(seed=3)
+    values = JSONGenerator(config).generate_many(4)
+    gen = JSONGenerator(config)
+
+    assert list(values) == [gen.generate_document(i) for i in range(4)]
+
+
+def test_json_generator_generate_many_negative() -> None:
+    with pytest.raises(OddsproutValueError, match="can't be negative"):
+        JSONGenerator().generate_many(-1)
+
+
+def test_json_generator_stats_disabled() -> None:
+    assert JSONGenerator().stats is None
+
+
+@pytest.mark.parametrize("seed", [None, 3])
+def test_json_generator_stats(seed: int | None) -> None:
+    config = Config(seed=seed, max_depth=3)
+    gen = JSONGenerator(config, stats=True)
+    values = [gen.generate_value() for _ in range(5)]
+    text = "".join(gen.iter_chunks())
+    stats = gen.stats
+    assert stats is not None
+    assert stats.values == 6
+    assert stats.bytes_emitted == len(text)
+    assert sum(stats.depths.values()) == sum(stats.nodes.values())
+    assert stats.depths[1] == 6
+    assert sum(stats.string_lengths.values()) == stats.nodes["string"]
+    assert sum(stats.collection_sizes.values()) == (
+        stats.nodes["object"] + stats.nodes["array"]
+    )
+    assert set(stats.timings) <= {*stats.nodes, "key"}
+    if seed is not None:
+        plain = JSONGenerator(config)
+        assert values == [plain.generate_value() for _ in range(5)]
+        assert text == "".join(plain.iter_chunks())
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        Config(seed=3, max_bytes=3000, unique_keys=True, max_depth=5),
+        Config(seed=3, max_nodes=200, unique_keys=True, max_depth=5),
+        Config(seed=3, target_bytes=3000, unique_keys=True, max_depth=5),
+    ],
+)
+def test_json_generator_stats_budgets(config: Config) -> None:
+    # only the nodes that make it into the values are counted
+    gen = JSONGenerator(config, stats=True)
+    stats = _tally([gen.generate_value() for _ in range(20)])
+    assert gen.stats is not None
+    assert gen.stats.nodes == stats.nodes
+    assert gen.stats.depths == stats.depths
+    assert gen.stats.string_lengths == stats.string_lengths
+
+
+def _tally(values: list[JSONValue]) -> GenerationStats:
+    # The stats of the nodes of `values`, with the sizes collections ended up with
+    stats = GenerationStats()
+    stack = [(value, 1) for value in values]
+    while stack:
+        value, depth = stack.pop()
+        stats.nodes[_TYPE_NAMES[type(value)]] += 1
+        stats.depths[depth] += 1
+        if isinstance(value, str):
+            stats.string_lengths[len(value)] += 1
+        elif isinstance(value, (dict, list)):
+            stats.collection_sizes[len(value)] += 1
+            children = value.values() if isinstance(value, dict) else value
+            stack.extend((child, depth + 1) for child in children)
+    return stats
+
+
+def test_json_generator_divergence_error() -> None:
+    with pytest.raises(OddsproutValueError, match="expected size .* diverges"):
+        JSONGenerator(Config(collection_size=(100, 200), divergence="error"))
+
+
+def test_json_generator_divergence_cap() -> None:
+    config = Config(collection_size=(100, 200), divergence="cap")
+    assert JSONGenerator(config)._max_depth == capped_depth(config, 1_000_000)
+
+
+@pytest.mark.parametrize("divergence", ["error", "cap"])
+def test_json_generator_divergence_converging(
+    divergence: Literal["error", "cap"],
+) -> None:
+    assert JSONGenerator(Config(divergence=divergence))._max_depth == sys.maxsize
+
+
+@pytest.mark.parametrize("max_nodes", [1, 2, 50, 1000])
+def test_json_generator_max_nodes(max_nodes: int) -> None:
+    gen = JSONGenerator(Config(collection_size=(100, 200), max_nodes=max_nodes))
+    for _ in range(5):
+        assert _count_nodes(gen.generate_value()) <= max_nodes
+        assert _count_nodes(json.loads("".join(gen.iter_chunks()))) <= max_nodes
+
+
+@pytest.mark.parametrize("max_bytes", [1, 2, 10, 100, 5000])
+def test_json_generator_max_bytes(max_bytes: int) -> None:
+    gen = JSONGenerator(Config(collection_size=(100, 200), max_bytes=max_bytes))
+    for _ in range(5):
+        assert len(json.dumps(gen.generate_value(), indent=2)) <= max(max_bytes, 2)
+        assert len("".join(gen.iter_chunks())) <= max(max_bytes, 2)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_json_generator_budgets_streaming(seed: int) -> None:
+    config = Config(
+        seed=seed, collection_size=(0, 300), max_nodes=500, max_bytes=20_000
+    )
+    value = JSONGenerator(config).generate_value()
+    text = "".join(JSONGenerator(config).iter_chunks())
+    assert text == json.dumps(value, indent=2)
+    assert len(text) <= 20_000
+
+
+def test_json_generator_budgets_fill_up() -> None:
+    # a budget that runs out closes the open collections early
+    gen = JSONGenerator(
+        Config(
+            types=("array",),
+            base="array",
+            base_size=(1, 100),
+            collection_size=(2, 2),
+            max_nodes=100,
+        )
+    )
+    assert _count_nodes(gen.generate_value()) == 100
+
+
+def test_json_generator_budgets_generate_child() -> None:
+    gen = JSONGenerator(Config(seed=1, max_nodes=10))
+    with pytest.raises(OddsproutValueError, match="isn't supported with max_nodes"):
+        gen.generate_child(0, 0)
+
+
+def test_json_generator_budgets_skip_divergence_guard() -> None:
+    gen = JSONGenerator(
+        Config(collection_size=(100, 200), divergence="error", max_nodes=10)
+    )
+    assert _count_nodes(gen.generate_value()) <= 10
+
+
+@pytest.mark.parametrize(
+    ("target", "tolerance"), [(100, 0.1), (1000, 0.01), (100_000, 0.001)]
+)
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_json_generator_target_bytes(target: int, tolerance: float, seed: int) -> None:
+    config = Config(seed=seed, target_bytes=target, tolerance=tolerance)
+    gen = JSONGenerator(config)
+    low = target * (1 - tolerance)
+    for _ in range(5):
+        assert low <= len(json.dumps(gen.generate_value(), indent=2)) <= target
+        assert low <= len("".join(gen.iter_chunks())) <= target
+
+
+@pytest.mark.parametrize(
+    ("seed", "target", "tolerance"),
+    [(943, 100, 0.1), (26, 1000, 0.01), (113, 1000, 0.01), (356, 1000, 0.01)],
+)
+def test_json_generator_target_bytes_colliding_key(
+    seed: int, target: int, tolerance: float
+) -> None:
+    # the last child's key gets shortened into one that's already used
+    config = Config(seed=seed, target_bytes=target, tolerance=tolerance)
+    size = len(json.dumps(JSONGenerator(config).generate_value(), indent=2))
+    assert target * (1 - tolerance) <= size <= target
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_json_generator_target_bytes_streaming(seed: int) -> None:
+    config = Config(seed=seed, target_bytes=5000, tolerance=0, base="object")
+    value = JSONGenerator(config).generate_value()
+    text = "".join(JSONGenerator(config).iter_chunks())
+    assert text == json.dumps(value, indent=2)
+    assert len(text) <= 5000
+
+
+@pytest.mark.parametrize("seed", [7, 11, 42])
+def test_json_generator_target_bytes_distinct_keys(seed: int) -> None:
+    # the default string_size makes empty keys (and so repeated ones) likely
+    config = Config(seed=seed, target_bytes=100_000)
+    value = JSONGenerator(config).generate_value()
+    text = json.dumps(value, indent=2)
+    assert 95_000 <= len(text) <= 100_000
+    assert "".join(JSONGenerator(config).iter_chunks()) == text
+
+
+def test_json_generator_max_bytes_small_key_space() -> None:
+    # objects are capped at the 11 possible keys instead of repeating them
+    config = Config(
+        seed=1, charset="digits", string_size=(0, 1), base="object", max_bytes=5000
+    )
+    value = JSONGenerator(config).generate_value()
+    text = json.dumps(value, indent=2)
+    assert len(text) <= 5000
+    assert "".join(JSONGenerator(config).iter_chunks()) == text
+
+
+def test_json_generator_target_bytes_without_strings() -> None:
+    # the last value can't be shortened, so it might fall short by one leaf
+    gen = JSONGenerator(
+        Config(types=("int", "boolean", "array"), target_bytes=10_000, tolerance=0)
+    )
+    for _ in range(10):
+        assert 9950 <= len("".join(gen.iter_chunks())) <= 10_000
+
+
+def test_json_generator_target_bytes_with_max_bytes() -> None:
+    gen = JSONGenerator(Config(target_bytes=10_000, max_bytes=1000))
+    assert 950 <= len("".join(gen.iter_chunks())) <= 1000
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_json_generator_unique_keys(seed: int) -> None:
+    # the objects take up most of the 111 possible keys
+    config = Config(
+        seed=seed,
+        unique_keys=True,
+        charset="digits",
+        string_size=(0, 2),
+        base="object",
+        base_size=(111, 111),
+        collection_size=(100, 111),
+        max_depth=3,
+    )
+    gen = JSONGenerator(config)
+    value = cast(JSONObject, gen.generate_value())
+    assert len(value) == 111
+    for child in value.values():
+        if type(child) is dict:
+            assert 100 <= len(child) <= 111
+    text = "".join(JSONGenerator(config).iter_chunks())
+    assert text == json.dumps(value, indent=2)
+    for i in (0, 57, 110):
+        key = list(value)[i]
+        assert gen.generate_child(0, i) == {key: value[key]}
+
+
+def test_json_generator_unique_keys_unseeded() -> None:
+    gen = JSONGenerator(
+        Config(
+            unique_keys=True,
+            charset="digits",
+            string_size=(1, 1),
+            types=("int", "object"),
+            base="object",
+            base_size=(10, 10),
+            collection_size=(10, 10),
+            max_depth=3,
+        )
+    )
+    value = cast(JSONObject, gen.generate_value())
+    assert len(value) == 10
+    assert all(len(c) == 10 for c in value.values() if type(c) is dict)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_json_generator_unique_keys_target_bytes(seed: int) -> None:
+    # short keys used to collide, leaving the values short of the target
+    config = Config(
+        seed=seed,
+        unique_keys=True,
+        charset="alnum",
+        string_size=(0, 3),
+        base="object",
+        target_bytes=20_000,
+        tolerance=0.01,
+    )
+    value = JSONGenerator(config).generate_value()
+    assert 19_800 <= len(json.dumps(value, indent=2)) <= 20_000
+    assert json.loads("".join(JSONGenerator(config).iter_chunks())) == value
+
+
+def test_json_generator_unique_keys_target_bytes_key_space() -> None:
+    config = Config(
+        unique_keys=True,
+        charset="digits",
+        string_size=(1, 1),
+        types=("int",),
+        base="object",
+        target_bytes=100_000,
+    )
+    # the root runs out of keys before reaching the target size
+    assert len(cast(JSONObject, JSONGenerator(config).generate_value())) == 10
+
+
+def _collect_keys(value: JSONValue) -> list[str]:
+    if type(value) is dict:
+        return [k for key, child in value.items() for k in (key, *_collect_keys(child))]
+    if type(value) is list:
+        return [k for child in value for k in _collect_keys(child)]
+    return []
+
+
+def test_json_generator_key_vocabulary() -> None:
+    config = Config(seed=0, key_vocabulary=20, base="object", max_depth=4)
+    gen = JSONGenerator(config)
+    values = list(gen.generate_many(5))
+    keys = [key for value in values for key in _collect_keys(value)]
+    assert len(set(keys)) <= 20
+    # keys are shared rather than copied
+    by_text = {key: key for key in keys}
+    assert all(by_text[key] is key for key in keys)
+    assert [gen.generate_document(i) for i in range(5)] == values
+    assert list(JSONGenerator(config).generate_many(5)) == values
+
+
+def test_json_generator_key_vocabulary_sequence() -> None:
+    vocabulary = ("id", "name", "created_at", "tags")
+    # an array of single-key objects
+    config = Config(
+        seed=1,
+        key_vocabulary=vocabulary,
+        key_skew=2,
+        types=("null", "object"),
+        weights={"null": 0},
+        base="array",
+        base_size=(2000, 2000),
+        collection_size=(1, 1),
+        max_depth=3,
+    )
+    keys = _collect_keys(JSONGenerator(config).generate_value())
+    assert len(keys) == 2000
+    assert set(keys) == set(vocabulary)
+    # the first key is drawn 4 times as often as the second one
+    assert keys.count("id") / keys.count("name") == pytest.approx(4, rel=0.2)
+
+
+def test_json_generator_key_vocabulary_unique_keys() -> None:
+    config = Config(
+        seed=2,
+        unique_keys=True,
+        key_vocabulary=("a", "b", "c"),
+        key_skew=3,
+        types=("int", "object"),
+        base="object",
+        base_size=(3, 3),
+        collection_size=(3, 3),
+        max_depth=3,
+    )
+    value = cast(JSONObject, JSONGenerator(config).generate_value())
+    assert sorted(value) == ["a", "b", "c"]
+    assert all(sorted(c) == ["a", "b", "c"] for c in value.values() if type(c) is dict)
+
+
+async def _collect(values: AsyncIterator[_T]) -> list[_T]:
+    return [value async for value in values]
+
+
+@pytest.mark.parametrize("seed", [None, 3])
+def test_json_generator_agenerate(seed: int | None) -> None:
+    config = Config(seed=seed, base_size=(0, 10), collection_size=(0, 10))
+    gen = JSONGenerator(config, stats=True)
+    values = asyncio.run(_collect(gen.agenerate(5)))
+    assert len(values) == 5
+    assert gen.stats is not None
+    assert gen.stats.values == 5
+    if seed is not None:
+        assert values == list(JSONGenerator(config).generate_many(5))
+        assert gen.generate_value() == gen.generate_document(5)
+
+
+@pytest.mark.parametrize(
+    ("config", "nodes"),
+    [
+        (
+            Config(
+                types=("int", "array"),
+                weights={"array": 1},
+                base="array",
+                base_size=(100, 100),
+                collection_size=(50, 50),
+                max_depth=4,
+            ),
+            50_000,
+        ),
+        # seeded roots with only leaf children
+        (
+            Config(
+                seed=1,
+                types=("int", "string"),
+                base="array",
+                base_size=(20_000, 20_000),
+            ),
+            20_000,
+        ),
+    ],
+)
+def test_json_generator_agenerate_pauses(config: Config, nodes: int) -> None:
+    gen = JSONGenerator(config)
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def main() -> list[JSONValue]:
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        ticks_before = ticks
+        values = await _collect(gen.agenerate(1))
+        assert ticks > ticks_before + 10
+        ticker.cancel()
+        return values
+
+    assert _count_nodes(asyncio.run(main())[0]) > nodes
+
+
+def test_json_generator_agenerate_executor() -> None:
+    config = Config(seed=8, base_size=(0, 10), collection_size=(0, 10))
+    gen = JSONGenerator(config)
+    with ThreadPoolExecutor(2) as executor:
+        values = asyncio.run(_collect(gen.agenerate(4, executor=executor)))
+    assert values == list(JSONGenerator(config).generate_many(4))
+
+
+def test_json_generator_agenerate_negative() -> None:
+    with pytest.raises(OddsproutValueError, match="can't be negative, got -1"):
+        JSONGenerator().agenerate(-1)
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_json_generator_aiter_chunks(threaded: bool) -> None:
+    config = Config(seed=5, collection_size=(0, 20), max_depth=4)
+    with ThreadPoolExecutor(1) as executor:
+        chunks = JSONGenerator(config).aiter_chunks(
+            100, executor=executor if threaded else None
+        )
+        texts = asyncio.run(_collect(chunks))
+    assert texts == list(JSONGenerator(config).iter_chunks(100))
+
+
+def test_json_generator_awrite_to() -> None:
+    class Writer:
+        def __init__(self) -> None:
+            self.data = b""
+            self.drained = 0
+
+        def write(self, data: bytes) -> None:
+            self.data += data
+
+        async def drain(self) -> None:
+            self.drained += 1
+
+    config = Config(seed=2, collection_size=(0, 20), max_depth=4)
+    writer = Writer()
+    asyncio.run(JSONGenerator(config).awrite_to(writer, 1000))
+    chunks = list(JSONGenerator(config).iter_chunks(1000))
+    assert writer.data.decode() == "".join(chunks)
+    assert writer.drained == len(chunks) > 1
+
+
+_REUSE_CONFIG = Config(
+    subtree_reuse=0.5,
+    max_depth=5,
+    collection_size=(0, 8),
+    weights={"object": 1, "array": 1, "int": 1},
+)
+
+
+def _collection_ids(value: JSONValue) -> list[int]:
+    ids = []
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if type(value) is dict:
+            value = list(value.values())
+        if type(value) is list:
+            ids.append(id(value))
+            stack.extend(value)
+    return ids
+
+
+def test_json_generator_subtree_reuse() -> None:
+    gen = JSONGenerator(_REUSE_CONFIG)
+    pool = gen.subtree_pool
+    assert pool is not None
+    ids = []
+    for _ in range(30):
+        value = gen.generate_value()
+        assert _depth(value) <= 5
+        ids.extend(_collection_ids(value))
+        # pooled subtrees know their number of nodes
+        for subtree in pool._subtrees.values():
+            assert subtree.nodes == _count_nodes(subtree.value)
+    assert pool.added
+    assert pool.reused
+    # reused subtrees are shared rather than copied
+    assert len(set(ids)) < len(ids)
+
+
+def test_json_generator_subtree_reuse_disabled() -> None:
+    assert JSONGenerator(Config()).subtree_pool is None
+
+
+@pytest.mark.parametrize("pool_size", [1, 20, 500])
+def test_json_generator_subtree_pool_size(pool_size: int) -> None:
+    gen = JSONGenerator(replace(_REUSE_CONFIG, subtree_pool_size=pool_size))
+    pool = gen.subtree_pool
+    assert pool is not None
+    for _ in range(30):
+        gen.generate_value()
+        assert pool.nodes <= pool_size
+    assert pool.evicted or pool_size == 500
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_json_generator_subtree_reuse_seeded(seed: int) -> None:
+    config = replace(_REUSE_CONFIG, seed=seed)
+    gen = JSONGenerator(config)
+    values = list(gen.generate_many(10))
+    assert values == list(JSONGenerator(config).generate_many(10))
+    assert values == [JSONGenerator(config).generate_document(i) for i in range(10)]
+    assert gen.subtree_pool
+    assert gen.subtree_pool.reused
+    with pytest.raises(OddsproutValueError, match="isn't supported with subtree"):
+        gen.generate_child(0, 0)
+
+
+@pytest.mark.parametrize("seed", [None, 3])
+def test_json_generator_subtree_reuse_stats(seed: int | None) -> None:
+    # reused subtrees are counted whole, with the sizes of their collections
+    config = replace(
+        _REUSE_CONFIG,
+        seed=seed,
+        unique_keys=True,
+        weights={"object": 1, "array": 1, "int": 1, "string": 1},
+    )
+    gen = JSONGenerator(config, stats=True)
+    stats = _tally(list(gen.generate_many(20)))
+    assert gen.stats is not None
+    assert gen.subtree_pool is not None
+    assert gen.subtree_pool.reused
+    assert gen.stats.nodes == stats.nodes
+    assert gen.stats.depths == stats.depths
+    assert gen.stats.string_lengths == stats.string_lengths
+    assert gen.stats.collection_sizes == stats.collection_sizes
+
+
+def test_json_generator_subtree_reuse_iter_chunks() -> None:
+    config = replace(_REUSE_CONFIG, seed=3)
+    gen = JSONGenerator(config, stats=True)
+    values = list(JSONGenerator(config).generate_many(10))
+    texts = ["".join(gen.iter_chunks(100)) for _ in range(10)]
+    assert texts == [json.dumps(value, indent=2) for value in values]
+    assert gen.stats is not None
+    assert gen.stats.bytes_emitted == sum(map(len, texts))
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        Config(seed=1),
+        Config(seed=2, base="object", max_depth=3),
+        Config(seed=3, base="array", collection_size=(0, 5)),
+        Config(
+            seed=4,
+            unique_keys=True,
+            charset="digits",
+            string_size=(1, 1),
+            base_size=(0, 10),
+            collection_size=(0, 10),
+        ),
+        Config(seed=5, key_vocabulary=4, base="object"),
+    ],
+)
+def test_json_generator_generate_lazy(config: Config) -> None:
+    values = list(JSONGenerator(config).generate_many(5))
+    gen = JSONGenerator(config)
+    for value in values:
+        lazy = gen.generate_lazy()
+        assert lazy.loaded == 0
+        # children don't depend on the order they're accessed in
+        if isinstance(lazy, LazyObject):
+            assert list(lazy) == list(cast(JSONObject, value))
+            children = [lazy[key] for key in reversed(list(lazy))][::-1]
+        else:
+            children = [lazy[i] for i in reversed(range(len(lazy)))][::-1]
+        assert children == list(
+            value.values() if isinstance(value, dict) else cast(JSONArray, value)
+        )
+        assert materialize(lazy) == value
+    # lazy values take up documents like any other value
+    assert gen.generate_value() == gen.generate_document(5)
+
+
+def test_json_generator_generate_lazy_unseeded() -> None:
+    gen = JSONGenerator(
+        Config(
+            base="array",
+            base_size=(5, 5),
+            collection_size=(1, 5),
+            types=("array",),
+            max_depth=4,
+        )
+    )
+    lazy = gen.generate_lazy()
+    assert isinstance(lazy, LazyArray)
+    assert len(lazy) == 5
+    # collections are lazy at every depth, down to the empty ones at max_depth
+    child = lazy[0]
+    assert isinstance(child, LazyArray)
+    assert lazy.loaded == 1
+    assert child.loaded == 0
+    assert _depth(materialize(lazy)) == 4
+
+
+def test_json_generator_generate_lazy_unseeded_object() -> None:
+    gen = JSONGenerator(
+        Config(
+            base="object",
+            base_size=(5, 5),
+            collection_size=(3, 3),
+            types=("object",),
+            unique_keys=True,
+            max_depth=3,
+        )
+    )
+    lazy = gen.generate_lazy()
+    assert isinstance(lazy, LazyObject)
+    assert len(lazy) == 5
+    child = lazy[next(iter(lazy))]
+    assert isinstance(child, LazyObject)
+    assert len(child) == 3
+    assert child.loaded == 0
+    value = materialize(lazy)
+    assert _depth(value) == 3
+    assert _count_nodes(value) == 1 + 5 * 4
+
+
+@pytest.mark.parametrize("seed", [None, 3])
+def test_json_generator_generate_lazy_deep(seed: int | None) -> None:
+    # materializing and comparing don't recurse, as deep as max_depth allows
+    config = Config(
+        seed=seed,
+        base="array",
+        base_size=(1, 1),
+        collection_size=(1, 1),
+        types=("array",),
+        max_depth=5000,
+    )
+    lazy = JSONGenerator(config).generate_lazy()
+    value = materialize(lazy)
+    assert _depth(value) == 5000
+    assert lazy == materialize(JSONGenerator(config).generate_lazy())
+    assert lazy == lazy.materialize()
+
+
+@pytest.mark.parametrize("seed", [None, 3])
+def test_json_generator_generate_lazy_stats(seed: int | None) -> None:
+    config = Config(seed=seed, max_depth=3, unique_keys=True)
+    gen = JSONGenerator(config, stats=True)
+    values = [materialize(gen.generate_lazy()) for _ in range(20)]
+    assert gen.stats is not None
+    assert gen.stats.values == 20
+    assert sum(gen.stats.nodes.values()) == sum(map(_count_nodes, values))
+
+
+@pytest.mark.parametrize(
+    ("config", "err_msg"),
+    [
+        (Config(max_nodes=10), "isn't supported with max_nodes"),
+        (Config(subtree_reuse=0.5), "isn't supported with subtree_reuse"),
+    ],
+)
+def test_json_generator_generate_lazy_unsupported(config: Config, err_msg: str) -> None:
+    with pytest.raises(OddsproutValueError, match=f"lazy generation {err_msg}"):
+        JSONGenerator(config).generate_lazy()
+
+
+def test_json_generator_generate_tape() -> None:
+    config = Config(seed=5)
+    tape = JSONGenerator(config).generate_tape(10)
+    assert [tape[i] for i in range(10)] == list(JSONGenerator(config).generate_many(10))
+    with pytest.raises(OddsproutValueError, match="can't be negative"):
+        JSONGenerator(config).generate_tape(-1)
+
+
+@pytest.mark.parametrize(
+    ("fmt", "encode"), [("msgpack", encode_msgpack), ("cbor", encode_cbor)]
+)
+def test_json_generator_generate_binary(
+    fmt: str, encode: Callable[[JSONValue], bytes]
+) -> None:
+    config = Config(seed=5)
+    gen = JSONGenerator(config)
+    payloads = [gen.generate_binary(fmt) for _ in range(5)]
+    assert payloads == list(map(encode, JSONGenerator(config).generate_many(5)))
+    with pytest.raises(OddsproutValueError, match="invalid binary format 'bson'"):
+        gen.generate_binary("bson")
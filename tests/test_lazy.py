@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from oddsprout.lazy import LazyArray, LazyObject, materialize
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _loader(calls: list[int]) -> Callable[[int], int]:
+    def load(index: int) -> int:
+        calls.append(index)
+        return index * 10
+
+    return load
+
+
+def test_lazy_array() -> None:
+    calls: list[int] = []
+    array = LazyArray(4, _loader(calls))
+    assert len(array) == 4
+    assert array.loaded == 0
+    assert array[2] == 20
+    assert array[-1] == 30
+    assert array[2] == 20
+    # elements are only loaded once
+    assert calls == [2, 3]
+    assert array.loaded == 2
+    assert array[1:3] == [10, 20]
+    assert repr(array) == "LazyArray(size=4, loaded=3)"
+    assert array == [0, 10, 20, 30]
+    assert array != [0, 10, 20]
+    assert array != "abcd"
+    assert array.materialize() == [0, 10, 20, 30]
+
+
+@pytest.mark.parametrize("index", [4, -5])
+def test_lazy_array_out_of_range(index: int) -> None:
+    array = LazyArray(4, _loader([]))
+    with pytest.raises(IndexError, match=f"array has 4 elements, got index {index}"):
+        array[index]
+
+
+def test_lazy_object() -> None:
+    calls: list[int] = []
+    obj = LazyObject(["a", "b", "a", "c"], _loader(calls))
+    # repeated keys keep their first position but get their last child
+    assert list(obj) == ["a", "b", "c"]
+    assert len(obj) == 3
+    assert "b" in obj
+    assert "d" not in obj
+    assert calls == []
+    assert obj["a"] == 20
+    assert obj.get("d") is None
+    assert obj["a"] == 20
+    assert calls == [2]
+    assert repr(obj) == "LazyObject(size=3, loaded=1)"
+    assert obj == {"a": 20, "b": 10, "c": 30}
+    assert obj.materialize() == {"a": 20, "b": 10, "c": 30}
+    with pytest.raises(KeyError):
+        obj["d"]
+
+
+def test_materialize() -> None:
+    nested = LazyObject(["x"], lambda _: LazyArray(2, lambda i: [i]))
+    assert materialize(nested) == {"x": [[0], [1]]}
+    assert materialize(5) == 5
+
+
+def test_lazy_equality() -> None:
+    nested = LazyObject(["a", "b"], lambda i: LazyArray(2, _loader([])) if i else {})
+    assert nested == {"a": {}, "b": [0, 10]}
+    assert nested == {"b": [0, 10], "a": {}}
+    assert nested != {"a": {}, "b": [0, 11]}
+    assert nested != {"a": {}, "c": [0, 10]}
+    assert nested != {"a": [], "b": [0, 10]}
+    assert nested != ["a", "b"]
+    # strings aren't unpacked into their characters
+    assert LazyArray(1, lambda _: "ab") != [["a", "b"]]
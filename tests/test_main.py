@@ -1,9 +1,18 @@
+import json
+import subprocess
+import sys
 from pathlib import Path
+from typing import Callable
 from unittest.mock import patch
 
 import pytest
 
 from oddsprout import __main__ as main
+from oddsprout.bench import _count_nodes
+from oddsprout.binary import encode_cbor, encode_msgpack
+from oddsprout.configuration import Config
+from oddsprout.corpus import Corpus
+from oddsprout.generators import JSONGenerator, JSONValue
 
 
 def test_dexit() -> None:
@@ -13,12 +22,141 @@ def test_dexit() -> None:
 
 def test_parse_argv() -> None:
     with patch("sys.argv", ["script", "--config", "config.toml"]):
-        assert main._parse_argv() == Path("config.toml")
+        assert main._parse_argv().config == Path("config.toml")
 
 
 def test_parse_argv_no_config() -> None:
     with patch("sys.argv", ["script"]):
-        assert main._parse_argv() is None
+        assert main._parse_argv().config is None
+
+
+def test_parse_argv_rng() -> None:
+    with patch("sys.argv", ["script", "--rng", "pool"]):
+        assert main._parse_argv().rng == "pool"
+
+
+def test_main_seed(capsys: pytest.CaptureFixture[str]) -> None:
+    outputs = []
+    for _ in range(2):
+        with patch("sys.argv", ["script", "--seed", "42"]):
+            main.main()
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
+
+
+def test_main_stream(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "--seed", "3"]):
+        main.main()
+    expected = json.loads(capsys.readouterr().out)
+    with patch("sys.argv", ["script", "--seed", "3", "--stream"]):
+        main.main()
+    assert json.loads(capsys.readouterr().out) == expected
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "json-array"])
+def test_main_count(capsys: pytest.CaptureFixture[str], fmt: str) -> None:
+    with patch("sys.argv", ["script", "--seed", "2", "--count", "3", "--format", fmt]):
+        main.main()
+    out = capsys.readouterr().out
+    gen = JSONGenerator(Config(seed=2))
+    expected = [gen.generate_document(i) for i in range(3)]
+
+    if fmt == "json":
+        assert out == "".join(json.dumps(v, indent=2) + "\n" for v in expected)
+    elif fmt == "ndjson":
+        assert list(map(json.loads, out.splitlines())) == expected
+    else:
+        assert json.loads(out) == expected
+
+
+@pytest.mark.parametrize("fmt", ["json", "json-array"])
+def test_main_jobs(capsys: pytest.CaptureFixture[str], fmt: str) -> None:
+    argv = ["script", "--seed", "5", "--count", "6", "--format", fmt]
+    with patch("sys.argv", argv):
+        main.main()
+    expected = capsys.readouterr().out
+    with patch("sys.argv", [*argv, "--jobs", "2"]):
+        main.main()
+    assert capsys.readouterr().out == expected
+
+
+def test_main_count_zero_json_array(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "--count", "0", "--format", "json-array"]):
+        main.main()
+    assert json.loads(capsys.readouterr().out) == []
+
+
+def test_main_count_stream(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    # long keys make duplicate keys (which only streaming keeps) unlikely
+    (cfg_path := tmp_path / "config.toml").write_text("[bounds]\nstring = [20, 30]")
+    argv = ["script", "--config", str(cfg_path), "--seed", "2", "--count", "2"]
+    with patch("sys.argv", argv):
+        main.main()
+    expected = capsys.readouterr().out
+    with patch("sys.argv", [*argv, "--stream"]):
+        main.main()
+    assert capsys.readouterr().out == expected
+
+
+@pytest.mark.parametrize(
+    ("argv", "err_msg"),
+    [
+        (["--count", "-1"], "--count can't be negative"),
+        (
+            ["--stream", "--format", "ndjson"],
+            "--stream can only be used with the 'json' format",
+        ),
+        (
+            ["--compact", "--format", "cbor"],
+            "--indent/--compact can only be used with the 'json' format",
+        ),
+        (["--stream", "--jobs", "2"], "--stream can't be used with --jobs"),
+        (["--stats", "--jobs", "2"], "--stats can't be used with --jobs"),
+        (["--jobs", "0"], "number of jobs has to be positive, got 0"),
+        (["--seed", "1", "--rng", "pool"], "only the 'mersenne' RNG can be seeded"),
+        (
+            ["--max-bytes", "2000", "--indent", "8"],
+            "--indent/--compact can't be used with max_bytes or target_bytes",
+        ),
+        *(
+            (
+                [budget, "2000", "--format", fmt],
+                "max_bytes and target_bytes can only be used with the 'json' format",
+            )
+            for budget in ("--max-bytes", "--target-bytes")
+            for fmt in ("ndjson", "json-array", "msgpack", "cbor")
+        ),
+        (
+            ["--target-bytes", "2000", "--compact"],
+            "--indent/--compact can't be used with max_bytes or target_bytes",
+        ),
+    ],
+)
+def test_main_invalid_output_options(argv: list[str], err_msg: str) -> None:
+    with (
+        pytest.raises(SystemExit, match=err_msg),
+        patch("sys.argv", ["script", *argv]),
+    ):
+        main.main()
+
+
+@pytest.mark.parametrize("flag", ["--compact", "--format=ndjson"])
+def test_main_deep_nesting(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], flag: str
+) -> None:
+    (cfg_path := tmp_path / "config.toml").write_text(
+        "[bounds]\nmax-depth = 5000\nbase = [1, 1]\ncollection = [1, 1]\n\n"
+        '[types]\nbase = "array"\ninclude = ["array"]\n'
+    )
+    with patch("sys.argv", ["script", "--config", str(cfg_path), flag]):
+        main.main()
+    assert capsys.readouterr().out == "[" * 5000 + "]" * 5000 + "\n"
+
+
+def test_main_rng(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "--rng", "mersenne"]):
+        main.main()
+    json.loads(capsys.readouterr().out)
 
 
 def test_main(tmp_path: Path) -> None:
@@ -77,3 +215,275 @@ def test_main_invalid_config(tmp_path: Path) -> None:
         patch("sys.argv", ["script", "--config", str(cfg_path)]),
     ):
         main.main()
+
+
+def test_main_bench(capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["script", "bench", "--preset", "base-array", "--duration", "0"]
+    with patch("sys.argv", [*argv, "--preset", "charset-digits", "--rng", "pool"]):
+        main.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("preset")
+    assert lines[1].startswith("base-array")
+    assert "int=" in lines[1]
+    assert lines[2].startswith("charset-digits")
+    assert "int=" not in lines[2]
+
+
+@pytest.mark.parametrize(
+    "argv", [["--rng", "pool", "bench"], ["bench", "--rng", "pool"]]
+)
+def test_main_bench_rng(argv: list[str]) -> None:
+    with patch("sys.argv", ["script", *argv, "--preset", "default"]):
+        args = main._parse_argv()
+    assert [config.rng for _, config in main._bench_presets(args)] == ["pool"]
+
+
+def test_main_bench_encode(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "bench", "--encode", "--preset", "base-array"]):
+        main.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == [
+        "preset",
+        "indented",
+        "json.dumps",
+        "compact",
+        "json.dumps",
+    ]
+    assert lines[1].startswith("base-array")
+    assert len(lines) == 2
+
+
+def test_main_bench_invalid_preset() -> None:
+    with (
+        patch("sys.argv", ["script", "bench", "--preset", "huge"]),
+        pytest.raises(SystemExit, match="invalid preset 'huge' \\(valid options: 'def"),
+    ):
+        main.main()
+
+
+def test_main_bench_negative_duration() -> None:
+    with (
+        patch("sys.argv", ["script", "bench", "--duration", "-1"]),
+        pytest.raises(SystemExit, match="duration can't be negative"),
+    ):
+        main.main()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_main_stats_json(capsys: pytest.CaptureFixture[str], stream: bool) -> None:
+    argv = ["script", "--seed", "1", "--count", "2", "--stats", "json"]
+    with patch("sys.argv", [*argv, "--stream"] if stream else argv):
+        main.main()
+    out, err = capsys.readouterr()
+    stats = json.loads(err)
+    assert stats["values"] == 2
+    assert stats["bytes_emitted"] == len(out) - 2
+
+
+def test_main_stats_text(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "--seed", "1", "--stats"]):
+        main.main()
+    out, err = capsys.readouterr()
+    assert json.loads(out)
+    assert err.startswith("values: 1\n")
+
+
+def test_main_estimate(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "--estimate"]):
+        main.main()
+    assert capsys.readouterr().out.startswith("branching factor: 0.9763\n")
+
+
+@pytest.mark.parametrize("budget", ["--max-nodes", "--max-bytes", "--target-bytes"])
+def test_main_estimate_budget(budget: str) -> None:
+    with (
+        patch("sys.argv", ["script", "--estimate", budget, "100"]),
+        pytest.raises(
+            SystemExit,
+            match="--estimate can't be used with max_nodes, max_bytes or target_bytes",
+        ),
+    ):
+        main.main()
+
+
+def test_main_divergence(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.toml"
+    config_path.write_text("[bounds]\ncollection = [100, 200]\n")
+    argv = ["script", "--config", str(config_path), "--divergence", "error"]
+    with patch("sys.argv", argv), pytest.raises(SystemExit, match="diverges"):
+        main.main()
+
+
+def test_main_budgets(capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["script", "--max-depth", "2", "--max-nodes", "5", "--max-bytes", "100"]
+    with patch("sys.argv", argv):
+        main.main()
+    out = capsys.readouterr().out
+    assert len(out) <= 101
+    assert _count_nodes(json.loads(out)) <= 5
+
+
+def test_main_invalid_budget() -> None:
+    with (
+        patch("sys.argv", ["script", "--max-nodes", "0"]),
+        pytest.raises(SystemExit, match="expected a positive integer for 'max_nodes'"),
+    ):
+        main.main()
+
+
+def test_main_target_bytes(capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["script", "--target-bytes", "2000", "--tolerance", "0.01", "--stream"]
+    with patch("sys.argv", argv):
+        main.main()
+    assert 1980 <= len(capsys.readouterr().out) <= 2001
+
+
+def test_main_corpus(tmp_path: Path) -> None:
+    argv = ["script", "--seed", "2", "--count", "20", "corpus", str(tmp_path)]
+    with patch("sys.argv", [*argv, "--shard-size", "1000"]):
+        main.main()
+    gen = JSONGenerator(Config(seed=2))
+    with Corpus(tmp_path) as corpus:
+        assert [corpus.load(i) for i in range(len(corpus))] == [
+            gen.generate_document(i) for i in range(20)
+        ]
+    with patch("sys.argv", argv), pytest.raises(SystemExit, match="isn't empty"):
+        main.main()
+
+
+@pytest.mark.parametrize(
+    "flags",
+    [
+        ["--format", "msgpack"],
+        ["--indent", "4"],
+        ["--compact"],
+        ["--stream"],
+        ["--stats", "json"],
+        ["--estimate"],
+    ],
+)
+def test_main_corpus_unsupported_flags(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], flags: list[str]
+) -> None:
+    argv = ["script", *flags, "corpus", str(tmp_path)]
+    with patch("sys.argv", argv), pytest.raises(SystemExit):
+        main.main()
+    assert f"{flags[0]} can't be used with corpus" in capsys.readouterr().err
+    assert not any(tmp_path.iterdir())
+
+
+def test_main_unique_keys(capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["script", "--seed", "1", "--unique-keys", "--target-bytes", "2000"]
+    with patch("sys.argv", argv):
+        main.main()
+    out = capsys.readouterr().out
+    config = Config(seed=1, unique_keys=True, target_bytes=2000)
+    assert out == json.dumps(JSONGenerator(config).generate_value(), indent=2) + "\n"
+    assert 1900 <= len(out) <= 2001
+
+
+def test_main_key_vocabulary(capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["script", "--seed", "1", "--key-vocabulary", "8", "--key-skew", "1.2"]
+    with patch("sys.argv", argv):
+        main.main()
+    config = Config(seed=1, key_vocabulary=8, key_skew=1.2)
+    expected = json.dumps(JSONGenerator(config).generate_value(), indent=2)
+    assert capsys.readouterr().out == expected + "\n"
+
+
+@pytest.mark.parametrize("stats", ["text", "json"])
+def test_main_subtree_reuse(capsys: pytest.CaptureFixture[str], stats: str) -> None:
+    argv = ["script", "--seed", "1", "--count", "3", "--max-depth", "4"]
+    argv += ["--subtree-reuse", "0.5", "--subtree-pool-size", "1000"]
+    with patch("sys.argv", [*argv, "--stats", stats]):
+        main.main()
+    out, err = capsys.readouterr()
+    config = Config(seed=1, max_depth=4, subtree_reuse=0.5, subtree_pool_size=1000)
+    values = JSONGenerator(config).generate_many(3)
+    assert out == "".join(json.dumps(value, indent=2) + "\n" for value in values)
+    if stats == "json":
+        assert json.loads(err)["subtree_pool"]["added"] > 0
+    else:
+        assert "subtree pool: " in err
+
+
+@pytest.mark.parametrize(
+    ("flags", "indent"), [([], 2), (["--indent", "4"], 4), (["--indent", "0"], 0)]
+)
+def test_main_indent(
+    capsys: pytest.CaptureFixture[str], flags: list[str], indent: int
+) -> None:
+    with patch("sys.argv", ["script", "--seed", "1", *flags]):
+        main.main()
+    out = capsys.readouterr().out
+    value = JSONGenerator(Config(seed=1)).generate_value()
+    assert out == json.dumps(value, indent=indent) + "\n"
+
+
+def test_main_compact(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch("sys.argv", ["script", "--seed", "1", "--compact"]):
+        main.main()
+    out = capsys.readouterr().out
+    value = JSONGenerator(Config(seed=1)).generate_value()
+    assert out == json.dumps(value, separators=(",", ":")) + "\n"
+
+
+@pytest.mark.parametrize(
+    ("flags", "message"),
+    [
+        (["--compact", "--format", "ndjson"], "can only be used with the 'json'"),
+        (["--indent", "4", "--stream"], "--stream can't be used with --indent"),
+        (["--indent", "-1"], "indent can't be negative"),
+    ],
+)
+def test_main_invalid_layout(flags: list[str], message: str) -> None:
+    with (
+        patch("sys.argv", ["script", *flags]),
+        pytest.raises(SystemExit, match=message),
+    ):
+        main.main()
+
+
+def test_main_lazy_imports() -> None:
+    # modules only some runs need aren't imported on startup
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", "import oddsprout.__main__"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = {
+        line.rpartition("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "oddsprout.__main__" in imported
+    assert not imported & {
+        "dahlia",
+        "tomli",
+        "tomllib",
+        "ixia",
+        "multiprocessing",
+        "concurrent.futures.process",
+        "oddsprout.bench",
+    }
+
+
+@pytest.mark.parametrize(
+    ("fmt", "encode"), [("msgpack", encode_msgpack), ("cbor", encode_cbor)]
+)
+def test_main_binary(
+    capsysbinary: pytest.CaptureFixture[bytes],
+    fmt: str,
+    encode: Callable[[JSONValue], bytes],
+) -> None:
+    argv = ["script", "--seed", "4", "--count", "4", "--format", fmt, "--stats", "json"]
+    with patch("sys.argv", argv):
+        main.main()
+    out, err = capsysbinary.readouterr()
+    gen = JSONGenerator(Config(seed=4))
+    assert out == b"".join(encode(gen.generate_document(i)) for i in range(4))
+    assert json.loads(err)["bytes_emitted"] == len(out)
+    with patch("sys.argv", [*argv[:-2], "--jobs", "2"]):
+        main.main()
+    assert capsysbinary.readouterr().out == out
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from functools import partial
+from typing import TYPE_CHECKING
+
+import pytest
+
+from oddsprout.configuration import Config
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator
+from oddsprout.parallel import (
+    agenerate_parallel,
+    dump_parallel,
+    generate_parallel,
+)
+
+if TYPE_CHECKING:
+    from oddsprout.generators import JSONValue
+
+
+@pytest.mark.parametrize(("jobs", "batch_size"), [(1, 16), (2, 1), (3, 4)])
+def test_generate_parallel_seeded(jobs: int, batch_size: int) -> None:
+    config = Config(seed=11, base_size=(0, 10), collection_size=(0, 10))
+    gen = JSONGenerator(config)
+
+    values = generate_parallel(config, 13, jobs, batch_size=batch_size)
+
+    assert list(values) == [gen.generate_document(i) for i in range(13)]
+
+
+def test_generate_parallel_unseeded() -> None:
+    values = list(generate_parallel(Config(base_size=(1, 10)), 5, 2))
+
+    assert len(values) == 5
+    assert all(isinstance(v, (dict, list)) and v for v in values)
+
+
+def test_dump_parallel() -> None:
+    config = Config(seed=4, base_size=(0, 10), collection_size=(0, 10))
+    gen = JSONGenerator(config)
+    dumps = partial(json.dumps, indent=2)
+
+    texts = dump_parallel(config, 7, dumps, 2, batch_size=3)
+
+    assert list(texts) == [dumps(v) for v in gen.generate_many(7)]
+
+
+def test_agenerate_parallel() -> None:
+    config = Config(seed=6, base_size=(0, 10), collection_size=(0, 10))
+    gen = JSONGenerator(config)
+
+    async def collect() -> list[JSONValue]:
+        return [v async for v in agenerate_parallel(config, 9, 2, batch_size=2)]
+
+    assert asyncio.run(collect()) == [gen.generate_document(i) for i in range(9)]
+
+
+def test_agenerate_parallel_stop_early() -> None:
+    async def take(n: int) -> list[JSONValue]:
+        values = []
+        async for value in agenerate_parallel(Config(), 1000, 2):
+            values.append(value)
+            if len(values) == n:
+                break
+        return values
+
+    assert len(asyncio.run(take(3))) == 3
+
+
+def test_generate_parallel_nothing() -> None:
+    assert list(generate_parallel(Config(), 0, 2)) == []
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "err_msg"),
+    [
+        ({"n": -1}, "number of values can't be negative, got -1"),
+        ({"jobs": 0}, "number of jobs has to be positive, got 0"),
+        ({"batch_size": 0}, "batch size has to be positive, got 0"),
+    ],
+)
+def test_generate_parallel_invalid(kwargs: dict[str, int], err_msg: str) -> None:
+    with pytest.raises(OddsproutValueError, match=err_msg):
+        generate_parallel(Config(), **{"n": 1, **kwargs})
+    with pytest.raises(OddsproutValueError, match=err_msg):
+        agenerate_parallel(Config(), **{"n": 1, **kwargs})
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from random import Random
+from typing import TYPE_CHECKING
+
+import pytest
+
+from oddsprout.constants import CHARSETS
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.rng import (
+    EntropyPool,
+    IxiaRandom,
+    alias_sampler,
+    create_rng,
+    derive_seed,
+    int_sampler,
+    randints,
+    random_text,
+    random_words,
+    uniforms,
+    zipf_weights,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+@pytest.mark.parametrize(
+    ("kind", "type_"),
+    [("ixia", IxiaRandom), ("mersenne", Random), ("pool", EntropyPool)],
+)
+def test_create_rng(kind: str, type_: type[Random]) -> None:
+    assert type(create_rng(kind)) is type_
+
+
+def test_create_rng_invalid() -> None:
+    with pytest.raises(OddsproutValueError, match="invalid RNG 'invalid'"):
+        create_rng("invalid")
+
+
+@pytest.mark.parametrize("rng", [IxiaRandom(), EntropyPool(block_size=64)])
+def test_rng_ranges(rng: Random) -> None:
+    for _ in range(1000):
+        assert 0.0 <= rng.random() < 1.0
+        assert 0 <= rng.randint(0, 9) <= 9
+        assert 0 <= rng.getrandbits(100) < 2**100
+    assert rng.getrandbits(0) == 0
+    assert len(rng.randbytes(100)) == 100
+
+
+@pytest.mark.parametrize("rng", [IxiaRandom(), EntropyPool()])
+def test_rng_stateless(rng: Random) -> None:
+    with pytest.raises(NotImplementedError):
+        rng.getstate()
+    with pytest.raises(NotImplementedError):
+        rng.setstate(())
+
+
+def test_entropy_pool_uniformity() -> None:
+    rng = EntropyPool(block_size=64)
+    counts = [0] * 10
+    for _ in range(10_000):
+        counts[rng.randrange(10)] += 1
+    assert all(800 < c < 1200 for c in counts)
+
+
+def test_entropy_pool_randbytes_refill() -> None:
+    rng = EntropyPool(block_size=64)
+    chunks = {rng.randbytes(16) for _ in range(20)}
+    assert len(chunks) == 20
+    assert len(rng.randbytes(1000)) == 1000
+
+
+def test_entropy_pool_negative_bits() -> None:
+    with pytest.raises(ValueError, match="non-negative"):
+        EntropyPool().getrandbits(-1)
+
+
+@pytest.mark.parametrize("block_size", [0, 7, 12])
+def test_entropy_pool_invalid_block_size(block_size: int) -> None:
+    with pytest.raises(OddsproutValueError, match="multiple of 8"):
+        EntropyPool(block_size=block_size)
+
+
+def test_derive_seed() -> None:
+    assert derive_seed(1, 2) == derive_seed(1, 2)
+    assert derive_seed(1, 2) != derive_seed(1, 3)
+    assert derive_seed(1, 2) != derive_seed(12)
+    assert derive_seed(1) != derive_seed(2)
+
+
+@pytest.mark.parametrize("size", [1, 2, 4, 8])
+def test_random_words(size: int) -> None:
+    words = random_words(Random(0), 100, size)  # noqa: S311
+    assert len(words) == 100
+    assert all(0 <= w < 1 << (8 * size) for w in words)
+
+
+@pytest.mark.parametrize(("a", "b"), [(0, 9), (-5, 5), (3, 3), (0, 70_000), (0, 2**40)])
+def test_randints(a: int, b: int) -> None:
+    values = randints(EntropyPool(block_size=64), 1000, a, b)
+    assert len(values) == 1000
+    assert all(a <= v <= b for v in values)
+
+
+@pytest.mark.parametrize(("a", "b"), [(0, 9), (-5, 5), (3, 3), (0, 70_000), (0, 2**40)])
+def test_int_sampler(a: int, b: int) -> None:
+    draw = int_sampler(Random(0), a, b)  # noqa: S311
+    assert draw(0) == []
+    assert draw(1000) == randints(Random(0), 1000, a, b)  # noqa: S311
+
+
+def test_randints_uniformity() -> None:
+    counts = [0] * 10
+    for v in randints(Random(0), 10_000, 0, 9):  # noqa: S311
+        counts[v] += 1
+    assert all(800 < c < 1200 for c in counts)
+
+
+def test_uniforms() -> None:
+    values = uniforms(Random(0), 1000, -2.0, 3.0)  # noqa: S311
+    assert len(values) == 1000
+    assert all(-2.0 <= v < 3.0 for v in values)
+
+
+@pytest.mark.parametrize("charset", CHARSETS.values())
+def test_random_text(charset: str) -> None:
+    text = random_text(EntropyPool(block_size=64), 1000, charset)
+    assert len(text) == 1000
+    assert set(text) <= set(charset)
+    assert random_text(Random(0), 0, charset) == ""  # noqa: S311
+
+
+def test_random_text_uniformity() -> None:
+    text = random_text(Random(0), 52_000, CHARSETS["alpha"])  # noqa: S311
+    assert all(800 < text.count(c) < 1200 for c in CHARSETS["alpha"])
+
+
+@pytest.mark.parametrize("charset", ["", "żółw"])
+def test_random_text_invalid_charset(charset: str) -> None:
+    with pytest.raises(OddsproutValueError, match="non-empty ASCII string"):
+        random_text(Random(0), 10, charset)  # noqa: S311
+
+
+@pytest.mark.parametrize(
+    "weights", [[1, 1, 1, 1, 1, 0.05, 0.05], [1, 2, 3], [0.3, 0, 0.7], [5, 0.001]]
+)
+def test_alias_sampler(weights: list[float]) -> None:
+    draw = alias_sampler(Random(0), range(len(weights)), weights)  # noqa: S311
+    values = draw(100_000)
+    assert len(values) == 100_000
+    for i, weight in enumerate(weights):
+        expected = weight / sum(weights)
+        assert values.count(i) / 100_000 == pytest.approx(expected, abs=0.005)
+    assert draw(0) == []
+
+
+def test_alias_sampler_large_population() -> None:
+    weights = [1 / k for k in range(1, 1001)]
+    draw = alias_sampler(Random(0), range(1000), weights)  # noqa: S311
+    values = draw(100_000)
+    assert set(values) <= set(range(1000))
+    assert values.count(0) / 100_000 == pytest.approx(1 / sum(weights), abs=0.005)
+    assert values.count(1) / 100_000 == pytest.approx(0.5 / sum(weights), abs=0.005)
+
+
+def test_zipf_weights() -> None:
+    assert zipf_weights(4, 0) == [1, 1, 1, 1]
+    assert zipf_weights(3, 1) == pytest.approx([1, 1 / 2, 1 / 3])
+    assert zipf_weights(0, 2) == []
+
+
+def test_alias_sampler_single() -> None:
+    assert alias_sampler(Random(0), "a", [0.5])(3) == ["a"] * 3  # noqa: S311
+
+
+def test_alias_sampler_seeded() -> None:
+    values = [
+        alias_sampler(Random(0), "abc", [1, 2, 3])(1000)  # noqa: S311
+        for _ in range(2)
+    ]
+    assert values[0] == values[1]
+
+
+@pytest.mark.parametrize(
+    ("population", "weights", "err_msg"),
+    [
+        ("ab", [1], "the number of weights doesn't match"),
+        ("ab", [0, 0], "can't all be zero"),
+        ("ab", [1, -1], "must be non-negative"),
+    ],
+)
+def test_alias_sampler_invalid(
+    population: Sequence[object], weights: list[float], err_msg: str
+) -> None:
+    with pytest.raises(OddsproutValueError, match=err_msg):
+        alias_sampler(Random(0), population, weights)  # noqa: S311
@@ -0,0 +1,49 @@
+import json
+from collections import Counter
+
+from oddsprout.stats import GenerationStats
+
+
+def _stats() -> GenerationStats:
+    return GenerationStats(
+        values=2,
+        nodes=Counter({"array": 2, "int": 3, "string": 1}),
+        depths=Counter({1: 2, 2: 4}),
+        collection_sizes=Counter({4: 1, 0: 1}),
+        string_lengths=Counter({7: 1}),
+        bytes_emitted=40,
+        timings={"int": 0.002, "string": 0.001},
+    )
+
+
+def test_generation_stats_to_dict() -> None:
+    data = _stats().to_dict()
+    assert json.loads(json.dumps(data)) == data
+    assert data["collection_sizes"] == {"0": 1, "4": 1}
+    assert data["nodes"] == {"array": 2, "int": 3, "string": 1}
+
+
+def test_generation_stats_format() -> None:
+    assert _stats().format().splitlines() == [
+        "values: 2",
+        "nodes: 6",
+        "  int: 3",
+        "  array: 2",
+        "  string: 1",
+        "bytes emitted: 40",
+        "time spent:",
+        "  int: 2.00 ms",
+        "  string: 1.00 ms",
+        "depths:",
+        "  1: 2",
+        "  2: 4",
+        "collection sizes: min 0, mean 2.0, max 4",
+        "string lengths: min 7, mean 7.0, max 7",
+    ]
+
+
+def test_generation_stats_format_empty() -> None:
+    assert GenerationStats().format().splitlines()[-2:] == [
+        "collection sizes: none",
+        "string lengths: none",
+    ]
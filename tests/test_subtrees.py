@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from random import Random
+from typing import TYPE_CHECKING
+
+from oddsprout.subtrees import SubtreePool
+
+if TYPE_CHECKING:
+    from oddsprout.generators import JSONValue
+
+
+def _rng() -> Random:
+    return Random(0)  # noqa: S311
+
+
+class _FirstSlot(Random):
+    def random(self) -> float:
+        return 0.0
+
+
+def test_subtree_pool_add() -> None:
+    pool = SubtreePool(10)
+    value: JSONValue = [1, 2]
+    pool.add(value, 3, 2)
+    assert value in pool
+    assert [1, 2] not in pool
+    assert len(pool) == 1
+    assert pool.nodes == 3
+    assert pool.has_depth(2)
+    assert not pool.has_depth(3)
+    # subtrees are only pooled once
+    pool.add(value, 3, 2)
+    assert len(pool) == 1
+    # and never if they're larger than the pool
+    pool.add([list(range(10))], 12, 2)
+    assert len(pool) == 1
+    assert pool.added == 1
+
+
+def test_subtree_pool_eviction() -> None:
+    pool = SubtreePool(10)
+    values: list[JSONValue] = [[i, i] for i in range(4)]
+    for value in values[:3]:
+        pool.add(value, 3, 2)
+    # reusing a subtree makes it the most recently used one
+    assert pool.draw(_FirstSlot(), 2)[0] is values[0]
+    pool.add(values[3], 3, 3)
+    assert pool.nodes <= pool.max_nodes
+    assert values[0] in pool
+    assert values[1] not in pool
+    assert pool.evicted == 1
+    rng = _rng()
+    assert {id(pool.draw(rng, 2)[0]) for _ in range(100)} == {
+        id(values[0]),
+        id(values[2]),
+    }
+
+
+def test_subtree_pool_draw() -> None:
+    pool = SubtreePool(100)
+    pool.add({"a": [1]}, 3, 2)
+    assert pool.draw(_rng(), 2) == ({"a": [1]}, 3)
+    assert (pool.reused, pool.reused_nodes) == (1, 3)
+
+
+def test_subtree_pool_text() -> None:
+    pool = SubtreePool(100)
+    value: JSONValue = [1]
+    pool.add(value, 2, 2)
+    assert pool.text(value, 2) is None
+    pool.cache_text(value, 2, "[\n  1\n]")
+    assert pool.text(value, 2) == "[\n  1\n]"
+    assert pool.text(value, 4) is None
+    assert pool.text([1], 2) is None
+
+
+def test_subtree_pool_clear() -> None:
+    pool = SubtreePool(100)
+    value: JSONValue = [1]
+    pool.add(value, 2, 2)
+    pool.clear()
+    assert value not in pool
+    assert (len(pool), pool.nodes, pool.added) == (0, 0, 1)
+    assert not pool.has_depth(2)
+
+
+def test_subtree_pool_stats() -> None:
+    pool = SubtreePool(100)
+    pool.add([1], 2, 2)
+    pool.draw(_rng(), 2)
+    assert pool.to_dict() == {
+        "subtrees": 1,
+        "nodes": 2,
+        "added": 1,
+        "reused": 1,
+        "reused_nodes": 2,
+        "evicted": 0,
+    }
+    assert pool.format() == (
+        "subtree pool: 1 subtrees, 2 nodes\n"
+        "  added: 1\n"
+        "  reused: 1 (2 nodes)\n"
+        "  evicted: 0"
+    )
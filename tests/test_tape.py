@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import io
+import sys
+
+import pytest
+from test_encoder import dumps
+
+from oddsprout.configuration import Config
+from oddsprout.exceptions import OddsproutValueError
+from oddsprout.generators import JSONGenerator, JSONValue
+from oddsprout.tape import Tape
+
+CONFIGS = [
+    Config(seed=1),
+    Config(seed=2, charset="alnum", max_depth=4),
+    Config(seed=3, unique_keys=True, string_size=(0, 3), base="object"),
+]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_tape(config: Config) -> None:
+    values = list(JSONGenerator(config).generate_many(20))
+    tape = Tape(values)
+    assert len(tape) == 20
+    for i in (19, 0, 7):
+        assert tape[i] == values[i]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("indent", [None, 0, 2, 4])
+def test_tape_dumps(config: Config, indent: int | None) -> None:
+    values = list(JSONGenerator(config).generate_many(20))
+    tape = Tape(values)
+    assert list(tape.iter_dumps(indent)) == [dumps(v, indent) for v in values]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [1, -1.5, "a\nb", True, False, None, [], {}, [[]], {"": {}}, [{"b": [None]}]],
+)
+@pytest.mark.parametrize("indent", [None, 2])
+def test_tape_small_values(value: JSONValue, indent: int | None) -> None:
+    tape = Tape([value])
+    assert tape[0] == value
+    assert tape.dumps(0, indent) == dumps(value, indent)
+
+
+def test_tape_write_ndjson() -> None:
+    values = list(JSONGenerator(Config(seed=4)).generate_many(10))
+    out = io.StringIO()
+    Tape(values).write_ndjson(out)
+    assert out.getvalue() == "".join(dumps(v, None) + "\n" for v in values)
+
+
+def test_tape_nbytes() -> None:
+    tape = Tape()
+    assert repr(tape) == "Tape(values=0, nodes=0)"
+    tape.append({"a": [1, 2.5, "bc", None]})
+    assert repr(tape) == "Tape(values=1, nodes=7)"
+    # a tag per node, a number for the collections, strings and the int, a float,
+    # and the strings' text
+    assert tape.nbytes == 7 + 5 * 8 + 8 + sys.getsizeof("abc")
+
+
+@pytest.mark.parametrize("index", [-1, 2])
+def test_tape_out_of_range(index: int) -> None:
+    tape = Tape([1, 2])
+    with pytest.raises(
+        OddsproutValueError, match=f"tape has 2 values, got index {index}"
+    ):
+        tape[index]